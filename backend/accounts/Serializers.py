@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Account, Beneficiary
+from . import ifsc
 
 class AccountSerializer(serializers.ModelSerializer):
     class Meta:
@@ -12,13 +13,38 @@ class BeneficiarySerializer(serializers.ModelSerializer):
     class Meta:
         model = Beneficiary
         fields = ['id', 'beneficiary_name', 'account_number', 'ifsc_code', 
-                 'bank_name', 'nickname', 'is_verified', 'created_at']
-        read_only_fields = ['is_verified', 'created_at']
+                 'bank_name', 'branch_name', 'nickname', 'is_verified', 'created_at']
+        read_only_fields = ['branch_name', 'is_verified', 'created_at']
+        extra_kwargs = {'bank_name': {'required': False}}
+
+    def validate_ifsc_code(self, value):
+        value = ifsc.normalize(value)
+        if not ifsc.is_valid_format(value):
+            raise serializers.ValidationError("Invalid IFSC code format")
+        self._ifsc_entry = ifsc.lookup(value)
+        if self._ifsc_entry is None and ifsc.is_unknown(value):
+            raise serializers.ValidationError("Unknown IFSC code")
+        return value
+
+    def validate(self, attrs):
+        # Bank and branch come from the IFSC directory when it lists the code
+        entry = getattr(self, '_ifsc_entry', None)
+        if entry:
+            attrs['bank_name'] = entry['bank_name']
+            attrs['branch_name'] = entry['branch']
+        elif 'ifsc_code' in attrs and not attrs.get('bank_name') and not getattr(self.instance, 'bank_name', None):
+            raise serializers.ValidationError({'bank_name': 'Required for IFSC codes not in the directory'})
+        return attrs
 
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
         return super().create(validated_data)
 
+class IFSCSerializer(serializers.Serializer):
+    ifsc = serializers.CharField()
+    bank_name = serializers.CharField()
+    branch = serializers.CharField()
+
 class AccountSummarySerializer(serializers.Serializer):
     total_accounts = serializers.IntegerField()
     total_balance = serializers.DecimalField(max_digits=15, decimal_places=2)
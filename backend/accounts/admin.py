@@ -1,16 +1,49 @@
 from django.contrib import admin
+from django.db.models import Q
+from bluebank import sharding
+from bluebank.admin_utils import LargeTableAdmin, ShardedAdminMixin
+from users.models import User
 from .models import Account, Beneficiary
 
 @admin.register(Account)
-class AccountAdmin(admin.ModelAdmin):
+class AccountAdmin(ShardedAdminMixin, LargeTableAdmin):
     list_display = ('account_number', 'user', 'account_type', 'balance', 'status', 'created_at')
-    list_filter = ('account_type', 'status', 'created_at')
-    search_fields = ('account_number', 'user__username', 'user__email')
+    list_filter = ('status', 'account_type')
+    list_select_related = ('user',)
+    search_fields = ('account_number', 'user__email')
+    search_help_text = 'Exact account number, email or username'
     readonly_fields = ('account_number', 'created_at', 'updated_at')
+    autocomplete_fields = ('user',)
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if sharding.enabled():
+            # Users are on the directory database, so no join
+            return queryset
+        # Account.__str__ reads the user, e.g. in autocomplete results
+        return queryset.select_related('user')
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        # Resolved first so it also works when users are on another database
+        user_ids = list(User.objects.filter(Q(email=term) | Q(username=term)).values_list('id', flat=True))
+        return queryset.filter(Q(account_number=term) | Q(user_id__in=user_ids)), False
 
 @admin.register(Beneficiary)
-class BeneficiaryAdmin(admin.ModelAdmin):
+class BeneficiaryAdmin(ShardedAdminMixin, LargeTableAdmin):
     list_display = ('beneficiary_name', 'account_number', 'bank_name', 'user', 'is_verified', 'created_at')
-    list_filter = ('is_verified', 'bank_name', 'created_at')
-    search_fields = ('beneficiary_name', 'account_number', 'user__username')
+    list_filter = ('is_verified',)
+    list_select_related = ('user',)
+    search_fields = ('account_number', 'user__email')
+    search_help_text = 'Exact account number or user email'
     readonly_fields = ('created_at',)
+    autocomplete_fields = ('user',)
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        user_ids = list(User.objects.filter(email=term).values_list('id', flat=True))
+        return queryset.filter(Q(account_number=term) | Q(user_id__in=user_ids)), False
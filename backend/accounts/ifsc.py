@@ -0,0 +1,245 @@
+"""IFSC directory backed by a compiled, memory-mapped lookup file.
+
+The bundled CSV (IFSC, bank name, branch) is compiled into a single binary
+file laid out as::
+
+    header | sorted 11-byte codes | (offset, length) entries | hash table | text blob
+
+A directory compiled from the bundled sample CSV is flagged as such: it can
+fill in bank and branch names, but only a complete directory loaded with
+``reload_ifsc`` can rule a well-formed code out.
+
+Exact lookups go through the open-addressing hash table (O(1)), prefix
+searches bisect the sorted code block, and nothing but the header is read
+into Python objects when the file is opened. Each process maps the file once
+and re-maps it when ``reload_ifsc`` atomically replaces it, closing the old
+map; a lookup that was still reading the old map retries on the new one.
+"""
+import bisect
+import csv
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+
+from django.conf import settings
+
+IFSC_REGEX = re.compile(r'^[A-Z]{4}0[A-Z0-9]{6}$')
+
+MAGIC = b'IFSC'
+VERSION = 2
+CODE_SIZE = 11
+HEADER = struct.Struct('<4sHHIII')
+FLAG_SAMPLE = 1
+SAMPLE_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'ifsc.csv')
+ENTRY = struct.Struct('<IH')
+SLOT = struct.Struct('<I')
+SEPARATOR = '\x1f'
+
+
+def normalize(code):
+    return (code or '').strip().upper()
+
+
+def is_valid_format(code):
+    return bool(IFSC_REGEX.match(code))
+
+
+def _slot(code, table_size):
+    return zlib.crc32(code) & (table_size - 1)
+
+
+def compile_directory(source, target):
+    """Compile a CSV of (ifsc, bank_name, branch) rows into the binary format.
+
+    The file is written next to ``target`` and renamed into place, so
+    processes that already mapped the old file keep a consistent view.
+    Returns the number of entries written.
+    """
+    rows = {}
+    with open(source, newline='', encoding='utf-8') as handle:
+        for row in csv.reader(handle):
+            if not row or row[0].startswith('#'):
+                continue
+            code = normalize(row[0])
+            if not is_valid_format(code):
+                continue
+            bank = row[1].strip() if len(row) > 1 else ''
+            branch = row[2].strip() if len(row) > 2 else ''
+            rows[code] = f"{bank}{SEPARATOR}{branch}".encode('utf-8')
+
+    codes = sorted(rows)
+    table_size = 1
+    while table_size < max(len(codes) * 2, 1):
+        table_size <<= 1
+
+    table = [0] * table_size
+    entries = []
+    blob = bytearray()
+    for index, code in enumerate(codes):
+        text = rows[code]
+        entries.append(ENTRY.pack(len(blob), len(text)))
+        blob += text
+        slot = _slot(code.encode('ascii'), table_size)
+        while table[slot]:
+            slot = (slot + 1) & (table_size - 1)
+        # Slots store index + 1 so that zero marks an empty slot.
+        table[slot] = index + 1
+
+    os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as out:
+        sample = os.path.exists(source) and os.path.samefile(source, SAMPLE_SOURCE)
+        flags = FLAG_SAMPLE if sample else 0
+        out.write(HEADER.pack(MAGIC, VERSION, flags, len(codes), table_size, len(blob)))
+        out.write(''.join(codes).encode('ascii'))
+        out.write(b''.join(entries))
+        out.write(b''.join(SLOT.pack(value) for value in table))
+        out.write(blob)
+    os.replace(tmp, target)
+    return len(codes)
+
+
+class _Codes:
+    """Sequence view over the sorted code block, for bisect"""
+
+    def __init__(self, buf, offset, count):
+        self.buf = buf
+        self.offset = offset
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        start = self.offset + index * CODE_SIZE
+        return self.buf[start:start + CODE_SIZE]
+
+
+class IFSCDirectory:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as handle:
+            self.stat = os.fstat(handle.fileno())
+            self.buf = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, flags, count, table_size, _ = HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a compiled IFSC directory")
+        self.complete = not flags & FLAG_SAMPLE
+        self.count = count
+        self.table_size = table_size
+        self.codes_offset = HEADER.size
+        self.entries_offset = self.codes_offset + count * CODE_SIZE
+        self.table_offset = self.entries_offset + count * ENTRY.size
+        self.blob_offset = self.table_offset + table_size * SLOT.size
+        self.codes = _Codes(self.buf, self.codes_offset, count)
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self.buf.close()
+
+    def _entry(self, index):
+        offset, length = ENTRY.unpack_from(self.buf, self.entries_offset + index * ENTRY.size)
+        start = self.blob_offset + offset
+        bank, branch = self.buf[start:start + length].decode('utf-8').split(SEPARATOR, 1)
+        return {
+            'ifsc': self.codes[index].decode('ascii'),
+            'bank_name': bank,
+            'branch': branch,
+        }
+
+    def lookup(self, code):
+        """Return the directory entry for an IFSC code, or None"""
+        code = normalize(code)
+        if not self.count or not is_valid_format(code):
+            return None
+        key = code.encode('ascii')
+        mask = self.table_size - 1
+        slot = _slot(key, self.table_size)
+        while True:
+            (value,) = SLOT.unpack_from(self.buf, self.table_offset + slot * SLOT.size)
+            if not value:
+                return None
+            if self.codes[value - 1] == key:
+                return self._entry(value - 1)
+            slot = (slot + 1) & mask
+
+    def search(self, prefix, limit=10):
+        """Return up to ``limit`` entries whose code starts with ``prefix``"""
+        key = normalize(prefix).encode('ascii', 'ignore')[:CODE_SIZE]
+        if not key:
+            return []
+        index = bisect.bisect_left(self.codes, key)
+        results = []
+        while index < self.count and len(results) < limit:
+            if not self.codes[index].startswith(key):
+                break
+            results.append(self._entry(index))
+            index += 1
+        return results
+
+    def is_stale(self):
+        try:
+            current = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        return (current.st_ino, current.st_mtime_ns) != (self.stat.st_ino, self.stat.st_mtime_ns)
+
+
+_directory = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def get_directory():
+    """Return this process's directory, re-mapping it after a reload"""
+    global _directory, _checked_at
+    now = time.monotonic()
+    if _directory is not None and now - _checked_at < settings.IFSC_RELOAD_INTERVAL:
+        return _directory
+
+    with _lock:
+        _checked_at = now
+        if _directory is None or _directory.is_stale():
+            path = settings.IFSC_DIRECTORY_PATH
+            if not os.path.exists(path):
+                compile_directory(settings.IFSC_DIRECTORY_SOURCE, path)
+            try:
+                directory = IFSCDirectory(path)
+            except ValueError:
+                # Written by an older version of this module
+                compile_directory(settings.IFSC_DIRECTORY_SOURCE, path)
+                directory = IFSCDirectory(path)
+            if _directory is not None:
+                _directory.close()
+            _directory = directory
+    return _directory
+
+
+def _query(method, *args):
+    directory = get_directory()
+    try:
+        return method(directory, *args)
+    except ValueError:
+        # Another thread re-mapped the directory and closed this map mid-read
+        if not directory.buf.closed:
+            raise
+        return method(get_directory(), *args)
+
+
+def lookup(code):
+    return _query(IFSCDirectory.lookup, code)
+
+
+def search(prefix, limit=10):
+    return _query(IFSCDirectory.search, prefix, limit)
+
+
+def is_unknown(code):
+    """True if a complete directory is loaded and does not list ``code``"""
+    return _query(lambda directory: directory.complete and directory.lookup(code) is None)
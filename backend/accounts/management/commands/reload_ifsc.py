@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.ifsc import compile_directory
+
+
+class Command(BaseCommand):
+    help = 'Compile an IFSC directory CSV and swap it in for all running workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', default=settings.IFSC_DIRECTORY_SOURCE,
+                            help='CSV of IFSC,BANK,BRANCH rows')
+
+    def handle(self, *args, **options):
+        try:
+            count = compile_directory(options['source'], settings.IFSC_DIRECTORY_PATH)
+        except OSError as exc:
+            raise CommandError(f"Could not read {options['source']}: {exc}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Loaded {count} IFSC codes; workers pick up the new directory "
+            f"within {settings.IFSC_RELOAD_INTERVAL}s"
+        ))
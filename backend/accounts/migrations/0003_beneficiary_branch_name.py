@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='beneficiary',
+            name='branch_name',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+    ]
@@ -1,8 +1,10 @@
-from django.db import models
 from django.conf import settings
+from django.db import models, router
 import uuid
 import random
 
+from bluebank import sharding
+
 class Account(models.Model):
     ACCOUNT_TYPES = [
         ('SAVINGS', 'Savings Account'),
@@ -17,7 +19,9 @@ class Account(models.Model):
     ]
 
     account_number = models.CharField(max_length=20, unique=True)
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='accounts')
+    # Users live on the directory database when sharded, so no DB-level constraint
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='accounts',
+                             db_constraint=False)
     account_type = models.CharField(max_length=10, choices=ACCOUNT_TYPES, default='SAVINGS')
     balance = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='ACTIVE')
@@ -32,23 +36,34 @@ class Account(models.Model):
     def save(self, *args, **kwargs):
         if not self.account_number:
             self.account_number = self.generate_account_number()
+            while Account.objects.filter(account_number=self.account_number).exists():
+                self.account_number = self.generate_account_number()
         super().save(*args, **kwargs)
 
     def generate_account_number(self):
-        # Generate a 12-digit account number starting with 50100
-        return f"50100{random.randint(1000000, 9999999)}"
+        # 12 digits: 501, the two-digit shard the account is opened on (00
+        # when unsharded), then 7 random digits; the unique constraint only
+        # covers one shard, so the shard digits keep numbers apart across them
+        shard = sharding.shard_index(router.db_for_write(Account, instance=self))
+        return f"501{shard:02d}{random.randint(1000000, 9999999)}"
 
     class Meta:
         db_table = 'accounts_account'
+        indexes = [
+            models.Index(fields=['status', 'id'], name='account_status_idx'),
+            models.Index(fields=['account_type', 'id'], name='account_type_idx'),
+        ]
         verbose_name = 'Account'
         verbose_name_plural = 'Accounts'
 
 class Beneficiary(models.Model):
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='beneficiaries')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='beneficiaries',
+                             db_constraint=False)
     beneficiary_name = models.CharField(max_length=100)
     account_number = models.CharField(max_length=20)
     ifsc_code = models.CharField(max_length=11)
     bank_name = models.CharField(max_length=100)
+    branch_name = models.CharField(max_length=100, blank=True)
     nickname = models.CharField(max_length=50, blank=True)
     is_verified = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -56,6 +71,10 @@ class Beneficiary(models.Model):
     class Meta:
         unique_together = ['user', 'account_number']
         db_table = 'accounts_beneficiary'
+        indexes = [
+            models.Index(fields=['account_number'], name='beneficiary_account_idx'),
+            models.Index(fields=['is_verified', 'id'], name='beneficiary_verified_idx'),
+        ]
         verbose_name = 'Beneficiary'
         verbose_name_plural = 'Beneficiaries'
 
@@ -1,3 +1,91 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.models import User
+from . import ifsc
+
+DIRECTORY = """# IFSC,BANK,BRANCH
+HDFC0000001,HDFC Bank,Fort
+hdfc0000002,HDFC Bank,Andheri
+SBIN0000300,State Bank of India,Mumbai Main
+not-a-code,Ignored,Row
+"""
+
+
+class IFSCDirectoryTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.source = self.write('full.csv', DIRECTORY)
+        self.path = os.path.join(self.root, 'ifsc.bin')
+        paths = override_settings(
+            IFSC_DIRECTORY_SOURCE=self.source, IFSC_DIRECTORY_PATH=self.path, IFSC_RELOAD_INTERVAL=0,
+        )
+        paths.enable()
+        self.addCleanup(paths.disable)
+        # Each test maps its own directory; drop it afterwards
+        self.addCleanup(setattr, ifsc, '_directory', None)
+        self.addCleanup(lambda: ifsc._directory and ifsc._directory.close())
+        ifsc._directory = None
+
+    def write(self, name, text):
+        path = os.path.join(self.root, name)
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write(text)
+        return path
+
+    def test_lookup_and_prefix_search(self):
+        self.assertEqual(ifsc.compile_directory(self.source, self.path), 3)
+        directory = ifsc.IFSCDirectory(self.path)
+        self.addCleanup(directory.close)
+        self.assertTrue(directory.complete)
+        self.assertEqual(
+            directory.lookup(' hdfc0000002 '), {'ifsc': 'HDFC0000002', 'bank_name': 'HDFC Bank', 'branch': 'Andheri'}
+        )
+        self.assertIsNone(directory.lookup('HDFC0000009'))
+        self.assertIsNone(directory.lookup('not-a-code'))
+        self.assertEqual([entry['ifsc'] for entry in directory.search('hdfc')], ['HDFC0000001', 'HDFC0000002'])
+        self.assertEqual(len(directory.search('HDFC', limit=1)), 1)
+        self.assertEqual(directory.search(''), [])
+
+    def test_reload_maps_the_new_file_and_closes_the_old_map(self):
+        old = ifsc.get_directory()
+        self.assertIsNone(ifsc.lookup('ICIC0000104'))
+
+        call_command('reload_ifsc', '--source', self.write('new.csv', 'ICIC0000104,ICICI Bank,Powai\n'),
+                     stdout=io.StringIO())
+        self.assertEqual(ifsc.lookup('ICIC0000104')['branch'], 'Powai')
+        self.assertIsNot(ifsc.get_directory(), old)
+        self.assertTrue(old.buf.closed)
+        self.assertIsNone(ifsc.lookup('HDFC0000001'))
+
+    def test_lookup_retries_when_its_map_is_closed_mid_read(self):
+        closed = ifsc.get_directory()
+        current = ifsc.IFSCDirectory(self.path)
+        self.addCleanup(current.close)
+        closed.close()
+        with mock.patch.object(ifsc, 'get_directory', side_effect=[closed, current]):
+            self.assertEqual(ifsc.lookup('SBIN0000300')['bank_name'], 'State Bank of India')
+
+    def test_only_a_complete_directory_rules_codes_out(self):
+        self.assertTrue(ifsc.is_unknown('HDFC0000009'))
+        self.assertFalse(ifsc.is_unknown('HDFC0000001'))
+        with override_settings(IFSC_DIRECTORY_SOURCE=ifsc.SAMPLE_SOURCE):
+            ifsc.compile_directory(ifsc.SAMPLE_SOURCE, self.path)
+            self.assertFalse(ifsc.get_directory().complete)
+            self.assertFalse(ifsc.is_unknown('HDFC0000009'))
+
+    def test_autocomplete_endpoint(self):
+        user = User.objects.create_user(username='payer', email='payer@example.com', password='unused')
+        response = self.client.get(
+            '/api/accounts/ifsc/?prefix=sbin&limit=5', HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([entry['ifsc'] for entry in response.data['results']], ['SBIN0000300'])
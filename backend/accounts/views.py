@@ -3,10 +3,17 @@ from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from .models import Account, Beneficiary
-from .Serializers import AccountSerializer, BeneficiarySerializer, AccountSummarySerializer
+from .Serializers import AccountSerializer, BeneficiarySerializer, AccountSummarySerializer, IFSCSerializer
+from . import ifsc
+from transactions.balances import balance_at
+from bluebank import sharding
+from bluebank.fast_serializers import ValuesListMixin, values_serializer
 
-class AccountListView(generics.ListCreateAPIView):
+class AccountListView(ValuesListMixin, generics.ListCreateAPIView):
     serializer_class = AccountSerializer
     permission_classes = [IsAuthenticated]
 
@@ -14,7 +21,11 @@ class AccountListView(generics.ListCreateAPIView):
         return Account.objects.filter(user=self.request.user)
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        if sharding.enabled():
+            # Accounts open at the home branch so they stay on the user's shard
+            serializer.save(user=self.request.user, branch_code=self.request.user.branch_code)
+        else:
+            serializer.save(user=self.request.user)
 
 class AccountDetailView(generics.RetrieveAPIView):
     serializer_class = AccountSerializer
@@ -42,16 +53,68 @@ class BeneficiaryDetailView(generics.RetrieveUpdateDestroyAPIView):
 def account_summary(request):
     """Get comprehensive account summary for dashboard"""
     accounts = Account.objects.filter(user=request.user)
-    total_balance = sum(account.balance for account in accounts)
+    reader = values_serializer(AccountSerializer)
+    rows = list(reader.values(accounts))
+    total_balance = sum(row['balance'] for row in rows)
     
     # Get active accounts count
     active_accounts = accounts.filter(status='ACTIVE').count()
     
     data = {
-        'total_accounts': accounts.count(),
+        'total_accounts': len(rows),
         'active_accounts': active_accounts,
         'total_balance': total_balance,
-        'accounts': AccountSerializer(accounts, many=True).data
+        'accounts': reader.serialize(rows)
     }
     
     return Response(data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def ifsc_search(request):
+    """Autocomplete IFSC codes by prefix"""
+    prefix = request.query_params.get('prefix', '')
+    try:
+        limit = min(int(request.query_params.get('limit', 10)), 50)
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+    results = ifsc.search(prefix, limit) if len(prefix) >= 2 else []
+    return Response({'results': IFSCSerializer(results, many=True).data})
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def account_balance(request, pk):
+    """Get an account's balance as of ?at=<ISO timestamp or date> (default now)"""
+    account = get_object_or_404(Account, pk=pk, user=request.user)
+
+    at = request.query_params.get('at')
+    if at:
+        moment = parse_datetime(at)
+        if moment is None and parse_date(at) is not None:
+            # A bare date means the end of that day
+            moment = parse_datetime(f"{at}T23:59:59.999999")
+        if moment is None:
+            return Response({'error': 'at must be an ISO 8601 timestamp or date'}, status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+    else:
+        moment = timezone.now()
+
+    if moment < account.created_at:
+        return Response({'error': 'Account did not exist at that time'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        balance, txn = balance_at(account, moment)
+    except LookupError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_409_CONFLICT)
+
+    return Response({
+        'account_id': account.id,
+        'account_number': account.account_number,
+        'at': moment,
+        'balance': balance,
+        'transaction_id': str(txn.transaction_id) if txn else None,
+        'reference_number': txn.reference_number if txn else None,
+    })
@@ -0,0 +1,156 @@
+"""Admin helpers for tables too large for exact counts and OFFSET paging"""
+import json
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from . import sharding
+
+AFTER_VAR = 'after'
+
+
+def estimate_count(queryset):
+    """Return the planner's row estimate for a queryset, or None if unavailable"""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+            return int(row[0]) if row and row[0] > 0 else None
+        sql, params = queryset.order_by().query.sql_with_params()
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Counts exactly up to ADMIN_EXACT_COUNT_LIMIT rows, then estimates"""
+    is_estimated = False
+    is_truncated = False
+
+    @cached_property
+    def count(self):
+        limit = settings.ADMIN_EXACT_COUNT_LIMIT
+        queryset = self.object_list.order_by()
+        exact = queryset[:limit + 1].count()
+        if exact <= limit:
+            return exact
+        estimate = estimate_count(queryset)
+        if estimate is None:
+            # No planner estimate on this backend; report "more than limit"
+            self.is_truncated = True
+            return limit
+        self.is_estimated = True
+        return max(estimate, exact)
+
+
+class KeysetChangeList(ChangeList):
+    """Changelist that pages with ``?after=<pk>`` instead of OFFSET.
+
+    Rows are always ordered by descending primary key, so the next page is
+    an index seek from the last pk shown regardless of how deep it is.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        try:
+            self.after = int(request.GET.get(AFTER_VAR, 0)) or None
+        except ValueError:
+            self.after = None
+        super().__init__(request, *args, **kwargs)
+
+    def get_queryset(self, request, exclude_parameters=None):
+        self.params.pop(AFTER_VAR, None)
+        self.filter_params.pop(AFTER_VAR, None)
+        return super().get_queryset(request, exclude_parameters)
+
+    def get_results(self, request):
+        paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        queryset = self.queryset
+        if self.after:
+            queryset = queryset.filter(pk__lt=self.after)
+        result_list = queryset[:self.list_per_page]
+
+        rows = list(result_list)
+        self.next_url = None
+        if rows and queryset.filter(pk__lt=rows[-1].pk).exists():
+            self.next_url = self.get_query_string({AFTER_VAR: rows[-1].pk})
+        self.first_url = self.get_query_string(remove=[AFTER_VAR]) if self.after else None
+
+        self.result_count = paginator.count
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.full_result_count = None
+        self.result_list = result_list
+        self.can_show_all = False
+        self.multi_page = bool(self.next_url or self.first_url)
+        self.paginator = paginator
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """ModelAdmin whose changelist cost does not grow with table size.
+
+    Subclasses should only offer list_filter on indexed columns and
+    override get_search_results with indexed lookups.
+    """
+    ordering = ('-pk',)
+    sortable_by = ()
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    list_max_show_all = 0
+    paginator = EstimatedCountPaginator
+    change_list_template = 'admin/keyset_change_list.html'
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+
+class ShardFilter(admin.SimpleListFilter):
+    """Switches the admin between shards; ShardRoutingMiddleware does the routing"""
+    title = 'shard'
+    parameter_name = sharding.ADMIN_PARAMETER
+
+    def lookups(self, request, model_admin):
+        return [(alias, alias) for alias in sharding.shard_aliases()]
+
+    def choices(self, changelist):
+        current = sharding.current_shard()
+        for alias, title in self.lookup_choices:
+            yield {
+                'selected': alias == current,
+                'query_string': changelist.get_query_string({self.parameter_name: alias}),
+                'display': title,
+            }
+
+    def queryset(self, request, queryset):
+        return queryset
+
+
+class ShardedAdminMixin:
+    """Admin for a model in a sharded app: lists one shard at a time.
+
+    Users are on the directory database, so joins to them are dropped from
+    list_select_related while sharding is on.
+    """
+
+    def get_list_filter(self, request):
+        list_filter = super().get_list_filter(request)
+        if not sharding.enabled():
+            return list_filter
+        return (ShardFilter, *list_filter)
+
+    def get_list_select_related(self, request):
+        related = super().get_list_select_related(request)
+        if not sharding.enabled() or not isinstance(related, (list, tuple)):
+            return related
+        return tuple(name for name in related if name != 'user' and not name.endswith('__user'))
@@ -0,0 +1,20 @@
+from django.apps import AppConfig
+
+
+class BluebankConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'bluebank'
+
+    def ready(self):
+        from django.core import checks
+        from django.db.backends.signals import connection_created
+        from . import metrics
+        from .db_pool import pool_gauges
+        from .db_router import check_pin_cache, count_queries
+        from .middleware import check_browser_middleware
+        from .throttling import check_throttle_cache
+        checks.register(check_browser_middleware, checks.Tags.admin)
+        checks.register(check_throttle_cache, checks.Tags.caches)
+        checks.register(check_pin_cache, checks.Tags.caches, checks.Tags.database)
+        connection_created.connect(count_queries, dispatch_uid='bluebank.count_queries')
+        metrics.register_collector(pool_gauges)
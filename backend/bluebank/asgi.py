@@ -1,7 +1,9 @@
 """
 ASGI config for bluebank project.
 
-It exposes the ASGI callable as a module-level variable named ``application``.
+It exposes the ASGI callable as a module-level variable named ``application``,
+and ``events_application``, which serves only the /api/events/ stream so the
+rest of the API stays on the WSGI workers.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -14,3 +16,13 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bluebank.settings')
 
 application = get_asgi_application()
+
+EVENTS_PATH = '/api/events/'
+
+
+async def events_application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] != EVENTS_PATH:
+        await send({'type': 'http.response.start', 'status': 404, 'headers': [(b'content-type', b'text/plain')]})
+        await send({'type': 'http.response.body', 'body': b'Not Found'})
+        return
+    await application(scope, receive, send)
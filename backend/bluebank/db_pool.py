@@ -0,0 +1,40 @@
+"""Connection pool gauges for /api/metrics/.
+
+With DB_POOL each worker process holds one psycopg pool per database
+alias. Its counters are cumulative for the life of the pool, so the
+average checkout wait is the total wait divided by checkouts, and
+saturation is the share of the pool's maximum currently checked out.
+"""
+from django.db import connections
+
+
+def pool_gauges():
+    gauges = []
+    for alias in connections:
+        # Read the pool without creating one for an alias that never connected
+        pool = getattr(connections[alias], '_connection_pools', {}).get(alias)
+        if pool is None:
+            continue
+        stats = pool.get_stats()
+        size = stats.get('pool_size', 0)
+        available = stats.get('pool_available', 0)
+        max_size = stats.get('pool_max', pool.max_size)
+        in_use = size - available
+        checkouts = stats.get('requests_num', 0)
+        wait_ms = stats.get('requests_wait_ms', 0)
+        values = {
+            'db.pool.size': size,
+            'db.pool.max_size': max_size,
+            'db.pool.in_use': in_use,
+            'db.pool.available': available,
+            'db.pool.saturation': round(in_use / max_size, 3) if max_size else 0,
+            'db.pool.waiting': stats.get('requests_waiting', 0),
+            'db.pool.checkouts': checkouts,
+            'db.pool.wait_ms_total': wait_ms,
+            'db.pool.wait_ms_avg': round(wait_ms / checkouts, 3) if checkouts else 0,
+            'db.pool.timeouts': stats.get('requests_errors', 0),
+            'db.pool.connections_lost': stats.get('connections_lost', 0),
+            'db.pool.returned_bad': stats.get('returns_bad', 0),
+        }
+        gauges.extend({'name': name, 'labels': {'alias': alias}, 'value': value} for name, value in values.items())
+    return gauges
@@ -0,0 +1,110 @@
+"""Read-replica routing.
+
+Writes always go to ``default``. Reads go to whatever alias
+``ReplicaRoutingMiddleware`` selected for the current request (a replica
+for safe API requests, ``default`` otherwise), so code outside a request
+- management commands, migrations, shells - keeps using the primary.
+"""
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+
+from . import metrics
+from .throttling import PROCESS_LOCAL_CACHES
+
+PRIMARY = 'default'
+
+_read_alias = ContextVar('bluebank_read_alias', default=PRIMARY)
+
+# alias -> monotonic time until which the replica is skipped
+_down_until = {}
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica_')]
+
+
+def get_read_alias():
+    return _read_alias.get()
+
+
+def set_read_alias(alias):
+    return _read_alias.set(alias or PRIMARY)
+
+
+def reset_read_alias(token):
+    _read_alias.reset(token)
+
+
+def choose_replica():
+    """Return a healthy replica alias, or None to read from the primary"""
+    now = time.monotonic()
+    candidates = [alias for alias in replica_aliases() if _down_until.get(alias, 0) <= now]
+    if not candidates:
+        return None
+    return random.choice(candidates)
+
+
+def mark_replica_down(alias):
+    _down_until[alias] = time.monotonic() + settings.REPLICA_RETRY_SECONDS
+    metrics.incr('db.replica_failover', alias=alias)
+
+
+def _pin_key(user_id):
+    return f'db-pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """Send this user's reads to the primary for REPLICA_PIN_SECONDS"""
+    cache.set(_pin_key(user_id), 1, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user_id):
+    return user_id is not None and cache.get(_pin_key(user_id)) is not None
+
+
+def check_pin_cache(app_configs, **kwargs):
+    """Pins live in the default cache, which every worker must share once replicas are on"""
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if settings.DEBUG or not replica_aliases() or backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [checks.Error(
+        f"Read replicas are configured but the default cache uses {backend}, so a write only pins "
+        f"the worker that served it and the user's next read can land on a lagging replica",
+        hint='Point CACHE_BACKEND/CACHE_LOCATION at Redis or Memcached, or unset REPLICA_DATABASE_URL',
+        id='bluebank.E002',
+    )]
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
+
+
+def count_queries(sender, connection, **kwargs):
+    """connection_created handler that counts queries per database alias"""
+    for wrapper in connection.execute_wrappers:
+        if getattr(wrapper, 'counts_queries', False):
+            return
+
+    alias = connection.alias
+
+    def wrapper(execute, sql, params, many, context):
+        metrics.incr('db.queries', alias=alias)
+        return execute(sql, params, many, context)
+
+    wrapper.counts_queries = True
+    connection.execute_wrappers.append(wrapper)
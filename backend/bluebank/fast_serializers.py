@@ -0,0 +1,154 @@
+"""Fast read path for high-volume list endpoints.
+
+``ValuesSerializer`` compiles the readable fields of a DRF serializer
+into a plain row-to-dict converter that runs over ``.values()`` rows, so
+list endpoints skip model instantiation and per-field serializer
+dispatch. Every converter reproduces the DRF field's ``to_representation``
+exactly - Decimal quantization, ISO 8601 datetimes in the current
+timezone with ``Z`` for UTC, choice normalization - so the rendered
+output is byte-identical to the serializer it was built from. Field
+types without a dedicated converter fall back to the DRF field itself.
+"""
+import decimal
+from functools import lru_cache
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+
+def _decimal_converter(field):
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if field.localize or field.decimal_places is None:
+        return field.to_representation
+    exponent = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+    Decimal = decimal.Decimal
+
+    def convert(value):
+        if not isinstance(value, Decimal):
+            value = Decimal(str(value).strip())
+        quantized = value.quantize(exponent, rounding=rounding, context=context)
+        return '{:f}'.format(quantized) if coerce_to_string else quantized
+    return convert
+
+
+def _datetime_converter(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+    # Resolved per serialize() call, like DRF resolves it per value
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if field_timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        if isinstance(value, str):
+            return value
+        if timezone.is_aware(value):
+            value = value.astimezone(field_timezone)
+        else:
+            value = timezone.make_aware(value, field_timezone)
+        value = value.isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return convert
+
+
+def _choice_converter(field):
+    lookup = field.choice_strings_to_values
+
+    def convert(value):
+        if value == '':
+            return value
+        return lookup.get(str(value), value)
+    return convert
+
+
+def _uuid_converter(field):
+    if field.uuid_format != 'hex_verbose':
+        return field.to_representation
+    return str
+
+
+def _primary_key_converter(field):
+    # .values() already yields the related row's key, not an instance
+    if field.pk_field is not None:
+        return field.pk_field.to_representation
+    return lambda value: value
+
+
+def _converter(field):
+    if isinstance(field, serializers.PrimaryKeyRelatedField):
+        return _primary_key_converter(field)
+    if isinstance(field, serializers.DecimalField):
+        return _decimal_converter(field)
+    if isinstance(field, serializers.DateTimeField):
+        return _datetime_converter(field)
+    if isinstance(field, serializers.ChoiceField):
+        return _choice_converter(field)
+    if isinstance(field, serializers.UUIDField):
+        return _uuid_converter(field)
+    if isinstance(field, serializers.CharField):
+        return str
+    if isinstance(field, serializers.IntegerField):
+        return int
+    return field.to_representation
+
+
+class ValuesSerializer:
+    """Row-to-dict converter compiled from a DRF serializer class"""
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self.fields = []
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if field.source == '*' or isinstance(field, (serializers.SerializerMethodField,
+                                                          serializers.BaseSerializer)):
+                raise ImproperlyConfigured(
+                    f'{serializer_class.__name__}.{name} cannot be read from .values() rows'
+                )
+            self.fields.append((name, '__'.join(field.source_attrs), field))
+        self.columns = tuple(dict.fromkeys(lookup for _, lookup, _ in self.fields))
+
+    def values(self, queryset):
+        """Restrict ``queryset`` to the columns the serializer reads"""
+        return queryset.values(*self.columns)
+
+    def serialize(self, rows):
+        """Convert ``.values()`` rows to the dicts the DRF serializer produces"""
+        plan = tuple((name, lookup, _converter(field)) for name, lookup, field in self.fields)
+        output = []
+        append = output.append
+        for row in rows:
+            item = {}
+            for name, lookup, convert in plan:
+                value = row[lookup]
+                item[name] = None if value is None else convert(value)
+            append(item)
+        return output
+
+
+@lru_cache(maxsize=None)
+def values_serializer(serializer_class):
+    return ValuesSerializer(serializer_class)
+
+
+class ValuesListMixin:
+    """List endpoint that reads ``.values()`` rows instead of model instances"""
+
+    def list(self, request, *args, **kwargs):
+        reader = values_serializer(self.get_serializer_class())
+        queryset = reader.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(reader.serialize(page))
+        return Response(reader.serialize(queryset))
@@ -0,0 +1,96 @@
+import statistics
+import threading
+import time
+
+from django.core import signals
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from bluebank.db_pool import pool_gauges
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Command(BaseCommand):
+    help = 'Compare per-request query latency with a fresh connection vs the configured pool/persistence'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Simulated requests per thread')
+        parser.add_argument('--threads', type=int, default=1,
+                            help='Concurrent workers; more threads than DB_POOL_MAX_SIZE shows pool waits')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        wrapper = connections[alias]
+        settings_dict = wrapper.settings_dict
+        self.stdout.write(
+            f"{alias}: {wrapper.vendor}, CONN_MAX_AGE={settings_dict['CONN_MAX_AGE']}, "
+            f"pool={settings_dict['OPTIONS'].get('pool') or 'off'}, "
+            f"health checks={settings_dict['CONN_HEALTH_CHECKS']}"
+        )
+
+        fresh = self._run(self._fresh_request, alias, options)
+        configured = self._run(self._configured_request, alias, options)
+        self._report('connect per request', fresh)
+        self._report('configured', configured)
+        self.stdout.write(
+            f"p99 saved: {(percentile(fresh, 0.99) - percentile(configured, 0.99)) * 1000:.2f} ms"
+        )
+        for gauge in pool_gauges():
+            if gauge['labels']['alias'] == alias:
+                self.stdout.write(f"  {gauge['name']}: {gauge['value']}")
+
+    def _run(self, request, alias, options):
+        samples = []
+        lock = threading.Lock()
+
+        def worker():
+            timings = []
+            for _ in range(options['requests']):
+                started = time.perf_counter()
+                request(alias)
+                timings.append(time.perf_counter() - started)
+            connections[alias].close()
+            with lock:
+                samples.extend(timings)
+
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return samples
+
+    def _fresh_request(self, alias):
+        """What every request paid before: open a connection, query, close"""
+        wrapper = connections[alias]
+        conn = wrapper.Database.connect(**wrapper.get_connection_params())
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+        finally:
+            conn.close()
+
+    def _configured_request(self, alias):
+        """A request through Django's lifecycle with the configured settings"""
+        signals.request_started.send(sender=self.__class__)
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+        finally:
+            signals.request_finished.send(sender=self.__class__)
+
+    def _report(self, label, samples):
+        self.stdout.write(
+            f"{label}: {len(samples)} requests, "
+            f"p50 {statistics.median(samples) * 1000:.2f} ms, "
+            f"p95 {percentile(samples, 0.95) * 1000:.2f} ms, "
+            f"p99 {percentile(samples, 0.99) * 1000:.2f} ms, "
+            f"max {max(samples) * 1000:.2f} ms"
+        )
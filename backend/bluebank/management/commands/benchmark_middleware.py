@@ -0,0 +1,92 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.models import User
+from .benchmark_connections import percentile
+
+DISPATCHER = 'bluebank.middleware.PathMiddlewareDispatcher'
+
+# Throttle buckets would run out long before the benchmark does
+NO_THROTTLE_CACHE = 'benchmark-no-throttle'
+
+ROUND = 100
+
+
+class Command(BaseCommand):
+    help = 'Compare API request latency through the full middleware stack vs the lean /api/ stack'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per stack')
+        parser.add_argument('--path', default='/api/accounts/summary/')
+        parser.add_argument('--user', help='Email of the user to authenticate as (default: first active user)')
+        parser.add_argument('--host', default='localhost', help='Host header; must be in ALLOWED_HOSTS')
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(is_active=True).order_by('id')
+        if options['user']:
+            users = users.filter(email=options['user'])
+        user = users.first()
+        if user is None:
+            raise CommandError('No active user to authenticate as')
+        if DISPATCHER not in settings.MIDDLEWARE:
+            raise CommandError(f'{DISPATCHER} is not in MIDDLEWARE; there is no lean stack to compare')
+
+        index = settings.MIDDLEWARE.index(DISPATCHER)
+        stacks = {
+            # What every request ran before: the browser stack listed in place
+            'full': settings.MIDDLEWARE[:index] + settings.BROWSER_MIDDLEWARE + settings.MIDDLEWARE[index + 1:],
+            'lean': settings.MIDDLEWARE,
+        }
+        caches = {**settings.CACHES, NO_THROTTLE_CACHE: {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(user)}', 'HTTP_HOST': options['host']}
+        self.stdout.write(f"GET {options['path']} as {user.email}, {options['requests']} requests per stack")
+
+        clients = {}
+        samples = {name: [] for name in stacks}
+        with override_settings(CACHES=caches, THROTTLE_CACHE=NO_THROTTLE_CACHE):
+            for name, middleware in stacks.items():
+                # A client loads its middleware chain on its first request
+                with override_settings(MIDDLEWARE=middleware):
+                    clients[name] = Client()
+                    self._warm_up(clients[name], options['path'], headers, options['requests'])
+            # Alternate the stacks in rounds so drift hits both alike
+            rounds = max(1, options['requests'] // ROUND)
+            for number in range(rounds):
+                order = list(clients) if number % 2 else list(reversed(clients))
+                for name in order:
+                    samples[name] += self._run(clients[name], options['path'], headers, ROUND)
+
+        for name, timings in samples.items():
+            self._report(name, timings)
+        saved = statistics.median(samples['full']) - statistics.median(samples['lean'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Lean stack saves {saved * 1_000_000:.0f} us per request at p50 "
+            f"({saved / statistics.median(samples['full']):.1%})"
+        ))
+
+    def _warm_up(self, client, path, headers, count):
+        for _ in range(max(10, count // 10)):
+            response = client.get(path, secure=True, **headers)
+        if response.status_code != 200:
+            raise CommandError(f'GET {path} returned {response.status_code}')
+
+    def _run(self, client, path, headers, count):
+        timings = []
+        for _ in range(count):
+            started = time.perf_counter()
+            client.get(path, secure=True, **headers)
+            timings.append(time.perf_counter() - started)
+        return timings
+
+    def _report(self, label, samples):
+        self.stdout.write(
+            f"{label}: p50 {statistics.median(samples) * 1000:.3f} ms, "
+            f"p95 {percentile(samples, 0.95) * 1000:.3f} ms, "
+            f"p99 {percentile(samples, 0.99) * 1000:.3f} ms, "
+            f"mean {statistics.fmean(samples) * 1000:.3f} ms"
+        )
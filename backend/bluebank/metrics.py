@@ -0,0 +1,63 @@
+"""In-process counters, timers and gauges, exposed to staff at /api/metrics/.
+
+Values are per worker process; scrape each worker (or sum across them)
+for fleet-wide numbers.
+"""
+import threading
+from collections import defaultdict
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_timers = {}
+_collectors = []
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def incr(name, value=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] += value
+
+
+def observe(name, value, **labels):
+    """Record a duration (or any sample) for ``name``"""
+    key = _key(name, labels)
+    with _lock:
+        stats = _timers.get(key)
+        if stats is None:
+            stats = _timers[key] = {'count': 0, 'sum': 0.0, 'max': 0.0}
+        stats['count'] += 1
+        stats['sum'] += value
+        if value > stats['max']:
+            stats['max'] = value
+
+
+def register_collector(collector):
+    """Add a callable returning gauges ({'name', 'labels', 'value'} dicts) sampled on every snapshot"""
+    with _lock:
+        if collector not in _collectors:
+            _collectors.append(collector)
+
+
+def snapshot():
+    with _lock:
+        counters = [
+            {'name': name, 'labels': dict(labels), 'value': value}
+            for (name, labels), value in sorted(_counters.items())
+        ]
+        timers = [
+            {'name': name, 'labels': dict(labels), **stats}
+            for (name, labels), stats in sorted(_timers.items())
+        ]
+        collectors = list(_collectors)
+    gauges = [gauge for collector in collectors for gauge in collector()]
+    return {'counters': counters, 'timers': timers, 'gauges': gauges}
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _timers.clear()
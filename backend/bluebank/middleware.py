@@ -0,0 +1,290 @@
+from django.conf import settings
+from django.core import checks
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
+from django.db import DatabaseError, InterfaceError
+from django.utils.cache import patch_vary_headers
+from django.utils.module_loading import import_string
+from django.utils.text import compress_string
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import db_router, metrics, sharding
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def jwt_user_id(request):
+    """Return the user id from a valid Bearer access token, without a DB query"""
+    parts = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(parts) != 2 or parts[0] not in jwt_settings.AUTH_HEADER_TYPES:
+        return None
+    try:
+        return AccessToken(parts[1]).get(jwt_settings.USER_ID_CLAIM)
+    except TokenError:
+        return None
+
+
+class PathMiddlewareDispatcher:
+    """Run BROWSER_MIDDLEWARE except for requests under LEAN_MIDDLEWARE_PATHS.
+
+    The browser stack is loaded the way Django loads MIDDLEWARE, and its
+    process_view, process_exception and process_template_response hooks
+    run for the requests that went through it, so admin and static pages
+    behave exactly as if the stack were listed in MIDDLEWARE. /api/
+    requests skip straight to the next middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.lean_paths = tuple(settings.LEAN_MIDDLEWARE_PATHS)
+        self.view_middleware = []
+        self.template_response_middleware = []
+        self.exception_middleware = []
+
+        handler = get_response
+        for middleware_path in reversed(settings.BROWSER_MIDDLEWARE):
+            try:
+                instance = import_string(middleware_path)(handler)
+            except MiddlewareNotUsed:
+                continue
+            if hasattr(instance, 'process_view'):
+                self.view_middleware.insert(0, instance.process_view)
+            if hasattr(instance, 'process_template_response'):
+                self.template_response_middleware.append(instance.process_template_response)
+            if hasattr(instance, 'process_exception'):
+                self.exception_middleware.append(instance.process_exception)
+            handler = convert_exception_to_response(instance)
+        self.browser_handler = handler
+
+    def is_lean(self, request):
+        return request.path.startswith(self.lean_paths)
+
+    def __call__(self, request):
+        if self.is_lean(request):
+            return self.get_response(request)
+        return self.browser_handler(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if self.is_lean(request):
+            return None
+        for process_view in self.view_middleware:
+            response = process_view(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
+
+    def process_template_response(self, request, response):
+        if self.is_lean(request):
+            return response
+        for process_template_response in self.template_response_middleware:
+            response = process_template_response(request, response)
+        return response
+
+    def process_exception(self, request, exception):
+        if self.is_lean(request):
+            return None
+        for process_exception in self.exception_middleware:
+            response = process_exception(request, exception)
+            if response is not None:
+                return response
+        return None
+
+
+# What admin.E408-E410 look for in MIDDLEWARE; those checks are silenced
+# because the middleware sits in BROWSER_MIDDLEWARE instead
+ADMIN_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+]
+
+
+def check_browser_middleware(app_configs, **kwargs):
+    if 'bluebank.middleware.PathMiddlewareDispatcher' in settings.MIDDLEWARE:
+        stack = list(settings.MIDDLEWARE) + list(settings.BROWSER_MIDDLEWARE)
+    else:
+        stack = list(settings.MIDDLEWARE)
+    return [
+        checks.Error(f"'{path}' must be in MIDDLEWARE or BROWSER_MIDDLEWARE for the admin", id='bluebank.E001')
+        for path in ADMIN_MIDDLEWARE if path not in stack
+    ]
+
+
+class ReplicaRoutingMiddleware:
+    """Route safe /api/ requests to a read replica.
+
+    Users who just made a successful write are pinned to the primary for
+    REPLICA_PIN_SECONDS so they read their own writes. A request that fails
+    on a replica with a database error is retried once on the primary and
+    the replica is skipped for REPLICA_RETRY_SECONDS.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = bool(db_router.replica_aliases())
+
+    def __call__(self, request):
+        if not self.enabled or not request.path.startswith('/api/'):
+            return self.get_response(request)
+
+        user_id = jwt_user_id(request)
+        alias = None
+        if request.method in SAFE_METHODS and not db_router.is_pinned(user_id):
+            alias = db_router.choose_replica()
+
+        token = db_router.set_read_alias(alias)
+        try:
+            response = self.get_response(request)
+        finally:
+            db_router.reset_read_alias(token)
+
+        if request.method not in SAFE_METHODS and user_id is not None and response.status_code < 400:
+            db_router.pin_to_primary(user_id)
+        return response
+
+    def process_exception(self, request, exception):
+        alias = db_router.get_read_alias()
+        if (
+            alias == db_router.PRIMARY
+            or request.method not in SAFE_METHODS
+            or not isinstance(exception, (DatabaseError, InterfaceError))
+        ):
+            return None
+
+        db_router.mark_replica_down(alias)
+        db_router.set_read_alias(db_router.PRIMARY)
+        match = request.resolver_match
+        return match.func(request, *match.args, **match.kwargs)
+
+
+class ShardRoutingMiddleware:
+    """Select the shard sharded models are read from and written to.
+
+    /api/ requests use the authenticated user's home shard, resolved from
+    the JWT without touching the user table (or request.user, where the
+    browser stack authenticated the request). Admin pages work on one
+    shard at a time: the one picked with ``?shard=`` (the shard list filter),
+    remembered in the session, or the first.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = sharding.enabled()
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+        if request.path.startswith('/api/'):
+            shard = self.user_shard(request)
+        elif request.path.startswith('/admin/') and request.user.is_staff:
+            shard = self.admin_shard(request)
+        else:
+            shard = None
+        if shard is None:
+            return self.get_response(request)
+        with sharding.use_shard(shard):
+            return self.get_response(request)
+
+    def user_shard(self, request):
+        user_id = jwt_user_id(request)
+        user = getattr(request, 'user', None)
+        if user_id is None and user is not None and user.is_authenticated:
+            user_id = user.pk
+        return sharding.shard_for_user(user_id) if user_id is not None else None
+
+    def admin_shard(self, request):
+        aliases = sharding.shard_aliases()
+        shard = request.GET.get(sharding.ADMIN_PARAMETER)
+        if shard in aliases:
+            request.session[sharding.ADMIN_SESSION_KEY] = shard
+            return shard
+        shard = request.session.get(sharding.ADMIN_SESSION_KEY)
+        return shard if shard in aliases else aliases[0]
+
+
+def accepted_encodings(header):
+    """Parse Accept-Encoding into {coding: q}, dropping codings with q=0"""
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if q > 0:
+            accepted[coding] = q
+        else:
+            accepted.pop(coding, None)
+    return accepted
+
+
+class APICompressionMiddleware:
+    """Compress /api/ responses with brotli or gzip, as the client accepts.
+
+    Only responses of at least API_COMPRESSION_MIN_SIZE bytes are
+    compressed; streaming responses (event streams, statement downloads)
+    are left alone. /api/auth/ responses carry tokens and are never
+    compressed, so a compression oracle (BREACH) has nothing to probe.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = settings.API_COMPRESSION_MIN_SIZE
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            not request.path.startswith('/api/')
+            or request.path.startswith('/api/auth/')
+            or response.streaming
+            or response.has_header('Content-Encoding')
+            or len(response.content) < self.min_size
+        ):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = self.negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        content = response.content
+        if encoding == 'br':
+            compressed = brotli.compress(content, quality=settings.API_BROTLI_QUALITY)
+        else:
+            compressed = compress_string(content)
+        if len(compressed) >= len(content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        # The entity changed, so a strong ETag no longer applies
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        metrics.incr('http.compressed_responses', encoding=encoding)
+        metrics.incr('http.compression_bytes_saved', len(content) - len(compressed), encoding=encoding)
+        return response
+
+    def negotiate(self, header):
+        accepted = accepted_encodings(header)
+        wildcard = accepted.get('*', 0)
+        candidates = [
+            (accepted.get(coding, wildcard), preference, coding)
+            for preference, coding in enumerate(('gzip', 'br'))
+            if coding == 'gzip' or brotli is not None
+        ]
+        q, _, coding = max(candidates)
+        return coding if q > 0 else None
@@ -0,0 +1,228 @@
+"""On-demand request profiling.
+
+``ProfilingMiddleware`` profiles an /api/ request when it carries an
+``X-Profile`` header holding a token from /api/profiles/token/ (staff
+only, valid for PROFILE_TOKEN_MAX_AGE seconds), or as one in every
+PROFILE_SAMPLE_RATE requests when that is set. A profiled request is
+sampled by a background thread every PROFILE_INTERVAL_MS, and its SQL
+statements are timed (without parameters, which may hold customer data).
+The result lands in PROFILE_DIR as ``<id>.json`` (view, timing, SQL) and
+``<id>.folded`` - folded stacks for flamegraph.pl or speedscope - and the
+response carries ``X-Profile-Id``. Untriggered requests pay one header
+lookup.
+"""
+import itertools
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from collections import Counter
+
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+from django.utils import timezone
+
+from . import metrics
+
+HEADER = 'X-Profile'
+SALT = 'bluebank.profiling'
+PROFILE_ID = re.compile(r'^[0-9T]+-[0-9a-f]{8}$')
+
+
+def issue_token(user):
+    return signing.dumps({'user': user.pk}, salt=SALT)
+
+
+def verify_token(token):
+    """Return the token's payload, or None if it is forged or expired"""
+    try:
+        return signing.loads(token, salt=SALT, max_age=settings.PROFILE_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+
+
+class StackSampler:
+    """Count the stacks of one thread, sampled from a background thread"""
+
+    # The switch interval is process-wide: the first sampler to start saves
+    # it and the last one to stop restores it
+    _switch_lock = threading.Lock()
+    _active = Counter()
+    _saved_switch_interval = None
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='bluebank-profiler', daemon=True)
+
+    def __enter__(self):
+        # The sampler needs the GIL on time, so hand it over more often than
+        # the default 5ms while profiling
+        with self._switch_lock:
+            cls = type(self)
+            if not cls._active:
+                cls._saved_switch_interval = sys.getswitchinterval()
+            cls._active[self.interval] += 1
+            cls._apply_switch_interval()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        with self._switch_lock:
+            cls = type(self)
+            cls._active[self.interval] -= 1
+            if not cls._active[self.interval]:
+                del cls._active[self.interval]
+            cls._apply_switch_interval()
+
+    @classmethod
+    def _apply_switch_interval(cls):
+        if cls._active:
+            sys.setswitchinterval(min(cls._saved_switch_interval, min(cls._active) / 4))
+        else:
+            sys.setswitchinterval(cls._saved_switch_interval)
+            cls._saved_switch_interval = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def folded(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class QueryRecorder:
+    """``execute_wrapper`` timing every statement run on a connection"""
+
+    def __init__(self):
+        self.queries = []
+
+    def wrapper(self, alias):
+        def record(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                self.queries.append({
+                    'alias': alias,
+                    'sql': sql[:2000],
+                    'many': many,
+                    'ms': round((time.perf_counter() - started) * 1000, 3),
+                })
+        return record
+
+
+def _path(profile_id, suffix):
+    return os.path.join(settings.PROFILE_DIR, f'{profile_id}.{suffix}')
+
+
+def save(record, folded):
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    with open(_path(record['id'], 'folded'), 'w') as f:
+        f.write(folded)
+    with open(_path(record['id'], 'json'), 'w') as f:
+        json.dump(record, f)
+    for stale in list_ids()[settings.PROFILE_KEEP:]:
+        for suffix in ('json', 'folded'):
+            try:
+                os.remove(_path(stale, suffix))
+            except FileNotFoundError:
+                pass
+
+
+def list_ids():
+    """Stored profile ids, newest first"""
+    try:
+        names = os.listdir(settings.PROFILE_DIR)
+    except FileNotFoundError:
+        return []
+    return sorted((name[:-5] for name in names if name.endswith('.json')), reverse=True)
+
+
+def load(profile_id):
+    """Return the stored record, or None"""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    try:
+        with open(_path(profile_id, 'json')) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def folded_path(profile_id):
+    if not PROFILE_ID.match(profile_id) or not os.path.exists(_path(profile_id, 'folded')):
+        return None
+    return _path(profile_id, 'folded')
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILE_SAMPLE_RATE
+        self._requests = itertools.count(1)
+
+    def __call__(self, request):
+        token = request.META.get('HTTP_X_PROFILE')
+        if token is not None:
+            payload = verify_token(token)
+            if payload is None:
+                metrics.incr('profiling.rejected_tokens')
+                return self.get_response(request)
+            return self.profile(request, 'header', payload['user'])
+        if (
+            self.sample_rate
+            and request.path.startswith('/api/')
+            and next(self._requests) % self.sample_rate == 0
+        ):
+            return self.profile(request, 'sample', None)
+        return self.get_response(request)
+
+    def profile(self, request, trigger, requested_by):
+        recorder = QueryRecorder()
+        sampler = StackSampler(threading.get_ident(), settings.PROFILE_INTERVAL_MS / 1000)
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder.wrapper(connection.alias)))
+            with sampler:
+                response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        match = request.resolver_match
+        record = {
+            'id': f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{uuid.uuid4().hex[:8]}",
+            'created_at': timezone.now().isoformat(),
+            'method': request.method,
+            'path': request.path,
+            'view': (match.view_name or match._func_path) if match else None,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 3),
+            'trigger': trigger,
+            'requested_by': requested_by,
+            'samples': sum(sampler.stacks.values()),
+            'interval_ms': settings.PROFILE_INTERVAL_MS,
+            'sql_count': len(recorder.queries),
+            'sql_ms': round(sum(query['ms'] for query in recorder.queries), 3),
+            'queries': recorder.queries,
+        }
+        save(record, sampler.folded())
+        metrics.incr('profiling.captured', trigger=trigger)
+        response['X-Profile-Id'] = record['id']
+        return response
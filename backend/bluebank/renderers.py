@@ -0,0 +1,46 @@
+"""JSON rendering for the API.
+
+``FastJSONRenderer`` encodes with orjson when it is installed and falls
+back to DRF's stdlib ``JSONRenderer`` otherwise. Anything orjson does not
+encode natively - Decimal, lazy translation strings, and datetimes, which
+are passed through so UTC keeps DRF's ``Z`` suffix - goes through DRF's
+own ``JSONEncoder.default``, so both paths produce the same bytes for
+strings, integers, Decimals, datetimes and nested containers.
+
+Floats are the exception. orjson writes exponents without a sign or
+padding (``1e16``, ``1e-7`` where the stdlib gives ``1e+16``, ``1e-07``),
+and NaN and infinities become ``null`` where DRF's strict encoder raises.
+The API serializes money as Decimal strings; the float values it does
+return (timings in /api/metrics/ and profiles) are finite.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_default = encoders.JSONEncoder().default
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or data is None or self.ensure_ascii or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            # e.g. integers wider than 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Keep DRF's escaping of U+2028/U+2029 so output stays valid JavaScript
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
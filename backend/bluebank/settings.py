@@ -36,6 +36,7 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework_simplejwt',
     'corsheaders',
+    'bluebank',
     'users',
     'accounts',
     'transactions',
@@ -44,6 +45,18 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'bluebank.profiling.ProfilingMiddleware',
+    'bluebank.middleware.APICompressionMiddleware',
+    'bluebank.middleware.PathMiddlewareDispatcher',
+    'bluebank.middleware.ReplicaRoutingMiddleware',
+    'bluebank.middleware.ShardRoutingMiddleware',
+]
+
+# Run by PathMiddlewareDispatcher, in its place in MIDDLEWARE, for every
+# request except those under LEAN_MIDDLEWARE_PATHS. JWT-authenticated
+# JSON endpoints need no sessions, CSRF, messages or clickjacking headers;
+# set LEAN_MIDDLEWARE_PATHS empty to run the full stack everywhere
+BROWSER_MIDDLEWARE = [
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -52,13 +65,17 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
+LEAN_MIDDLEWARE_PATHS = config('LEAN_MIDDLEWARE_PATHS', default='/api/', cast=Csv())
+
+# The admin checks only look in MIDDLEWARE; bluebank.E001 checks both lists
+SILENCED_SYSTEM_CHECKS = ['admin.E408', 'admin.E409', 'admin.E410']
 
 ROOT_URLCONF = 'bluebank.urls'
 
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [],
+        'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
@@ -73,13 +90,89 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'bluebank.wsgi.application'
 
-# Database - use DATABASE_URL environment variable when available (Render/Postgres)
-DATABASES = {
-    'default': dj_database_url.parse(
-        config('DATABASE_URL', default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}"),
+# Database connections (PostgreSQL)
+# DB_POOL: per-process psycopg pool; connections are checked out per request
+#   and returned afterwards instead of idling in every worker.
+# DB_HEALTH_CHECKS: verify a connection before use (on pool checkout, or at
+#   request start for persistent connections), so a failover costs a
+#   reconnect instead of failed requests.
+# DB_PGBOUNCER: behind PgBouncer in transaction pooling mode - no server-side
+#   cursors (and psycopg's prepared statements stay disabled). The
+#   PostgresNotifyBroker listener needs session state (LISTEN), so point it
+#   at a session-mode pool or the server directly.
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+DB_POOL_MIN_SIZE = config('DB_POOL_MIN_SIZE', default=2, cast=int)
+DB_POOL_MAX_SIZE = config('DB_POOL_MAX_SIZE', default=10, cast=int)
+DB_POOL_TIMEOUT = config('DB_POOL_TIMEOUT', default=10, cast=float)
+DB_POOL_MAX_IDLE = config('DB_POOL_MAX_IDLE', default=300, cast=float)
+DB_HEALTH_CHECKS = config('DB_HEALTH_CHECKS', default=True, cast=bool)
+DB_PGBOUNCER = config('DB_PGBOUNCER', default=False, cast=bool)
+
+
+def database(url):
+    settings_dict = dj_database_url.parse(
+        url,
         conn_max_age=600,
+        conn_health_checks=DB_HEALTH_CHECKS,
         ssl_require=config('DB_SSL', default=False, cast=bool)
     )
+    if settings_dict['ENGINE'] == 'django.db.backends.postgresql':
+        if DB_PGBOUNCER:
+            settings_dict['DISABLE_SERVER_SIDE_CURSORS'] = True
+        if DB_POOL:
+            # Pooled connections replace persistent ones
+            settings_dict['CONN_MAX_AGE'] = 0
+            settings_dict.setdefault('OPTIONS', {})['pool'] = {
+                'min_size': DB_POOL_MIN_SIZE,
+                'max_size': DB_POOL_MAX_SIZE,
+                'timeout': DB_POOL_TIMEOUT,
+                'max_idle': DB_POOL_MAX_IDLE,
+            }
+    return settings_dict
+
+
+# Database - use DATABASE_URL environment variable when available (Render/Postgres)
+DATABASES = {
+    'default': database(config('DATABASE_URL', default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}"))
+}
+
+# Read replicas - comma-separated REPLICA_DATABASE_URL, exposed as the
+# aliases replica_1, replica_2, ... and used for safe /api/ requests
+REPLICA_DATABASE_URLS = config('REPLICA_DATABASE_URL', default='', cast=Csv())
+for index, url in enumerate(REPLICA_DATABASE_URLS, start=1):
+    DATABASES[f'replica_{index}'] = database(url)
+    DATABASES[f'replica_{index}']['TEST'] = {'MIRROR': 'default'}
+
+# Shards - comma-separated SHARD_DATABASE_URLS, exposed as shard_0, shard_1,
+# ... and holding the accounts and transactions apps (see bluebank/sharding.py).
+# SHARD_MAP pins branches to shards (BLUE001=shard_0,...); other branches
+# are hashed. Changing either moves users, so only add shards with a migration.
+SHARD_DATABASE_URLS = config('SHARD_DATABASE_URLS', default='', cast=Csv())
+for index, url in enumerate(SHARD_DATABASE_URLS):
+    DATABASES[f'shard_{index}'] = database(url)
+# The bank's branches. Sign-ups may pick their home branch from these;
+# otherwise one is assigned by a hash of the email (see sharding.assign_branch)
+BRANCH_CODES = config('BRANCH_CODES', default='BLUE001,BLUE002,BLUE003,BLUE004,BLUE005', cast=Csv())
+SHARD_MAP = dict(entry.split('=', 1) for entry in config('SHARD_MAP', default='', cast=Csv()))
+SHARD_LOCATE_CACHE_SECONDS = config('SHARD_LOCATE_CACHE_SECONDS', default=300, cast=int)
+# Seconds before recover_transfers picks up a cross-shard transfer still in doubt
+SHARD_TRANSFER_RECOVERY_SECONDS = config('SHARD_TRANSFER_RECOVERY_SECONDS', default=60, cast=int)
+
+DATABASE_ROUTERS = ['bluebank.sharding.ShardRouter', 'bluebank.db_router.ReadReplicaRouter']
+
+# Seconds a user reads from the primary after a write, and seconds a failed
+# replica is skipped before being retried
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=15, cast=int)
+REPLICA_RETRY_SECONDS = config('REPLICA_RETRY_SECONDS', default=30, cast=int)
+
+# Cache - shared state such as read-your-writes pins and throttle buckets.
+# Use a shared backend (e.g. django.core.cache.backends.redis.RedisCache)
+# with several workers.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='bluebank'),
+    }
 }
 
 # Alternative SQLite configuration (comment out when using MySQL)
@@ -134,10 +227,50 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'bluebank.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'bluebank.throttling.UserTokenBucketThrottle',
+        'bluebank.throttling.IPTokenBucketThrottle',
+    ],
+    # <scope>_user / <scope>_ip token buckets, see bluebank/throttling.py
+    'DEFAULT_THROTTLE_RATES': {
+        'login_user': config('THROTTLE_LOGIN_USER', default='5/min'),
+        'login_ip': config('THROTTLE_LOGIN_IP', default='20/min'),
+        'register_ip': config('THROTTLE_REGISTER_IP', default='10/hour'),
+        'transfer_user': config('THROTTLE_TRANSFER_USER', default='10/min'),
+        'transfer_ip': config('THROTTLE_TRANSFER_IP', default='30/min'),
+        'read_user': config('THROTTLE_READ_USER', default='300/min'),
+        'read_ip': config('THROTTLE_READ_IP', default='600/min'),
+        'write_user': config('THROTTLE_WRITE_USER', default='60/min'),
+        'write_ip': config('THROTTLE_WRITE_IP', default='120/min'),
+    },
+    # Proxies in front of the app; the client IP is taken that many hops back
+    # in X-Forwarded-For. 0 ignores the header, which clients can forge.
+    'NUM_PROXIES': config('NUM_PROXIES', default=0, cast=int),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20
 }
 
+# Cache alias holding throttle buckets; needs atomic incr (Redis/Memcached)
+# once several workers share it
+THROTTLE_CACHE = config('THROTTLE_CACHE', default='default')
+
+# /api/ responses at least this large are gzip/brotli compressed when accepted
+API_COMPRESSION_MIN_SIZE = config('API_COMPRESSION_MIN_SIZE', default=1024, cast=int)
+API_BROTLI_QUALITY = config('API_BROTLI_QUALITY', default=5, cast=int)
+
+# Request profiling (bluebank/profiling.py): profiles land in PROFILE_DIR,
+# the newest PROFILE_KEEP are kept. PROFILE_SAMPLE_RATE=N also profiles
+# one in every N /api/ requests; 0 leaves it to X-Profile tokens.
+PROFILE_DIR = config('PROFILE_DIR', default=os.path.join(BASE_DIR, 'profiles'))
+PROFILE_KEEP = config('PROFILE_KEEP', default=200, cast=int)
+PROFILE_SAMPLE_RATE = config('PROFILE_SAMPLE_RATE', default=0, cast=int)
+PROFILE_INTERVAL_MS = config('PROFILE_INTERVAL_MS', default=2, cast=float)
+PROFILE_TOKEN_MAX_AGE = config('PROFILE_TOKEN_MAX_AGE', default=3600, cast=int)
+
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
@@ -152,3 +285,43 @@ CORS_ALLOW_CREDENTIALS = config('CORS_ALLOW_CREDENTIALS', default=True, cast=boo
 
 # Custom User Model
 AUTH_USER_MODEL = 'users.User'
+
+# Monthly statement generation
+STATEMENT_WORKERS = config('STATEMENT_WORKERS', default=4, cast=int)
+STATEMENT_CHUNK_SIZE = config('STATEMENT_CHUNK_SIZE', default=2000, cast=int)
+
+# Columnar analytics export (export_transactions): rows read per primary-key
+# chunk and rows buffered before part files are written
+EXPORT_DIR = config('EXPORT_DIR', default=os.path.join(BASE_DIR, 'exports'))
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=10000, cast=int)
+EXPORT_FILE_ROWS = config('EXPORT_FILE_ROWS', default=100000, cast=int)
+
+# Nightly balance reconciliation (reconcile_balances)
+RECONCILE_WORKERS = config('RECONCILE_WORKERS', default=4, cast=int)
+RECONCILE_RANGE_SIZE = config('RECONCILE_RANGE_SIZE', default=10000, cast=int)
+
+# IFSC directory: compiled from IFSC_DIRECTORY_SOURCE on first use and
+# re-mapped by each worker within IFSC_RELOAD_INTERVAL seconds of a reload
+IFSC_DIRECTORY_SOURCE = config('IFSC_DIRECTORY_SOURCE', default=os.path.join(BASE_DIR, 'accounts', 'data', 'ifsc.csv'))
+IFSC_DIRECTORY_PATH = config('IFSC_DIRECTORY_PATH', default=os.path.join(BASE_DIR, 'ifsc_directory.bin'))
+IFSC_RELOAD_INTERVAL = config('IFSC_RELOAD_INTERVAL', default=30, cast=int)
+
+# Admin changelists count exactly up to this many rows, then use estimates
+ADMIN_EXACT_COUNT_LIMIT = config('ADMIN_EXACT_COUNT_LIMIT', default=10000, cast=int)
+
+# Live updates at /api/events/, served by a separate ASGI process
+# (bluebank.asgi:events_application, SERVER=events in entrypoint.sh) that the
+# proxy routes /api/events/ to. Use transactions.events.PostgresNotifyBroker
+# so events published by the WSGI workers reach it. Browsers open the stream
+# with a ticket from /api/events/ticket/ that lasts EVENTS_TICKET_MAX_AGE.
+EVENTS_BACKEND = config('EVENTS_BACKEND', default='transactions.events.InProcessBroker')
+EVENTS_HEARTBEAT_SECONDS = config('EVENTS_HEARTBEAT_SECONDS', default=15, cast=int)
+EVENTS_REPLAY_SIZE = config('EVENTS_REPLAY_SIZE', default=10000, cast=int)
+EVENTS_RETRY_MS = config('EVENTS_RETRY_MS', default=3000, cast=int)
+EVENTS_TICKET_MAX_AGE = config('EVENTS_TICKET_MAX_AGE', default=30, cast=int)
+
+# Change feed at /api/feed/ - consumers stop at a missing seq until its
+# transaction can no longer commit: once every transaction open when the next
+# event was written has ended (PostgreSQL, MySQL; SQLite has one writer).
+# This allows for clock skew between the app servers and the database.
+OUTBOX_SETTLE_SECONDS = config('OUTBOX_SETTLE_SECONDS', default=1, cast=float)
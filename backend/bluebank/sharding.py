@@ -0,0 +1,194 @@
+"""Horizontal sharding by branch.
+
+With SHARD_DATABASE_URLS set, the ``accounts`` and ``transactions`` apps
+live on the shard databases ``shard_0`` .. ``shard_<n-1>`` while users,
+auth and sessions stay on ``default``, which doubles as the directory.
+Every user has a home branch (``User.branch_code``); SHARD_MAP pins
+branches to shards and any other branch is hashed, so all of a user's
+accounts, beneficiaries and transactions sit together on one shard. The
+home branch is chosen at registration from BRANCH_CODES, or assigned by
+``assign_branch`` so new users spread evenly over the branches - and over
+the shards, as long as SHARD_MAP gives each shard a similar share of them.
+
+Sharded models are routed to the shard selected for the current context:
+``ShardRoutingMiddleware`` selects the authenticated user's shard for
+each request, and code outside a request - commands, admin, reporting -
+picks one with ``use_shard`` or walks them all with ``each_shard``;
+bank-wide reports (``analytics.bank_spending``) merge ``fan_out`` results. A sharded query with no shard selected raises
+``ShardNotSelected`` rather than silently reading the wrong database.
+
+Without SHARD_DATABASE_URLS sharding is off and everything stays on
+``default`` as before.
+"""
+import zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+
+SHARDED_APPS = frozenset({'accounts', 'transactions'})
+
+# Admin shard selection: query parameter and session key
+ADMIN_PARAMETER = 'shard'
+ADMIN_SESSION_KEY = 'admin_shard'
+
+_shard = ContextVar('bluebank_shard', default=None)
+
+
+class ShardNotSelected(ImproperlyConfigured):
+    pass
+
+
+def shard_aliases():
+    return [alias for alias in connections if alias.startswith('shard_')]
+
+
+def enabled():
+    return bool(settings.SHARD_DATABASE_URLS)
+
+
+def is_sharded(model):
+    return model._meta.app_label in SHARDED_APPS
+
+
+def shard_for_branch(branch_code):
+    shard = settings.SHARD_MAP.get(branch_code)
+    if shard is not None:
+        return shard
+    aliases = shard_aliases()
+    return aliases[zlib.crc32(branch_code.encode()) % len(aliases)]
+
+
+def assign_branch(email):
+    """Home branch for a new user who did not pick one.
+
+    A hash of the email rather than a counter: even across branches, stable
+    for a retried registration, and nothing shared between workers.
+    """
+    branches = settings.BRANCH_CODES
+    return branches[zlib.crc32(email.strip().lower().encode()) % len(branches)]
+
+
+def _user_key(user_id):
+    return f'shard-user:{user_id}'
+
+
+def shard_for_user(user_id):
+    """Home shard of a user, cached since a user's branch does not change"""
+    shard = cache.get(_user_key(user_id))
+    if shard is None:
+        from users.models import User
+        branch = User.objects.filter(pk=user_id).values_list('branch_code', flat=True).first()
+        if branch is None:
+            return None
+        shard = shard_for_branch(branch)
+        cache.set(_user_key(user_id), shard, None)
+    return shard
+
+
+def current_shard():
+    return _shard.get()
+
+
+@contextmanager
+def use_shard(alias):
+    """Route sharded models to ``alias`` inside the block"""
+    token = _shard.set(alias)
+    try:
+        yield alias
+    finally:
+        _shard.reset(token)
+
+
+def each_shard(only=None):
+    """Yield every shard alias (or just ``only``) with it selected; just None when sharding is off"""
+    if not enabled():
+        yield None
+        return
+    if only is not None and only not in shard_aliases():
+        raise ValueError(f'Unknown shard {only!r}; expected one of {", ".join(shard_aliases())}')
+    for alias in [only] if only else shard_aliases():
+        with use_shard(alias):
+            yield alias
+
+
+def fan_out(function):
+    """Run ``function(alias)`` on every shard; return {alias: result}"""
+    return {alias: function(alias) for alias in each_shard()}
+
+
+def in_shard(shard, function, *args):
+    """Call ``function(*args)`` with ``shard`` selected; for process pool workers"""
+    if shard is None:
+        return function(*args)
+    with use_shard(shard):
+        return function(*args)
+
+
+def shard_index(alias):
+    """N for ``shard_N``; 0 for any other alias"""
+    return int(alias[len('shard_'):]) if alias and alias.startswith('shard_') else 0
+
+
+def _account_key(account_number):
+    return f'shard-account:{account_number}'
+
+
+def locate_account(account_number):
+    """Shard holding the active account ``account_number``, or None if no shard has it"""
+    from accounts.models import Account
+    shard = cache.get(_account_key(account_number))
+    if shard is not None:
+        return shard
+    # New numbers carry the shard they were opened on in digits 4-5; older
+    # ones may not, so that shard is only tried first
+    aliases = shard_aliases()
+    embedded = f'shard_{int(account_number[3:5])}' if account_number[3:5].isdigit() else None
+    if embedded in aliases:
+        aliases.remove(embedded)
+        aliases.insert(0, embedded)
+    for alias in aliases:
+        if Account.objects.using(alias).filter(account_number=account_number, status='ACTIVE').exists():
+            # Accounts never move between shards; only the status can change
+            cache.set(_account_key(account_number), alias, settings.SHARD_LOCATE_CACHE_SECONDS)
+            return alias
+    return None
+
+
+class ShardRouter:
+    def _route(self, model, hints):
+        if not is_sharded(model) or not enabled():
+            return None
+        instance = hints.get('instance')
+        db = instance._state.db if instance is not None else None
+        if db and db.startswith('shard_'):
+            # Related objects of a sharded instance live on its shard
+            return db
+        shard = _shard.get()
+        if shard is None:
+            raise ShardNotSelected(
+                f'No shard selected for {model._meta.label}; wrap the code in bluebank.sharding.use_shard()'
+            )
+        return shard
+
+    def db_for_read(self, model, **hints):
+        return self._route(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._route(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Accounts and beneficiaries point at users on the directory database
+        if enabled() and (is_sharded(obj1) or is_sharded(obj2)):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Shards carry the full schema so foreign keys resolve; only the
+        # sharded apps hold rows there
+        if db.startswith('shard_'):
+            return True
+        return None
@@ -0,0 +1,297 @@
+import sys
+import threading
+import uuid
+from datetime import date, datetime, timezone as dt_timezone
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock, skipIf
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import DatabaseError
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.Serializers import AccountSerializer
+from accounts.models import Account
+from transactions.Serializers import TransactionHistorySerializer, TransactionSerializer
+from transactions.admin import TransactionAdmin
+from transactions.models import Transaction
+from users.models import User
+from . import db_router, renderers, throttling
+from .middleware import PathMiddlewareDispatcher, ReplicaRoutingMiddleware, check_browser_middleware
+from .fast_serializers import values_serializer
+from .profiling import StackSampler
+from .renderers import FastJSONRenderer
+
+THROTTLE_CACHES = {
+    **settings.CACHES,
+    'throttle-test': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'throttle-test'},
+}
+
+
+def rest_framework(**overrides):
+    rates = {**settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], 'login_ip': '3/min', 'login_user': '100/min'}
+    return {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates, **overrides}
+
+
+@override_settings(CACHES=THROTTLE_CACHES, THROTTLE_CACHE='throttle-test')
+class TokenBucketTests(TestCase):
+    def setUp(self):
+        caches['throttle-test'].clear()
+
+    def test_bucket_allows_a_burst_then_waits_for_a_token(self):
+        capacity, step = throttling.parse_rate('3/min')
+        self.assertEqual((capacity, step), (3, 20 * throttling.SECOND))
+        for _ in range(3):
+            self.assertEqual(throttling.take('bucket', capacity, step), 0)
+        retry = throttling.take('bucket', capacity, step)
+        self.assertGreater(retry, 0)
+        self.assertLessEqual(retry, 20)
+
+    def test_refused_request_does_not_use_a_token(self):
+        capacity, step = throttling.parse_rate('1/min')
+        throttling.take('bucket', capacity, step)
+        first = throttling.take('bucket', capacity, step)
+        second = throttling.take('bucket', capacity, step)
+        self.assertAlmostEqual(first, second, delta=1)
+
+    def login(self, address, forwarded_for, email):
+        return self.client.post(
+            '/api/auth/login/', {'email': email, 'password': 'wrong'}, content_type='application/json',
+            secure=True, REMOTE_ADDR=address, HTTP_X_FORWARDED_FOR=forwarded_for,
+        )
+
+    @override_settings(REST_FRAMEWORK=rest_framework())
+    def test_forwarded_for_is_ignored_without_proxies(self):
+        statuses = [self.login('10.0.0.1', f'198.51.100.{n}', f'u{n}@example.com').status_code for n in range(4)]
+        self.assertEqual(statuses[:3], [400, 400, 400])
+        self.assertEqual(statuses[3], 429)
+
+    @override_settings(REST_FRAMEWORK=rest_framework(NUM_PROXIES=1))
+    def test_client_address_comes_from_the_trusted_proxy_hop(self):
+        statuses = [self.login('10.0.0.1', f'198.51.100.{n}', f'u{n}@example.com').status_code for n in range(4)]
+        self.assertNotIn(429, statuses)
+
+    @override_settings(DEBUG=False)
+    def test_check_warns_about_process_local_cache(self):
+        self.assertEqual([error.id for error in throttling.check_throttle_cache(None)], ['bluebank.W001'])
+
+    @override_settings(DEBUG=True)
+    def test_check_allows_local_cache_in_debug(self):
+        self.assertEqual(throttling.check_throttle_cache(None), [])
+
+
+class StackSamplerTests(TestCase):
+    def test_overlapping_samplers_restore_switch_interval_once_both_stop(self):
+        original = sys.getswitchinterval()
+        first = StackSampler(threading.get_ident(), 0.002).__enter__()
+        second = StackSampler(threading.get_ident(), 0.001).__enter__()
+        self.assertEqual(sys.getswitchinterval(), min(original, 0.00025))
+        first.__exit__(None, None, None)
+        self.assertEqual(sys.getswitchinterval(), min(original, 0.00025))
+        second.__exit__(None, None, None)
+        self.assertEqual(sys.getswitchinterval(), original)
+
+
+@mock.patch.object(db_router, 'replica_aliases', return_value=['replica_1'])
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        db_router._down_until.clear()
+        user = User.objects.create_user(username='reader', email='reader@example.com', password='unused')
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(user)}'}
+        self.factory = RequestFactory()
+
+    def middleware(self, status=200):
+        # The response body names the alias reads were routed to
+        return ReplicaRoutingMiddleware(lambda request: HttpResponse(db_router.get_read_alias(), status=status))
+
+    def test_safe_api_requests_read_from_a_replica(self, _):
+        response = self.middleware()(self.factory.get('/api/accounts/', **self.auth))
+        self.assertEqual(response.content, b'replica_1')
+        self.assertEqual(db_router.get_read_alias(), db_router.PRIMARY)
+
+    def test_other_requests_read_from_the_primary(self, _):
+        self.assertEqual(self.middleware()(self.factory.get('/admin/')).content, b'default')
+        self.assertEqual(self.middleware()(self.factory.post('/api/accounts/', **self.auth)).content, b'default')
+
+    def test_successful_write_pins_the_user_to_the_primary(self, _):
+        self.middleware(status=400)(self.factory.post('/api/accounts/', **self.auth))
+        self.assertEqual(self.middleware()(self.factory.get('/api/accounts/', **self.auth)).content, b'replica_1')
+        self.middleware(status=201)(self.factory.post('/api/accounts/', **self.auth))
+        self.assertEqual(self.middleware()(self.factory.get('/api/accounts/', **self.auth)).content, b'default')
+        # Other users are not pinned
+        self.assertEqual(self.middleware()(self.factory.get('/api/accounts/')).content, b'replica_1')
+
+    def test_replica_error_retries_on_the_primary(self, _):
+        middleware = self.middleware()
+        request = self.factory.get('/api/accounts/', **self.auth)
+        request.resolver_match = SimpleNamespace(
+            func=lambda request: HttpResponse(db_router.get_read_alias()), args=(), kwargs={}
+        )
+        token = db_router.set_read_alias('replica_1')
+        try:
+            response = middleware.process_exception(request, DatabaseError('replica went away'))
+        finally:
+            db_router.reset_read_alias(token)
+        self.assertEqual(response.content, b'default')
+        self.assertIsNone(db_router.choose_replica())
+
+    def test_writes_always_go_to_the_primary(self, _):
+        token = db_router.set_read_alias('replica_1')
+        try:
+            self.assertEqual(db_router.ReadReplicaRouter().db_for_write(User), db_router.PRIMARY)
+            self.assertEqual(db_router.ReadReplicaRouter().db_for_read(User), 'replica_1')
+        finally:
+            db_router.reset_read_alias(token)
+
+    @override_settings(DEBUG=False)
+    def test_check_needs_a_shared_pin_cache(self, _):
+        self.assertEqual([error.id for error in db_router.check_pin_cache(None)], ['bluebank.E002'])
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://cache'}}
+        with override_settings(CACHES=shared):
+            self.assertEqual(db_router.check_pin_cache(None), [])
+
+
+class FastJSONRendererTests(TestCase):
+    def render(self, data, renderer_class):
+        return renderer_class().render(data, 'application/json', {})
+
+    def test_matches_drf_for_api_values(self):
+        data = {
+            'amount': Decimal('1234.50'), 'created_at': datetime(2026, 1, 2, 3, 4, 5, 678000, tzinfo=dt_timezone.utc),
+            'date': date(2026, 1, 2), 'id': uuid.UUID(int=7), 'name': 'Café  ', 'missing': None,
+            'rows': [1, True, 0.25, {'nested': 'x'}],
+        }
+        self.assertEqual(self.render(data, FastJSONRenderer), self.render(data, JSONRenderer))
+
+    @skipIf(renderers.orjson is None, 'orjson is not installed')
+    def test_floats_differ_from_the_stdlib(self):
+        self.assertEqual(self.render([1e16, 1e-7], FastJSONRenderer), b'[1e16,1e-7]')
+        self.assertEqual(self.render([1e16, 1e-7], JSONRenderer), b'[1e+16,1e-07]')
+        self.assertEqual(self.render([float('nan'), float('inf')], FastJSONRenderer), b'[null,null]')
+        with self.assertRaises(ValueError):
+            self.render([float('nan')], JSONRenderer)
+
+
+class ValuesSerializerTests(TestCase):
+    """The .values() fast path renders exactly what the DRF serializer does"""
+
+    def setUp(self):
+        user = User.objects.create_user(username='values', email='values@example.com', password='unused')
+        self.account = Account.objects.create(user=user, balance=Decimal('1234.5'))
+        self.transactions = [
+            Transaction.objects.create(
+                from_account=self.account, amount=Decimal('12.5'), transaction_type='TRANSFER',
+                to_account_number=None, beneficiary_name=None, description='',
+            ),
+            Transaction.objects.create(
+                from_account=self.account, amount=Decimal('0.1'), transaction_type='DEPOSIT', status='COMPLETED',
+                to_account_number='501001234567', beneficiary_name='Café', description='Salary',
+                processed_at=datetime(2026, 3, 1, 18, 45, 0, 123456, tzinfo=dt_timezone.utc),
+            ),
+        ]
+
+    def assert_same_output(self, serializer_class, queryset):
+        expected = [dict(row) for row in serializer_class(queryset, many=True).data]
+        reader = values_serializer(serializer_class)
+        actual = reader.serialize(reader.values(queryset))
+        self.assertEqual(actual, expected)
+        self.assertEqual([list(row) for row in actual], [list(row) for row in expected])
+        self.assertEqual(
+            JSONRenderer().render(actual, 'application/json', {}),
+            JSONRenderer().render(expected, 'application/json', {}),
+        )
+
+    def test_transaction_serializers(self):
+        queryset = Transaction.objects.filter(from_account=self.account).order_by('id')
+        for serializer_class in (TransactionSerializer, TransactionHistorySerializer):
+            with self.subTest(serializer_class.__name__):
+                self.assert_same_output(serializer_class, queryset)
+
+    def test_account_serializer(self):
+        self.assert_same_output(AccountSerializer, Account.objects.filter(pk=self.account.pk))
+
+    @override_settings(TIME_ZONE='UTC')
+    def test_utc_datetimes_end_in_z(self):
+        queryset = Transaction.objects.filter(from_account=self.account).order_by('id')
+        self.assert_same_output(TransactionHistorySerializer, queryset)
+        reader = values_serializer(TransactionHistorySerializer)
+        self.assertTrue(reader.serialize(reader.values(queryset))[1]['processed_at'].endswith('.123456Z'))
+
+
+class KeysetChangeListTests(TestCase):
+    def setUp(self):
+        admin_user = User.objects.create_superuser(username='staff', email='staff@example.com', password='unused')
+        self.client.force_login(admin_user)
+        account = Account.objects.create(user=admin_user, balance=Decimal('10.00'))
+        self.ids = sorted((
+            Transaction.objects.create(from_account=account, amount=Decimal('1.00'), transaction_type='TRANSFER').pk
+            for _ in range(5)
+        ), reverse=True)
+
+    def changelist(self, query=''):
+        response = self.client.get(f'/admin/transactions/transaction/{query}', secure=True)
+        self.assertEqual(response.status_code, 200)
+        return response.context['cl']
+
+    @mock.patch.object(TransactionAdmin, 'list_per_page', 2)
+    def test_pages_by_primary_key(self):
+        first = self.changelist()
+        self.assertEqual([txn.pk for txn in first.result_list], self.ids[:2])
+        self.assertIsNone(first.first_url)
+        self.assertEqual(first.next_url, f'?after={self.ids[1]}')
+
+        second = self.changelist(first.next_url)
+        self.assertEqual([txn.pk for txn in second.result_list], self.ids[2:4])
+        self.assertEqual(second.first_url, '?')
+
+        last = self.changelist(second.next_url)
+        self.assertEqual([txn.pk for txn in last.result_list], self.ids[4:])
+        self.assertIsNone(last.next_url)
+
+    @override_settings(ADMIN_EXACT_COUNT_LIMIT=3)
+    def test_count_stops_at_the_exact_limit(self):
+        response = self.client.get('/admin/transactions/transaction/', secure=True)
+        self.assertTrue(response.context['cl'].paginator.is_truncated)
+        self.assertContains(response, '3+ Transactions')
+
+    def test_bad_cursor_shows_the_first_page(self):
+        self.assertEqual(len(self.changelist('?after=abc').result_list), 5)
+
+
+class LeanMiddlewareTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        # The response body says whether the browser stack (sessions) ran
+        self.dispatcher = PathMiddlewareDispatcher(lambda request: HttpResponse(str(hasattr(request, 'session'))))
+
+    def test_api_requests_skip_the_browser_stack(self):
+        response = self.dispatcher(self.factory.get('/api/accounts/'))
+        self.assertEqual(response.content, b'False')
+        self.assertNotIn('X-Frame-Options', response)
+
+    def test_other_requests_run_the_browser_stack(self):
+        response = self.dispatcher(self.factory.get('/admin/login/'))
+        self.assertEqual(response.content, b'True')
+        self.assertEqual(response['X-Frame-Options'], 'DENY')
+
+    @override_settings(LEAN_MIDDLEWARE_PATHS=[])
+    def test_empty_lean_paths_run_the_full_stack_everywhere(self):
+        dispatcher = PathMiddlewareDispatcher(lambda request: HttpResponse(str(hasattr(request, 'session'))))
+        self.assertEqual(dispatcher(self.factory.get('/api/accounts/')).content, b'True')
+
+    def test_append_slash_only_outside_the_api(self):
+        self.assertRedirects(
+            self.client.get('/admin', secure=True), '/admin/', status_code=301, fetch_redirect_response=False
+        )
+        self.assertEqual(self.client.get('/api/accounts', secure=True).status_code, 404)
+
+    def test_admin_checks_see_the_browser_stack(self):
+        self.assertEqual(check_browser_middleware(None), [])
+        without_sessions = [path for path in settings.BROWSER_MIDDLEWARE if 'sessions' not in path]
+        with override_settings(BROWSER_MIDDLEWARE=without_sessions):
+            self.assertEqual([error.id for error in check_browser_middleware(None)], ['bluebank.E001'])
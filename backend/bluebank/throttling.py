@@ -0,0 +1,155 @@
+"""Token-bucket throttling for the API.
+
+Every view has a throttle scope - ``login``, ``register``, ``transfer``
+(set with ``@throttle_scope``), otherwise ``read`` for safe methods and
+``write`` for the rest - and two buckets per scope: one per user and one
+per client IP, sized by the ``<scope>_user`` / ``<scope>_ip`` entries of
+DEFAULT_THROTTLE_RATES. A rate of ``N/min`` holds N tokens and refills
+one every minute / N, so short bursts pass while the sustained rate is
+capped. Anonymous login and register requests are bucketed per user by
+the email they submit, which slows credential stuffing against one
+account from many addresses.
+
+Buckets are kept in the THROTTLE_CACHE cache alias as a single integer,
+the bucket's theoretical arrival time (GCRA), moved only with
+``incr``/``decr`` so concurrent workers never overwrite each other. That
+needs a shared backend with atomic increments (Redis or Memcached) once
+there is more than one worker; local memory is fine for tests and a
+single process.
+"""
+import hashlib
+import math
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from . import metrics
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# Bucket times are integer microseconds
+SECOND = 1_000_000
+
+
+def throttle_scope(scope):
+    """Set the throttle scope of an ``@api_view`` function; put it above ``@api_view``"""
+    def decorator(view):
+        view.cls.throttle_scope = scope
+        return view
+    return decorator
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """'30/min' -> (capacity, microseconds to refill one token)"""
+    count, period = rate.split('/')
+    capacity = int(count)
+    return capacity, PERIODS[period[0]] * SECOND // capacity
+
+
+def _ttl(microseconds):
+    return max(1, math.ceil(microseconds / SECOND))
+
+
+def _advance(cache, key, now, step):
+    """Push the bucket's arrival time on by ``step`` and return the new value"""
+    try:
+        return cache.incr(key, step)
+    except ValueError:
+        # No key means a full bucket; start it from now
+        if cache.add(key, now + step, _ttl(step)):
+            return now + step
+        return cache.incr(key, step)
+
+
+def take(key, capacity, step):
+    """Take a token from bucket ``key``; return 0, or the seconds until one is available"""
+    cache = caches[settings.THROTTLE_CACHE]
+    now = int(time.time() * SECOND)
+    arrival = _advance(cache, key, now, step)
+    if arrival - step < now:
+        # The key outlived its arrival time by at most a second of TTL rounding
+        arrival = cache.incr(key, now - (arrival - step))
+    burst = capacity * step
+    if arrival - now > burst:
+        cache.decr(key, step)
+        return (arrival - burst - now) / SECOND
+    # Expire the key once the bucket has refilled
+    cache.touch(key, _ttl(arrival - now))
+    return 0
+
+
+class TokenBucketThrottle(BaseThrottle):
+    kind = None
+
+    def get_scope(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if scope:
+            return scope
+        return 'read' if request.method in SAFE_METHODS else 'write'
+
+    def get_bucket(self, request):
+        """Identify the bucket owner, or None to skip this throttle"""
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(request, view)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(f'{scope}_{self.kind}')
+        if not rate:
+            return True
+        owner = self.get_bucket(request)
+        if owner is None:
+            return True
+        capacity, step = parse_rate(rate)
+        self.retry_after = take(f'throttle:{scope}:{self.kind}:{owner}', capacity, step)
+        allowed = not self.retry_after
+        metrics.incr('api.throttle', scope=scope, bucket=self.kind,
+                     result='accepted' if allowed else 'throttled')
+        return allowed
+
+    def wait(self):
+        return self.retry_after
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    kind = 'user'
+
+    def get_bucket(self, request):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        if not isinstance(email, str) or not email:
+            return None
+        return 'email-' + hashlib.sha1(email.strip().lower().encode()).hexdigest()
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    kind = 'ip'
+
+    def get_bucket(self, request):
+        return self.get_ident(request) or None
+
+
+# Backends whose buckets are not shared between worker processes
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def check_throttle_cache(app_configs, **kwargs):
+    backend = settings.CACHES.get(settings.THROTTLE_CACHE, {}).get('BACKEND')
+    if settings.DEBUG or backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [checks.Warning(
+        f"THROTTLE_CACHE '{settings.THROTTLE_CACHE}' uses {backend}, so every worker keeps its own "
+        f"buckets and rate limits are multiplied by the worker count (or off, for DummyCache)",
+        hint='Point CACHE_BACKEND/CACHE_LOCATION (or THROTTLE_CACHE) at Redis or Memcached',
+        id='bluebank.W001',
+    )]
@@ -18,12 +18,23 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from . import views
+from transactions.views import event_stream, event_ticket, change_feed, change_feed_ack
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/', include('users.urls')),
     path('api/accounts/', include('accounts.urls')),
     path('api/transactions/', include('transactions.urls')),
+    path('api/metrics/', views.metrics_view, name='metrics'),
+    path('api/profiles/', views.profile_list, name='profile_list'),
+    path('api/profiles/token/', views.profile_token, name='profile_token'),
+    path('api/profiles/<str:profile_id>/', views.profile_detail, name='profile_detail'),
+    path('api/profiles/<str:profile_id>/folded/', views.profile_folded, name='profile_folded'),
+    path('api/events/', event_stream, name='event_stream'),
+    path('api/events/ticket/', event_ticket, name='event_ticket'),
+    path('api/feed/', change_feed, name='change_feed'),
+    path('api/feed/ack/', change_feed_ack, name='change_feed_ack'),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.http import FileResponse, Http404
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from . import metrics, profiling
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def metrics_view(request):
+    """Counters and timers collected by this worker process"""
+    return Response(metrics.snapshot())
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def profile_token(request):
+    """Token for the X-Profile header, which profiles the requests carrying it"""
+    return Response({
+        'header': profiling.HEADER,
+        'token': profiling.issue_token(request.user),
+        'expires_in': settings.PROFILE_TOKEN_MAX_AGE,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def profile_list(request):
+    """Stored request profiles, newest first"""
+    profiles = []
+    for profile_id in profiling.list_ids():
+        record = profiling.load(profile_id)
+        if record is not None:
+            record.pop('queries')
+            profiles.append(record)
+    return Response({'profiles': profiles})
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def profile_detail(request, profile_id):
+    """A profile with its SQL statements"""
+    record = profiling.load(profile_id)
+    if record is None:
+        raise Http404
+    return Response(record)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def profile_folded(request, profile_id):
+    """Folded stacks of a profile, for flamegraph.pl or speedscope"""
+    path = profiling.folded_path(profile_id)
+    if path is None:
+        raise Http404
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=f'{profile_id}.folded',
+                        content_type='text/plain')
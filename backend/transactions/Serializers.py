@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from decimal import Decimal
-from .models import Transaction
+from .models import Transaction, Statement
 from accounts.models import Account
+from accounts import ifsc
 
 class TransactionSerializer(serializers.ModelSerializer):
     from_account_number = serializers.CharField(source='from_account.account_number', read_only=True)
@@ -31,6 +32,14 @@ class FundTransferSerializer(serializers.ModelSerializer):
         except Account.DoesNotExist:
             raise serializers.ValidationError("Invalid account selected")
 
+    def validate_to_ifsc_code(self, value):
+        if not value:
+            return value
+        value = ifsc.normalize(value)
+        if not ifsc.is_valid_format(value) or ifsc.is_unknown(value):
+            raise serializers.ValidationError("Invalid IFSC code")
+        return value
+
     def validate_amount(self, value):
         if value <= 0:
             raise serializers.ValidationError("Amount must be greater than 0")
@@ -65,4 +74,13 @@ class TransactionHistorySerializer(serializers.ModelSerializer):
         model = Transaction
         fields = ['id', 'transaction_id', 'from_account_number', 'to_account_number', 
                  'beneficiary_name', 'amount', 'transaction_type', 'status', 
-                 'description', 'reference_number', 'created_at', 'processed_at']
\ No newline at end of file
+                 'description', 'reference_number', 'created_at', 'processed_at']
+
+class StatementSerializer(serializers.ModelSerializer):
+    account_number = serializers.CharField(source='account.account_number', read_only=True)
+    period = serializers.DateField(format='%Y-%m')
+
+    class Meta:
+        model = Statement
+        fields = ['id', 'account', 'account_number', 'period', 'transaction_count',
+                 'total_credits', 'total_debits', 'generated_at']
\ No newline at end of file
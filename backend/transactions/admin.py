@@ -1,15 +1,21 @@
+import uuid
 from django.contrib import admin
-from .models import Transaction
+from django.db.models import Q
+from bluebank.admin_utils import LargeTableAdmin, ShardedAdminMixin
+from .models import Transaction, ArchivedTransaction, Statement, StatementRun, OutboxEvent, OutboxConsumer, ReconciliationCheckpoint, SpendingRollup, ShardTransfer
+from .search import search_filter
 
 @admin.register(Transaction)
-class TransactionAdmin(admin.ModelAdmin):
-    list_display = ('transaction_id', 'from_account', 'to_account_number', 'amount', 
+class TransactionAdmin(ShardedAdminMixin, LargeTableAdmin):
+    list_display = ('transaction_id', 'from_account__account_number', 'to_account_number', 'amount', 
                    'transaction_type', 'status', 'created_at')
     list_filter = ('transaction_type', 'status', 'created_at')
+    list_select_related = ('from_account',)
     search_fields = ('transaction_id', 'reference_number', 'from_account__account_number', 
-                    'to_account_number', 'beneficiary_name')
+                    'beneficiary_name', 'description')
+    search_help_text = 'Transaction ID, account number, or text in reference, beneficiary or description'
     readonly_fields = ('transaction_id', 'reference_number', 'created_at', 'processed_at')
-    date_hierarchy = 'created_at'
+    autocomplete_fields = ('from_account', 'to_account')
     
     fieldsets = (
         ('Transaction Info', {
@@ -25,3 +31,102 @@ class TransactionAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'processed_at')
         }),
     )
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        try:
+            return queryset.filter(transaction_id=uuid.UUID(term)), False
+        except ValueError:
+            pass
+        query = search_filter(term, queryset.db)
+        if term.isdigit():
+            query |= Q(from_account__account_number=term)
+        return queryset.filter(query), False
+
+@admin.register(ArchivedTransaction)
+class ArchivedTransactionAdmin(ShardedAdminMixin, LargeTableAdmin):
+    list_display = ('transaction_id', 'from_account__account_number', 'to_account_number', 'amount',
+                   'transaction_type', 'status', 'created_at', 'archived_at')
+    list_filter = ('created_at',)
+    list_select_related = ('from_account',)
+    search_fields = ('transaction_id', 'reference_number')
+    search_help_text = 'Exact transaction ID or reference number'
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        try:
+            return queryset.filter(transaction_id=uuid.UUID(term)), False
+        except ValueError:
+            return queryset.filter(reference_number=term), False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(StatementRun)
+class StatementRunAdmin(ShardedAdminMixin, admin.ModelAdmin):
+    list_display = ('period', 'status', 'total_accounts', 'generated_count', 'skipped_count',
+                   'failed_count', 'started_at', 'finished_at')
+    list_filter = ('status',)
+    readonly_fields = ('started_at', 'finished_at')
+
+@admin.register(Statement)
+class StatementAdmin(ShardedAdminMixin, admin.ModelAdmin):
+    list_display = ('account', 'period', 'transaction_count', 'total_credits', 'total_debits', 'generated_at')
+    list_filter = ('period',)
+    raw_id_fields = ('account', 'run')
+    readonly_fields = ('generated_at',)
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(ShardedAdminMixin, LargeTableAdmin):
+    list_display = ('seq', 'event_type', 'aggregate_type', 'aggregate_id', 'created_at')
+    list_filter = ()
+    search_fields = ()
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(OutboxConsumer)
+class OutboxConsumerAdmin(ShardedAdminMixin, admin.ModelAdmin):
+    list_display = ('name', 'last_seq', 'updated_at')
+
+@admin.register(ReconciliationCheckpoint)
+class ReconciliationCheckpointAdmin(ShardedAdminMixin, admin.ModelAdmin):
+    list_display = ('range_start', 'range_end', 'last_run_at', 'last_clean_at',
+                   'accounts_checked', 'discrepancy_count', 'duration_ms')
+    list_filter = ('last_run_at',)
+
+@admin.register(SpendingRollup)
+class SpendingRollupAdmin(ShardedAdminMixin, LargeTableAdmin):
+    list_display = ('account', 'month', 'transaction_type', 'counterparty', 'total_amount',
+                   'transaction_count', 'updated_at')
+    list_filter = ()
+    list_select_related = ('account',)
+    search_fields = ('account__account_number',)
+    search_help_text = 'Exact account number'
+    raw_id_fields = ('account',)
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        return queryset.filter(account__account_number=term), False
+
+@admin.register(ShardTransfer)
+class ShardTransferAdmin(ShardedAdminMixin, admin.ModelAdmin):
+    list_display = ('debit', 'to_shard', 'to_account_number', 'amount', 'state', 'attempts', 'created_at')
+    list_filter = ('state',)
+    raw_id_fields = ('debit',)
+    readonly_fields = ('created_at', 'updated_at')
+
+    def has_add_permission(self, request):
+        return False
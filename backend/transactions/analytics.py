@@ -0,0 +1,166 @@
+"""Spending rollups behind /api/transactions/analytics/.
+
+``SpendingRollup`` holds one row per (account, month, transaction type,
+counterparty) with the total and count of completed transactions. The
+``transaction_saved`` handler adjusts the matching row whenever a
+transaction becomes (or stops being) COMPLETED, inside the same database
+transaction, so the endpoint only ever reads rollup rows. Months are
+calendar months in the project time zone.
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, router, transaction
+from django.db.models import Count, DateField, DecimalField, F, Max, Q, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from accounts.models import Account
+from bluebank import sharding
+from .balances import CREDIT_TYPES
+from .models import Transaction, ArchivedTransaction, SpendingRollup
+
+CENT = Decimal('0.01')
+
+# ?group_by= value -> rollup column
+GROUP_FIELDS = {
+    'month': 'month',
+    'type': 'transaction_type',
+    'counterparty': 'counterparty',
+    'account': 'account_id',
+}
+
+
+def month_of(moment):
+    return timezone.localtime(moment).date().replace(day=1)
+
+
+def apply(txn, sign):
+    """Add (sign=1) or remove (sign=-1) ``txn`` from its rollup row"""
+    key = {
+        'account_id': txn.from_account_id,
+        'month': month_of(txn.created_at),
+        'transaction_type': txn.transaction_type,
+        'counterparty': txn.to_account_number or '',
+    }
+    changes = {
+        'total_amount': F('total_amount') + sign * txn.amount,
+        'transaction_count': F('transaction_count') + sign,
+        'updated_at': timezone.now(),
+    }
+    if txn.beneficiary_name:
+        changes['counterparty_name'] = txn.beneficiary_name
+    if SpendingRollup.objects.filter(**key).update(**changes):
+        return
+    try:
+        # Savepoint so losing a race to create the row does not break the caller's transaction
+        with transaction.atomic(using=router.db_for_write(SpendingRollup)):
+            SpendingRollup.objects.create(
+                **key,
+                counterparty_name=txn.beneficiary_name or '',
+                total_amount=sign * txn.amount,
+                transaction_count=sign,
+            )
+    except IntegrityError:
+        SpendingRollup.objects.filter(**key).update(**changes)
+
+
+def transaction_saved(instance, created, previous):
+    """Called from tracking.transaction_saved: keep rollups in step with completed transactions"""
+    if not created and previous.get('status') is None:
+        # Status was deferred when loaded, so the change is unknown
+        return
+    was_completed = previous.get('status') == 'COMPLETED'
+    is_completed = instance.status == 'COMPLETED'
+    if is_completed and not was_completed:
+        apply(instance, 1)
+    elif was_completed and not is_completed:
+        apply(instance, -1)
+
+
+def _aggregate(model, account_ids):
+    return (
+        model.objects
+        .filter(from_account_id__in=account_ids, status='COMPLETED')
+        .annotate(month=TruncMonth('created_at', output_field=DateField()))
+        .values('from_account_id', 'month', 'transaction_type', 'to_account_number')
+        .annotate(total=Sum('amount'), count=Count('id'), name=Max('beneficiary_name'))
+        .order_by()
+    )
+
+
+def rebuild_accounts(account_ids):
+    """Recompute the rollup rows of ``account_ids`` from the hot and archive tables.
+
+    The accounts are locked for the duration, so transfers touching them
+    wait rather than racing the rebuild. Returns the number of rows written.
+    """
+    with transaction.atomic(using=router.db_for_write(Account)):
+        list(Account.objects.select_for_update().filter(id__in=account_ids).order_by('id').values_list('id'))
+        rows = {}
+        for model in (Transaction, ArchivedTransaction):
+            for row in _aggregate(model, account_ids):
+                key = (row['from_account_id'], row['month'], row['transaction_type'], row['to_account_number'] or '')
+                rollup = rows.get(key)
+                if rollup is None:
+                    rows[key] = SpendingRollup(
+                        account_id=key[0], month=key[1], transaction_type=key[2], counterparty=key[3],
+                        counterparty_name=row['name'] or '', total_amount=row['total'], transaction_count=row['count'],
+                    )
+                else:
+                    rollup.total_amount += row['total']
+                    rollup.transaction_count += row['count']
+                    rollup.counterparty_name = rollup.counterparty_name or row['name'] or ''
+        SpendingRollup.objects.filter(account_id__in=account_ids).delete()
+        SpendingRollup.objects.bulk_create(rows.values(), batch_size=1000)
+    return len(rows)
+
+
+def spending(accounts, group_by, start=None, end=None, types=None):
+    """Totals over the rollup rows of ``accounts`` (None for all), grouped by ``group_by`` keys"""
+    rollups = SpendingRollup.objects.all()
+    if accounts is not None:
+        rollups = rollups.filter(account__in=accounts)
+    if start:
+        rollups = rollups.filter(month__gte=start)
+    if end:
+        rollups = rollups.filter(month__lte=end)
+    if types:
+        rollups = rollups.filter(transaction_type__in=types)
+
+    columns = [GROUP_FIELDS[key] for key in group_by]
+    extra = {'counterparty_name': Max('counterparty_name')} if 'counterparty' in columns else {}
+    amount = DecimalField(max_digits=15, decimal_places=2)
+    return list(
+        rollups.values(*columns)
+        .annotate(
+            spent=Coalesce(Sum('total_amount', filter=~Q(transaction_type__in=CREDIT_TYPES)), 0,
+                           output_field=amount),
+            received=Coalesce(Sum('total_amount', filter=Q(transaction_type__in=CREDIT_TYPES)), 0,
+                              output_field=amount),
+            transaction_count=Sum('transaction_count'),
+            **extra
+        )
+        .order_by(*columns)
+    )
+
+
+def bank_spending(group_by, start=None, end=None, types=None):
+    """``spending`` over every account, summed across shards.
+
+    Account ids are only unique within a shard, so ``account`` is not a
+    valid group here.
+    """
+    columns = [GROUP_FIELDS[key] for key in group_by]
+    merged = {}
+    per_shard = sharding.fan_out(lambda alias: spending(None, group_by, start, end, types))
+    for rows in per_shard.values():
+        for row in rows:
+            key = tuple(row[column] for column in columns)
+            total = merged.setdefault(key, row)
+            if total is row:
+                continue
+            for field in ('spent', 'received', 'transaction_count'):
+                total[field] += row[field]
+            if 'counterparty_name' in row:
+                total['counterparty_name'] = max(total['counterparty_name'], row['counterparty_name'])
+    return [merged[key] for key in sorted(merged)]
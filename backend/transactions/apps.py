@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class TransactionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'transactions'
+
+    def ready(self):
+        from django.db.models.signals import post_init, post_save
+        from accounts.models import Account
+        from .models import Transaction
+        from . import tracking
+
+        for model, saved in ((Transaction, tracking.transaction_saved), (Account, tracking.account_saved)):
+            post_init.connect(tracking.remember_state, sender=model, dispatch_uid=f'tracking_init_{model.__name__}')
+            post_save.connect(saved, sender=model, dispatch_uid=f'tracking_save_{model.__name__}')
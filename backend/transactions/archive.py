@@ -0,0 +1,83 @@
+"""Hot/cold split of the transaction table.
+
+``archive_transactions`` moves finished rows older than a cutoff from
+``transactions_transaction`` into ``transactions_transaction_archive`` in
+short per-batch transactions. Readers call ``reaches_archive`` with the
+start of the range they need and only touch the archive when the newest
+archived row falls inside it.
+"""
+from django.db import DatabaseError, connections, router, transaction
+from django.db.models import Max
+
+from .models import Transaction, ArchivedTransaction
+
+ARCHIVABLE_STATUSES = ('COMPLETED', 'FAILED', 'CANCELLED')
+
+COPIED_FIELDS = [field.attname for field in Transaction._meta.concrete_fields]
+
+
+def archive_boundary():
+    """Return the newest archived created_at, or None if nothing is archived"""
+    return ArchivedTransaction.objects.aggregate(newest=Max('created_at'))['newest']
+
+
+def reaches_archive(start):
+    """Whether a range starting at ``start`` (None = all time) needs the archive"""
+    boundary = archive_boundary()
+    return boundary is not None and (start is None or start <= boundary)
+
+
+def archive_batch(cutoff, batch_size):
+    """Move up to ``batch_size`` finished rows created before ``cutoff``.
+
+    Returns the number of rows moved. Each call is its own short
+    transaction, and on PostgreSQL rows locked by other writers are
+    skipped rather than waited for.
+    """
+    with transaction.atomic(using=router.db_for_write(Transaction)):
+        ids = list(
+            Transaction.objects
+            .filter(created_at__lt=cutoff, status__in=ARCHIVABLE_STATUSES)
+            .exclude(shard_transfer__state='DEBITED')
+            .order_by('id')
+            .select_for_update(skip_locked=True)
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+        rows = Transaction.objects.filter(id__in=ids).values(*COPIED_FIELDS)
+        ArchivedTransaction.objects.bulk_create(
+            [ArchivedTransaction(**row) for row in rows],
+            ignore_conflicts=True
+        )
+        Transaction.objects.filter(id__in=ids).delete()
+    return len(ids)
+
+
+def relation_sizes():
+    """Return on-disk bytes of the hot table and its indexes, where supported"""
+    table = Transaction._meta.db_table
+    connection = connections[router.db_for_write(Transaction)]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT pg_table_size(%s::regclass), pg_indexes_size(%s::regclass)',
+                [table, table]
+            )
+            table_bytes, index_bytes = cursor.fetchone()
+            return {'table_bytes': table_bytes, 'index_bytes': index_bytes}
+        if connection.vendor == 'sqlite':
+            try:
+                cursor.execute(
+                    'SELECT SUM(CASE WHEN name = %s THEN pgsize ELSE 0 END), '
+                    'SUM(CASE WHEN name != %s THEN pgsize ELSE 0 END) FROM dbstat '
+                    'WHERE name = %s OR name IN (SELECT name FROM sqlite_master '
+                    'WHERE type = %s AND tbl_name = %s)',
+                    [table, table, table, 'index', table]
+                )
+            except DatabaseError:
+                # dbstat is an optional SQLite extension
+                return {}
+            table_bytes, index_bytes = cursor.fetchone()
+            return {'table_bytes': table_bytes or 0, 'index_bytes': index_bytes or 0}
+    return {}
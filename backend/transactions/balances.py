@@ -0,0 +1,135 @@
+"""Running balance recorded on each transaction.
+
+Every Transaction row belongs to the account in ``from_account``: a
+DEPOSIT credits it, every other type debits it. ``fund_transfer`` writes
+``balance_after`` on both rows in the same atomic block that moves the
+money, so the balance at any moment is the ``balance_after`` of the
+account's newest completed row at or before it - one probe of the
+(from_account, created_at) index in the hot and in the archive table.
+"""
+import heapq
+
+from django.db import router, transaction
+from django.db.models import Case, DecimalField, F, When
+
+from accounts.models import Account
+from .models import Transaction, ArchivedTransaction
+
+CREDIT_TYPES = ('DEPOSIT',)
+
+
+def signed_amount(txn):
+    """Amount ``txn`` moved into its account (negative for debits)"""
+    return txn.amount if txn.transaction_type in CREDIT_TYPES else -txn.amount
+
+
+def signed_amount_expression():
+    """Database-side ``signed_amount`` for use in annotations and aggregates"""
+    return Case(
+        When(transaction_type__in=CREDIT_TYPES, then=F('amount')),
+        default=-F('amount'),
+        output_field=DecimalField(max_digits=15, decimal_places=2),
+    )
+
+
+def _completed(model, account_id):
+    return model.objects.filter(from_account_id=account_id, status='COMPLETED')
+
+
+def _position(txn):
+    return txn.created_at, txn.id
+
+
+def _checked(txn):
+    if txn.balance_after is None:
+        raise LookupError('Balance history has not been backfilled')
+    return txn
+
+
+def balance_at(account, at):
+    """Return (balance, transaction) for ``account`` as of ``at``.
+
+    ``transaction`` is the row whose ``balance_after`` answered the
+    lookup, or None when the account had no completed transactions by
+    then. Raises LookupError if that row has not been backfilled.
+    """
+    # Archived and hot rows interleave (a transfer can stay hot while newer
+    # rows are archived), so both tables are probed and the later row wins
+    latest = [
+        _completed(model, account.id).filter(created_at__lte=at).order_by('-created_at', '-id').first()
+        for model in (Transaction, ArchivedTransaction)
+    ]
+    latest = [txn for txn in latest if txn is not None]
+    if latest:
+        txn = _checked(max(latest, key=_position))
+        return txn.balance_after, txn
+
+    # Before the first transaction: undo the earliest one after ``at``
+    earliest = [
+        _completed(model, account.id).order_by('created_at', 'id').first()
+        for model in (ArchivedTransaction, Transaction)
+    ]
+    earliest = [txn for txn in earliest if txn is not None]
+    if earliest:
+        txn = _checked(min(earliest, key=_position))
+        return txn.balance_after - signed_amount(txn), None
+    return account.balance, None
+
+
+def _history_desc(model, account_id, batch_size):
+    """Yield the account's completed rows newest first, read in keyset pages"""
+    queryset = _completed(model, account_id).only(
+        'id', 'amount', 'transaction_type', 'balance_after', 'created_at'
+    ).order_by('-created_at', '-id')
+    last = None
+    while True:
+        page = queryset
+        if last is not None:
+            page = page.filter(created_at__lte=last.created_at).exclude(
+                created_at=last.created_at, id__gte=last.id
+            )
+        rows = list(page[:batch_size])
+        if not rows:
+            return
+        yield from rows
+        last = rows[-1]
+
+
+def backfill_account(account_id, batch_size=1000):
+    """Fill in missing ``balance_after`` values for one account.
+
+    Walks the history backwards from the current balance, since opening
+    balances were never recorded as transactions. Hot and archived rows
+    are merged by (created_at, id) as they interleave. Rows that already
+    have a value are trusted and re-anchor the walk, so reruns are cheap
+    and safe. The account row is locked so no transfer moves the anchor
+    while the walk runs. Returns the number of rows updated.
+    """
+    updated = 0
+    changed = {Transaction: [], ArchivedTransaction: []}
+
+    def flush(model):
+        nonlocal updated
+        model.objects.bulk_update(changed[model], ['balance_after'], batch_size=batch_size)
+        updated += len(changed[model])
+        changed[model] = []
+
+    with transaction.atomic(using=router.db_for_write(Account)):
+        account = Account.objects.select_for_update().get(pk=account_id)
+        running = account.balance
+        history = heapq.merge(
+            *(_history_desc(model, account_id, batch_size) for model in changed),
+            key=_position, reverse=True,
+        )
+        for txn in history:
+            if txn.balance_after is None:
+                txn.balance_after = running
+                changed[type(txn)].append(txn)
+                if len(changed[type(txn)]) >= batch_size:
+                    flush(type(txn))
+            else:
+                running = txn.balance_after
+            running -= signed_amount(txn)
+        for model in list(changed):
+            flush(model)
+    return updated
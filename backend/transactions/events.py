@@ -0,0 +1,226 @@
+"""Pub/sub for live balance and transaction updates streamed at /api/events/.
+
+``InProcessBroker`` fans events out to subscribers in the same process.
+``PostgresNotifyBroker`` publishes through NOTIFY and has every worker
+LISTEN, so a transfer handled by one worker reaches streams held by
+another. Pick one with the EVENTS_BACKEND setting.
+
+Every broker keeps the last EVENTS_REPLAY_SIZE events so a reconnecting
+client that sends ``Last-Event-ID`` receives what it missed.
+
+EventSource cannot send headers, so browsers open the stream with a signed
+ticket from /api/events/ticket/ that only opens streams and expires after
+EVENTS_TICKET_MAX_AGE seconds, rather than an access token in the URL.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.utils.module_loading import import_string
+
+from .Serializers import TransactionHistorySerializer
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = 'bluebank_events'
+TICKET_SALT = 'bluebank.events.ticket'
+
+
+@dataclass(frozen=True)
+class Event:
+    id: int
+    type: str
+    data: str
+
+    def encode(self):
+        return f"id: {self.id}\nevent: {self.type}\ndata: {self.data}\n\n"
+
+
+class Subscription:
+    def __init__(self, user_id, loop, backlog):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue()
+        self.backlog = backlog
+
+
+_last_id = 0
+_id_lock = threading.Lock()
+
+
+def next_event_id():
+    """Microsecond timestamp, made strictly increasing within the process"""
+    global _last_id
+    with _id_lock:
+        _last_id = max(_last_id + 1, time.time_ns() // 1000)
+        return _last_id
+
+
+def issue_ticket(user):
+    return signing.dumps({'user': user.pk}, salt=TICKET_SALT)
+
+
+def ticket_user_id(ticket):
+    """Return the user id a ticket was issued to, or None if it is forged or expired"""
+    try:
+        return signing.loads(ticket, salt=TICKET_SALT, max_age=settings.EVENTS_TICKET_MAX_AGE)['user']
+    except signing.BadSignature:
+        return None
+
+
+class InProcessBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._history = deque(maxlen=settings.EVENTS_REPLAY_SIZE)
+
+    def publish(self, user_id, event_type, data):
+        event = Event(next_event_id(), event_type, json.dumps(data, cls=DjangoJSONEncoder))
+        self.dispatch(user_id, event)
+
+    def dispatch(self, user_id, event):
+        with self._lock:
+            self._history.append((user_id, event))
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.queue.put_nowait, event)
+            except RuntimeError:
+                # The subscriber's event loop has already shut down
+                self.unsubscribe(subscription)
+
+    def subscribe(self, user_id, last_event_id=None):
+        """Register the calling event loop for ``user_id``'s events"""
+        with self._lock:
+            backlog = []
+            if last_event_id is not None:
+                backlog = [
+                    event for owner, event in self._history
+                    if owner == user_id and event.id > last_event_id
+                ]
+            subscription = Subscription(user_id, asyncio.get_running_loop(), backlog)
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+def _notifications(conn):
+    """Yield NOTIFY payloads as they arrive, with psycopg 3 or psycopg2"""
+    if hasattr(conn, 'poll'):
+        while True:
+            if select.select([conn], [], [], 30) == ([], [], []):
+                continue
+            conn.poll()
+            while conn.notifies:
+                yield conn.notifies.pop(0).payload
+    else:
+        while True:
+            for notify in conn.notifies(timeout=30):
+                yield notify.payload
+
+
+class PostgresNotifyBroker(InProcessBroker):
+    """Cross-worker broker using PostgreSQL LISTEN/NOTIFY"""
+
+    def __init__(self):
+        super().__init__()
+        self._listener = None
+
+    def publish(self, user_id, event_type, data):
+        payload = json.dumps({
+            'user_id': user_id,
+            'id': next_event_id(),
+            'type': event_type,
+            'data': json.dumps(data, cls=DjangoJSONEncoder),
+        })
+        with connections['default'].cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [NOTIFY_CHANNEL, payload])
+
+    def subscribe(self, user_id, last_event_id=None):
+        if self._listener is None:
+            with self._lock:
+                if self._listener is None:
+                    self._listener = threading.Thread(target=self._listen, name='events-listener', daemon=True)
+                    self._listener.start()
+        return super().subscribe(user_id, last_event_id)
+
+    def _listen(self):
+        wrapper = connections['default']
+        while True:
+            conn = None
+            try:
+                # A dedicated connection, never a pooled one: LISTEN is session state
+                conn = wrapper.Database.connect(**wrapper.get_connection_params())
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN {NOTIFY_CHANNEL}')
+                for payload in _notifications(conn):
+                    message = json.loads(payload)
+                    self.dispatch(message['user_id'], Event(message['id'], message['type'], message['data']))
+            except Exception:
+                logger.exception('Event listener lost its connection; reconnecting')
+                if conn is not None:
+                    conn.close()
+                time.sleep(1)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.EVENTS_BACKEND)()
+    return _broker
+
+
+def publish(user_id, event_type, data):
+    """Publish an event; failures are logged, never raised into the caller"""
+    try:
+        get_broker().publish(user_id, event_type, data)
+    except Exception:
+        logger.exception('Could not publish %s event for user %s', event_type, user_id)
+
+
+def publish_balance(account):
+    publish(account.user_id, 'balance', {
+        'account_id': account.id,
+        'account_number': account.account_number,
+        'balance': account.balance,
+    })
+
+
+def publish_transaction(txn):
+    publish(txn.from_account.user_id, 'transaction', TransactionHistorySerializer(txn).data)
+
+
+def publish_transfer(debit, from_account, credit=None, to_account=None):
+    """Publish the events for a committed fund transfer"""
+    publish_transaction(debit)
+    publish_balance(from_account)
+    if credit is not None:
+        publish_transaction(credit)
+        publish_balance(to_account)
@@ -0,0 +1,400 @@
+"""Columnar export of transactions for analytics (``export_transactions``).
+
+Rows are written under EXPORT_DIR, partitioned by the local day they were
+created::
+
+    transactions/[shard=<alias>/]date=YYYY-MM-DD/part-<run>-<n>.<parquet|btxc>
+
+as Parquet when pyarrow is installed, otherwise in the BTXC format below.
+A row that changes after it was exported is written again by a later run,
+so readers keep the copy with the highest (run, part); run ids sort by time.
+
+The export is an outbox consumer (EXPORT_CONSUMER). A run exports every
+transaction named by an outbox event after the seq it last acknowledged,
+then acknowledges the newest event it covered - which also stops
+``compact_outbox`` deleting events the export has not seen. The first run,
+or one started from a date, scans the table in primary-key chunks instead;
+a date scan leaves the acknowledged seq alone, since it does not cover
+changes to older rows.
+Bulk writes that bypass the outbox (see outbox.py) only reach the export
+through such a scan, and deleted or archived rows are never removed from it.
+
+Rows are read with ``iterator()`` - a server-side cursor on PostgreSQL - and
+at most EXPORT_FILE_ROWS rows are buffered, in typed arrays, before being
+written out, so memory stays flat however large the table is.
+
+BTXC layout (little-endian)::
+
+    header | schema (JSON) | zlib-compressed column blocks
+
+The schema lists each column's name, type, decimal scale and the sizes of
+its blocks: a validity block (one byte per row), then int64 values - with
+decimals scaled to integers and timestamps as UTC microseconds - or, for
+strings, int64 end offsets and the UTF-8 data. ``read_columnar`` reads it.
+"""
+import array
+import itertools
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.db.models import Min
+from django.utils import timezone
+
+from . import outbox
+from .models import Transaction, OutboxEvent, OutboxConsumer
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+EXPORT_CONSUMER = 'export_transactions'
+
+# (name, type, decimal scale)
+COLUMNS = [
+    ('id', 'int', 0),
+    ('transaction_id', 'str', 0),
+    ('from_account_id', 'int', 0),
+    ('to_account_id', 'int', 0),
+    ('to_account_number', 'str', 0),
+    ('to_ifsc_code', 'str', 0),
+    ('beneficiary_name', 'str', 0),
+    ('amount', 'decimal', 2),
+    ('transaction_type', 'str', 0),
+    ('status', 'str', 0),
+    ('description', 'str', 0),
+    ('reference_number', 'str', 0),
+    ('transaction_fee', 'decimal', 2),
+    ('balance_after', 'decimal', 2),
+    ('created_at', 'timestamp', 0),
+    ('processed_at', 'timestamp', 0),
+]
+FIELDS = [name for name, _, _ in COLUMNS]
+CREATED_AT = FIELDS.index('created_at')
+
+# Rows fetched per round trip from a server-side cursor, and ids per IN list
+FETCH_SIZE = 2000
+
+MAGIC = b'BTXC'
+VERSION = 1
+HEADER = struct.Struct('<4sHII')
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def _little_endian(values):
+    if sys.byteorder == 'big':
+        values = array.array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(data):
+    values = array.array('q')
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+class Column:
+    """One column of a batch: typed values plus a validity byte per row"""
+
+    def __init__(self, kind, scale):
+        self.kind = kind
+        self.scale = scale
+        self.valid = bytearray()
+        if kind == 'str':
+            self.offsets = array.array('q')
+            self.data = bytearray()
+        else:
+            self.values = array.array('q')
+
+    def extend(self, values):
+        self.valid.extend(value is not None for value in values)
+        if self.kind == 'str':
+            encoded = [b'' if value is None else str(value).encode() for value in values]
+            ends = itertools.accumulate(map(len, encoded), initial=len(self.data))
+            next(ends)
+            self.offsets.extend(ends)
+            self.data += b''.join(encoded)
+        elif self.kind == 'decimal':
+            self.values.extend(0 if value is None else int(value.scaleb(self.scale)) for value in values)
+        elif self.kind == 'timestamp':
+            self.values.extend(0 if value is None else (value - EPOCH) // MICROSECOND for value in values)
+        else:
+            self.values.extend(0 if value is None else value for value in values)
+
+    def blocks(self):
+        if self.kind == 'str':
+            return [bytes(self.valid), _little_endian(self.offsets), bytes(self.data)]
+        return [bytes(self.valid), _little_endian(self.values)]
+
+    @classmethod
+    def from_blocks(cls, kind, scale, blocks):
+        column = cls(kind, scale)
+        column.valid = bytearray(blocks[0])
+        if kind == 'str':
+            column.offsets = _from_little_endian(blocks[1])
+            column.data = bytearray(blocks[2])
+        else:
+            column.values = _from_little_endian(blocks[1])
+        return column
+
+    def to_python(self):
+        if self.kind == 'str':
+            starts = itertools.chain([0], self.offsets)
+            return [
+                self.data[start:end].decode() if valid else None
+                for valid, start, end in zip(self.valid, starts, self.offsets)
+            ]
+        if self.kind == 'decimal':
+            convert = lambda value: Decimal(value).scaleb(-self.scale)
+        elif self.kind == 'timestamp':
+            convert = lambda value: EPOCH + value * MICROSECOND
+        else:
+            convert = int
+        return [convert(value) if valid else None for valid, value in zip(self.valid, self.values)]
+
+
+class Batch:
+    def __init__(self):
+        self.columns = [Column(kind, scale) for _, kind, scale in COLUMNS]
+        self.rows = 0
+
+    def extend(self, rows):
+        for column, values in zip(self.columns, zip(*rows)):
+            column.extend(values)
+        self.rows += len(rows)
+
+
+def write_columnar(batch, path):
+    schema = []
+    blocks = []
+    for (name, kind, scale), column in zip(COLUMNS, batch.columns):
+        compressed = [zlib.compress(block, 6) for block in column.blocks()]
+        schema.append({'name': name, 'type': kind, 'scale': scale, 'blocks': [len(block) for block in compressed]})
+        blocks += compressed
+    schema = json.dumps({'columns': schema}).encode()
+    with open(path, 'wb') as out:
+        out.write(HEADER.pack(MAGIC, VERSION, batch.rows, len(schema)))
+        out.write(schema)
+        for block in blocks:
+            out.write(block)
+
+
+def read_columnar(path):
+    """Read a BTXC file into {column name: list of values}"""
+    with open(path, 'rb') as handle:
+        magic, version, rows, schema_size = HEADER.unpack(handle.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not a BTXC v{VERSION} file')
+        schema = json.loads(handle.read(schema_size))
+        result = {}
+        for entry in schema['columns']:
+            blocks = [zlib.decompress(handle.read(size)) for size in entry['blocks']]
+            result[entry['name']] = Column.from_blocks(entry['type'], entry['scale'], blocks).to_python()
+    return result
+
+
+def _arrow_type(kind, scale):
+    if kind == 'str':
+        return pyarrow.string()
+    if kind == 'decimal':
+        return pyarrow.decimal128(15, scale)
+    if kind == 'timestamp':
+        return pyarrow.timestamp('us', tz='UTC')
+    return pyarrow.int64()
+
+
+def write_parquet(batch, path):
+    table = pyarrow.table({
+        name: pyarrow.array(column.to_python(), type=_arrow_type(kind, scale))
+        for (name, kind, scale), column in zip(COLUMNS, batch.columns)
+    })
+    pyarrow.parquet.write_table(table, path, compression='zstd')
+
+
+# format -> (file extension, writer)
+FORMATS = {
+    'parquet': ('parquet', write_parquet),
+    'columnar': ('btxc', write_columnar),
+}
+
+
+def default_format():
+    return 'parquet' if pyarrow is not None else 'columnar'
+
+
+class PartitionWriter:
+    """Buffer rows per created day and write them out as part files.
+
+    Every buffered day is written once ``file_rows`` rows are buffered in
+    total, and at ``close``. Files are written under a dot-prefixed name,
+    which dataset readers skip, and renamed into place when complete.
+    """
+
+    def __init__(self, root, run_id, file_format, file_rows):
+        self.root = root
+        self.run_id = run_id
+        self.extension, self.write = FORMATS[file_format]
+        self.file_rows = file_rows
+        self.zone = timezone.get_current_timezone()
+        self.parts = itertools.count(1)
+        # Rows are moved into the typed arrays a few thousand at a time
+        self.pending = {}
+        self.pending_rows = 0
+        self.batches = {}
+        self.buffered = 0
+        self.rows = 0
+        self.files = []
+
+    def add(self, row):
+        day = row[CREATED_AT].astimezone(self.zone).date()
+        self.pending.setdefault(day, []).append(row)
+        self.pending_rows += 1
+        self.buffered += 1
+        if self.pending_rows >= FETCH_SIZE:
+            self._move_pending()
+        if self.buffered >= self.file_rows:
+            self.flush()
+
+    def _move_pending(self):
+        for day, rows in self.pending.items():
+            batch = self.batches.get(day)
+            if batch is None:
+                batch = self.batches[day] = Batch()
+            batch.extend(rows)
+        self.pending = {}
+        self.pending_rows = 0
+
+    def flush(self):
+        self._move_pending()
+        for day, batch in sorted(self.batches.items()):
+            directory = os.path.join(self.root, f'date={day.isoformat()}')
+            os.makedirs(directory, exist_ok=True)
+            name = f'part-{self.run_id}-{next(self.parts):05d}.{self.extension}'
+            tmp = os.path.join(directory, f'.{name}.tmp')
+            self.write(batch, tmp)
+            os.replace(tmp, os.path.join(directory, name))
+            self.files.append(os.path.join(directory, name))
+            self.rows += batch.rows
+        self.batches = {}
+        self.buffered = 0
+
+    def close(self):
+        self.flush()
+
+
+def scan_rows(chunk_size, created_since=None):
+    """Yield every row (created on or after ``created_since``) in primary-key chunks"""
+    rows = Transaction.objects.all()
+    if created_since is not None:
+        rows = rows.filter(created_at__gte=created_since)
+    first = rows.aggregate(first=Min('id'))['first']
+    if first is None:
+        return
+    last = first - 1
+    while True:
+        count = 0
+        chunk = rows.filter(id__gt=last).order_by('id').values_list(*FIELDS)[:chunk_size]
+        for row in chunk.iterator(chunk_size=FETCH_SIZE):
+            yield row
+            last = row[0]
+            count += 1
+        if count < chunk_size:
+            return
+
+
+def _fetch(ids):
+    ids = sorted(ids)
+    for start in range(0, len(ids), FETCH_SIZE):
+        yield from (
+            Transaction.objects.filter(id__in=ids[start:start + FETCH_SIZE])
+            .order_by('id').values_list(*FIELDS).iterator(chunk_size=FETCH_SIZE)
+        )
+
+
+def changed_rows(after, upto, chunk_size):
+    """Yield the current rows of transactions with outbox events in (after, upto]"""
+    events = (
+        OutboxEvent.objects
+        .filter(aggregate_type='transaction', seq__gt=after, seq__lte=upto)
+        .order_by('seq').values_list('aggregate_id', flat=True)
+        .iterator(chunk_size=FETCH_SIZE)
+    )
+    pending = set()
+    for transaction_id in events:
+        pending.add(transaction_id)
+        if len(pending) >= chunk_size:
+            yield from _fetch(pending)
+            pending = set()
+    yield from _fetch(pending)
+
+
+def last_exported_seq():
+    """The seq the export acknowledged last, or None before its first run"""
+    return OutboxConsumer.objects.filter(name=EXPORT_CONSUMER).values_list('last_seq', flat=True).first()
+
+
+def export(root, file_format, chunk_size, file_rows, since_seq=None, since_date=None):
+    """Export new and changed rows of the selected database under ``root``.
+
+    Starts after ``since_seq``, from rows created on ``since_date``, or by
+    default after the last acknowledged seq (a full scan on the first run).
+    Returns a summary of the run, which is also written to ``root/_runs``.
+    """
+    started = time.perf_counter()
+    run_id = datetime.now(dt_timezone.utc).strftime('%Y%m%dT%H%M%S%f')
+    watermark = last_exported_seq()
+    if since_seq is None and since_date is None:
+        since_seq = watermark
+    if since_seq is not None:
+        upto = outbox.readable_seq(since_seq)
+    else:
+        # A scan sees every committed row, so it may acknowledge any seq with
+        # no open hole below it; consumers only ever acknowledge such seqs
+        upto = outbox.readable_seq(max(watermark or 0, outbox.compactable_seq()))
+
+    writer = PartitionWriter(root, run_id, file_format, file_rows)
+    if since_seq is not None:
+        mode = 'changes'
+        rows = changed_rows(since_seq, upto, chunk_size)
+    else:
+        mode = 'scan'
+        rows = scan_rows(chunk_size, since_date)
+    for row in rows:
+        writer.add(row)
+    writer.close()
+
+    # Only a run that covered every change since the watermark may move it:
+    # a full scan, or changes from at or below it. A date scan misses changes
+    # to older rows and a later --since seq skips events.
+    covered = since_date is None if mode == 'scan' else since_seq <= (watermark or 0)
+    if covered:
+        outbox.acknowledge(EXPORT_CONSUMER, upto)
+
+    summary = {
+        'run': run_id,
+        'mode': mode,
+        'format': file_format,
+        'after_seq': since_seq,
+        'created_since': since_date.isoformat() if since_date else None,
+        'upto_seq': upto,
+        'acknowledged': covered,
+        'rows': writer.rows,
+        'files': [os.path.relpath(path, root) for path in writer.files],
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+    os.makedirs(os.path.join(root, '_runs'), exist_ok=True)
+    with open(os.path.join(root, '_runs', f'{run_id}.json'), 'w') as f:
+        json.dump(summary, f, indent=2)
+    return summary
@@ -0,0 +1,79 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from bluebank import sharding
+from transactions.archive import archive_batch, relation_sizes
+from transactions.models import Transaction
+
+
+class Command(BaseCommand):
+    help = 'Move finished transactions older than --older-than days into the archive table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, required=True, help='Age in days')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--max-batches', type=int, default=0, help='Stop after this many batches (0 = no limit)')
+        parser.add_argument('--sleep', type=float, default=0.0,
+                            help='Seconds to pause between batches to limit load')
+        parser.add_argument('--report', action='store_true',
+                            help='Print hot table size and hot-query latency before and after')
+        parser.add_argument('--shard', choices=sharding.shard_aliases() or None,
+                            help='Only this shard (default: every shard)')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['older_than'])
+        for shard in sharding.each_shard(options['shard']):
+            if shard:
+                self.stdout.write(f"Archiving on {shard}")
+            self._archive(cutoff, options)
+
+    def _archive(self, cutoff, options):
+        if options['report']:
+            before = self._measure()
+
+        moved = batches = 0
+        started = time.perf_counter()
+        while True:
+            count = archive_batch(cutoff, options['batch_size'])
+            if not count:
+                break
+            moved += count
+            batches += 1
+            self.stdout.write(f"Batch {batches}: archived {count} rows ({moved} total)")
+            if options['max_batches'] and batches >= options['max_batches']:
+                break
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {moved} transactions older than {cutoff:%Y-%m-%d} "
+            f"in {time.perf_counter() - started:.1f}s"
+        ))
+
+        if options['report']:
+            after = self._measure()
+            for key in ('table_bytes', 'index_bytes', 'hot_query_ms'):
+                if key in before:
+                    self.stdout.write(f"{key:>14}: {before[key]} -> {after[key]}")
+            self.stdout.write('Table and index space is returned to the OS after VACUUM.')
+
+    def _measure(self, samples=50, days=30):
+        """Table/index sizes and median latency of the history query for busy accounts"""
+        result = relation_sizes()
+        since = timezone.now() - timedelta(days=days)
+        account_ids = list(
+            Transaction.objects.order_by('-id').values_list('from_account_id', flat=True)[:samples * 20]
+        )
+        account_ids = list(dict.fromkeys(account_ids))[:samples]
+        timings = []
+        for account_id in account_ids:
+            start = time.perf_counter()
+            list(Transaction.objects.filter(from_account_id=account_id, created_at__gte=since))
+            timings.append((time.perf_counter() - start) * 1000)
+        if timings:
+            result['hot_query_ms'] = round(statistics.median(timings), 3)
+        return result
@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bluebank import sharding
+from transactions.balances import backfill_account
+from transactions.models import Transaction, ArchivedTransaction
+
+
+class Command(BaseCommand):
+    help = 'Fill in balance_after on completed transactions recorded before it existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows read and updated at a time within an account')
+        parser.add_argument('--account', type=int, action='append', dest='accounts',
+                            help='Only backfill this account id (repeatable)')
+        parser.add_argument('--sleep', type=float, default=0.0,
+                            help='Seconds to pause between accounts to limit load')
+        parser.add_argument('--shard', choices=sharding.shard_aliases() or None,
+                            help='Only this shard (default: every shard)')
+
+    def handle(self, *args, **options):
+        updated = accounts = 0
+        started = time.perf_counter()
+        for shard in sharding.each_shard(options['shard']):
+            if options['accounts']:
+                account_ids = sorted(set(options['accounts']))
+            else:
+                pending = set()
+                for model in (Transaction, ArchivedTransaction):
+                    pending.update(
+                        model.objects.filter(status='COMPLETED', balance_after__isnull=True)
+                        .values_list('from_account_id', flat=True).distinct()
+                    )
+                account_ids = sorted(pending)
+            accounts += len(account_ids)
+
+            self.stdout.write(f"Backfilling {len(account_ids)} accounts" + (f" on {shard}" if shard else ''))
+            for index, account_id in enumerate(account_ids, start=1):
+                updated += backfill_account(account_id, options['batch_size'])
+                if index % 100 == 0:
+                    self.stdout.write(f"{index}/{len(account_ids)} accounts, {updated} rows updated")
+                if options['sleep']:
+                    time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated {updated} transactions across {accounts} accounts "
+            f"in {time.perf_counter() - started:.1f}s"
+        ))
@@ -0,0 +1,81 @@
+import asyncio
+import resource
+import time
+import tracemalloc
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand, CommandError
+
+from bluebank.asgi import events_application
+from transactions import events
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Measure how many idle /api/events/ streams one worker holds and fan-out latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=1000)
+        parser.add_argument('--email', help='User to subscribe as (defaults to the first user)')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(email=options['email']).first() if options['email'] else User.objects.first()
+        if user is None:
+            raise CommandError('No user to subscribe as')
+        ticket = events.issue_ticket(user)
+        asyncio.run(self._run(user.id, ticket, options['connections']))
+
+    async def _run(self, user_id, ticket, count):
+        broker = events.get_broker()
+        received = []
+        disconnect = asyncio.Event()
+
+        async def connection():
+            requested = False
+            got_event = asyncio.Event()
+
+            async def receive():
+                nonlocal requested
+                if not requested:
+                    requested = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await disconnect.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                if b'event: benchmark' in message.get('body', b''):
+                    received.append(time.perf_counter())
+                    got_event.set()
+
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+                'method': 'GET', 'scheme': 'http', 'path': '/api/events/', 'raw_path': b'/api/events/',
+                'query_string': f'ticket={ticket}'.encode(), 'headers': [(b'host', b'localhost')],
+                'server': ('localhost', 80), 'client': ('127.0.0.1', 0),
+            }
+            await events_application(scope, receive, send)
+
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        tasks = [asyncio.create_task(connection()) for _ in range(count)]
+        while broker.subscriber_count() < count:
+            await asyncio.sleep(0.05)
+        opened = time.perf_counter() - started
+        per_connection = (tracemalloc.get_traced_memory()[0] - baseline) / count
+        tracemalloc.stop()
+
+        self.stdout.write(f"Opened {count} idle streams in {opened:.2f}s")
+        self.stdout.write(f"Python heap per idle stream: {per_connection / 1024:.1f} KiB")
+        self.stdout.write(f"Process max RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB")
+
+        published = time.perf_counter()
+        await sync_to_async(broker.publish)(user_id, 'benchmark', {})
+        while len(received) < count:
+            await asyncio.sleep(0.001)
+        self.stdout.write(
+            f"Fan-out to {count} streams: last delivery after {(max(received) - published) * 1000:.1f} ms"
+        )
+
+        disconnect.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
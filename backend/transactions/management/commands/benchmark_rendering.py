@@ -0,0 +1,64 @@
+import time
+from itertools import cycle, islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.text import compress_string
+from rest_framework.renderers import JSONRenderer
+
+from bluebank import renderers
+from bluebank.fast_serializers import values_serializer
+from transactions.models import Transaction
+from transactions.Serializers import TransactionHistorySerializer
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class Command(BaseCommand):
+    help = 'Measure JSON render time and bytes on the wire for a transaction history payload'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per step; the best is reported')
+
+    def handle(self, *args, **options):
+        reader = values_serializer(TransactionHistorySerializer)
+        rows = list(reader.values(Transaction.objects.all())[:options['rows']])
+        if not rows:
+            raise CommandError('No transactions to render')
+        # Repeat real rows if the table is smaller than the requested payload
+        rows = list(islice(cycle(rows), options['rows']))
+        payload = {'transactions': reader.serialize(rows), 'count': len(rows)}
+
+        stdlib, seconds = self._timed(lambda: JSONRenderer().render(payload), options['repeat'])
+        self.stdout.write(f"{len(rows)}-row history, {len(stdlib):,} bytes")
+        self.stdout.write(f"  render, stdlib JSONRenderer: {seconds * 1000:.2f} ms")
+        if renderers.orjson is None:
+            self.stdout.write('  render, FastJSONRenderer: orjson not installed, stdlib fallback in use')
+        else:
+            fast, seconds = self._timed(lambda: renderers.FastJSONRenderer().render(payload), options['repeat'])
+            if fast != stdlib:
+                raise CommandError('FastJSONRenderer output differs from JSONRenderer')
+            self.stdout.write(f"  render, FastJSONRenderer (orjson, byte-identical): {seconds * 1000:.2f} ms")
+
+        gzipped, seconds = self._timed(lambda: compress_string(stdlib), options['repeat'])
+        self.stdout.write(f"  gzip: {len(gzipped):,} bytes on the wire "
+                          f"({len(gzipped) / len(stdlib):.1%}), {seconds * 1000:.2f} ms")
+        if brotli is None:
+            self.stdout.write('  brotli: not installed')
+        else:
+            quality = settings.API_BROTLI_QUALITY
+            compressed, seconds = self._timed(lambda: brotli.compress(stdlib, quality=quality), options['repeat'])
+            self.stdout.write(f"  brotli (quality {quality}): {len(compressed):,} bytes on the wire "
+                              f"({len(compressed) / len(stdlib):.1%}), {seconds * 1000:.2f} ms")
+
+    def _timed(self, run, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = run()
+            timings.append(time.perf_counter() - started)
+        return result, min(timings)
@@ -0,0 +1,80 @@
+import random
+import string
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import Account
+from transactions.models import Transaction
+from transactions.search import icontains_filter, search_filter
+from users.models import User
+
+WORDS = ['rent', 'grocery', 'salary', 'electricity', 'insurance', 'fuel', 'school',
+         'fees', 'dinner', 'refund', 'gift', 'loan', 'emi', 'phone', 'internet']
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare indexed transaction search against icontains on synthetic rows (rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument('--query', default='electricity')
+        parser.add_argument('--runs', type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                account = self._seed(options['rows'])
+                base = Transaction.objects.filter(from_account=account)
+                for label, condition in (
+                    ('icontains', icontains_filter(options['query'])),
+                    ('indexed', search_filter(options['query'], base.db)),
+                ):
+                    self._time(label, base.filter(condition), options['runs'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _seed(self, rows):
+        user = User.objects.create_user(
+            username='benchmark-search', email='benchmark-search@bluebank.invalid',
+            password=None, first_name='Bench', last_name='Mark'
+        )
+        account = Account.objects.create(user=user)
+        batch = []
+        for i in range(rows):
+            batch.append(Transaction(
+                from_account=account,
+                to_account_number=str(random.randint(10 ** 11, 10 ** 12 - 1)),
+                beneficiary_name=''.join(random.choices(string.ascii_letters, k=10)),
+                amount=Decimal('100.00'),
+                transaction_type='TRANSFER',
+                status='COMPLETED',
+                description=' '.join(random.choices(WORDS, k=4)),
+                reference_number=f"BENCH{i:012d}",
+            ))
+            if len(batch) == 5000:
+                Transaction.objects.bulk_create(batch)
+                batch = []
+        Transaction.objects.bulk_create(batch)
+        self.stdout.write(f"Seeded {rows} transactions")
+        return account
+
+    def _time(self, label, queryset, runs):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            matches = len(queryset.values_list('id', flat=True)[:20])
+            count = queryset.count()
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        self.stdout.write(
+            f"{label:>10}: {count} matches, first page {matches} rows, "
+            f"median {timings[len(timings) // 2]:.2f} ms, max {timings[-1]:.2f} ms"
+        )
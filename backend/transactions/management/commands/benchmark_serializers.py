@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from accounts.models import Account
+from accounts.Serializers import AccountSerializer
+from bluebank.fast_serializers import values_serializer
+from transactions.models import Transaction
+from transactions.Serializers import TransactionHistorySerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare rows serialized per second for DRF serializers and the .values() read path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help='Rows per run')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per path; the best is reported')
+
+    def handle(self, *args, **options):
+        cases = [
+            ('TransactionHistorySerializer', TransactionHistorySerializer,
+             Transaction.objects.select_related('from_account')),
+            ('AccountSerializer', AccountSerializer, Account.objects.order_by('id')),
+        ]
+        renderer = JSONRenderer()
+        for label, serializer_class, queryset in cases:
+            queryset = queryset[:options['rows']]
+            reader = values_serializer(serializer_class)
+
+            def drf():
+                return serializer_class(list(queryset.all()), many=True).data
+
+            def fast():
+                return reader.serialize(list(reader.values(queryset.all())))
+
+            drf_output = renderer.render(drf())
+            if renderer.render(fast()) != drf_output:
+                raise CommandError(f'{label}: .values() output differs from the serializer')
+
+            rows = queryset.count()
+            if not rows:
+                self.stdout.write(f"{label}: no rows to serialize")
+                continue
+            drf_seconds = self._best(drf, options['repeat'])
+            fast_seconds = self._best(fast, options['repeat'])
+            self.stdout.write(
+                f"{label} ({rows} rows, query included, output byte-identical): "
+                f"serializer {rows / drf_seconds:,.0f} rows/s, "
+                f".values() {rows / fast_seconds:,.0f} rows/s "
+                f"({drf_seconds / fast_seconds:.1f}x)"
+            )
+
+    def _best(self, run, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from bluebank import sharding
+from transactions import outbox
+
+
+class Command(BaseCommand):
+    help = 'Delete outbox events every registered consumer has acknowledged'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--shard', choices=sharding.shard_aliases() or None,
+                            help='Only this shard (default: every shard)')
+
+    def handle(self, *args, **options):
+        # Each shard has its own outbox and consumer positions
+        for shard in sharding.each_shard(options['shard']):
+            upto = outbox.compactable_seq()
+            deleted = outbox.compact(options['batch_size'])
+            where = f" on {shard}" if shard else ''
+            self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} events up to seq {upto}{where}"))
@@ -0,0 +1,87 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from accounts.models import Account
+from bluebank import sharding
+from transactions.models import StatementRun
+from transactions.statements import generate_statements, parse_period, record_statements
+
+
+class Command(BaseCommand):
+    help = 'Generate monthly statements for every active account'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help='Statement month as YYYY-MM (defaults to last month)')
+        parser.add_argument('--workers', type=int, default=settings.STATEMENT_WORKERS)
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Accounts handed to a worker at a time')
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerate statements that already exist')
+        parser.add_argument('--shard', choices=sharding.shard_aliases() or None,
+                            help='Only this shard (default: every shard)')
+
+    def handle(self, *args, **options):
+        if options['month']:
+            try:
+                period = parse_period(options['month'])
+            except ValueError:
+                raise CommandError('--month must be in YYYY-MM format')
+        else:
+            period = (timezone.localdate().replace(day=1) - timedelta(days=1)).replace(day=1)
+
+        # One run per shard; statement files are named by account number so they do not collide
+        for shard in sharding.each_shard(options['shard']):
+            self._generate(shard, period, options)
+
+    def _generate(self, shard, period, options):
+        account_ids = list(
+            Account.objects.filter(status='ACTIVE').order_by('id').values_list('id', flat=True)
+        )
+        batch_size = options['batch_size']
+        batches = [account_ids[i:i + batch_size] for i in range(0, len(account_ids), batch_size)]
+
+        run = StatementRun.objects.create(period=period, total_accounts=len(account_ids))
+        self.stdout.write(f"Generating {period:%Y-%m} statements for {len(account_ids)} accounts "
+                          f"in {len(batches)} batches" + (f" on {shard}" if shard else ''))
+
+        totals = {'generated': 0, 'skipped': 0, 'failed': 0}
+        try:
+            if options['workers'] <= 1:
+                for batch in batches:
+                    self._record(run, period, totals, generate_statements(batch, period, options['force']))
+            else:
+                # Forked workers must open their own connections.
+                connections.close_all()
+                with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+                    futures = [
+                        pool.submit(sharding.in_shard, shard, generate_statements, batch, period, options['force'])
+                        for batch in batches
+                    ]
+                    for future in as_completed(futures):
+                        self._record(run, period, totals, future.result())
+        except BaseException:
+            StatementRun.objects.filter(pk=run.pk).update(status='FAILED', finished_at=timezone.now())
+            raise
+
+        run.status = 'FAILED' if totals['failed'] else 'COMPLETED'
+        run.finished_at = timezone.now()
+        run.save(update_fields=['status', 'finished_at'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {totals['generated']}, skipped {totals['skipped']}, failed {totals['failed']}"
+        ))
+
+    def _record(self, run, period, totals, result):
+        record_statements(result['statements'], period, run)
+        totals['generated'] += len(result['statements'])
+        totals['skipped'] += result['skipped']
+        totals['failed'] += result['failed']
+        run.generated_count = totals['generated']
+        run.skipped_count = totals['skipped']
+        run.failed_count = totals['failed']
+        run.save(update_fields=['generated_count', 'skipped_count', 'failed_count'])
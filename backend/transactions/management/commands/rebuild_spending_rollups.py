@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.models import Account
+from bluebank import sharding
+from transactions.analytics import rebuild_accounts
+
+
+class Command(BaseCommand):
+    help = 'Recompute spending rollups from transaction history, a chunk of accounts at a time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Accounts rebuilt (and locked) per transaction')
+        parser.add_argument('--account', type=int, action='append', dest='accounts',
+                            help='Only rebuild this account id (repeatable)')
+        parser.add_argument('--sleep', type=float, default=0.0,
+                            help='Seconds to pause between batches to limit load')
+        parser.add_argument('--shard', choices=sharding.shard_aliases() or None,
+                            help='Only this shard (default: every shard)')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        written = rebuilt = 0
+        started = time.perf_counter()
+        for shard in sharding.each_shard(options['shard']):
+            accounts = Account.objects.order_by('id')
+            if options['accounts']:
+                accounts = accounts.filter(id__in=options['accounts'])
+            account_ids = list(accounts.values_list('id', flat=True))
+            rebuilt += len(account_ids)
+            where = f"{shard} " if shard else ''
+
+            for offset in range(0, len(account_ids), batch_size):
+                batch = account_ids[offset:offset + batch_size]
+                written += rebuild_accounts(batch)
+                self.stdout.write(f"{where}Accounts {batch[0]}-{batch[-1]}: {written} rollup rows so far")
+                if options['sleep']:
+                    time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {written} rollup rows for {rebuilt} accounts "
+            f"in {time.perf_counter() - started:.1f}s"
+        ))
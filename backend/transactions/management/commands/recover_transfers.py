@@ -0,0 +1,49 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError
+from django.utils import timezone
+
+from bluebank import sharding
+from transactions import transfers
+from transactions.models import ShardTransfer
+
+
+class Command(BaseCommand):
+    help = 'Finish cross-shard transfers left debited but not credited'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=settings.SHARD_TRANSFER_RECOVERY_SECONDS,
+                            help='Only transfers debited at least this many seconds ago')
+        parser.add_argument('--limit', type=int, default=1000, help='Transfers per shard per run')
+        parser.add_argument('--shard', choices=sharding.shard_aliases() or None,
+                            help='Only this source shard (default: every shard)')
+
+    def handle(self, *args, **options):
+        if not sharding.enabled():
+            self.stdout.write('Sharding is not enabled; there is nothing to recover')
+            return
+
+        cutoff = timezone.now() - timedelta(seconds=options['older_than'])
+        totals = {'COMPLETED': 0, 'REVERSED': 0, 'failed': 0}
+        for shard in sharding.each_shard(options['shard']):
+            in_doubt = list(
+                ShardTransfer.objects.filter(state='DEBITED', created_at__lt=cutoff)
+                .select_related('debit').order_by('created_at')[:options['limit']]
+            )
+            for transfer in in_doubt:
+                try:
+                    outcome, _, _ = transfers.settle(transfer)
+                except DatabaseError as exc:
+                    transfers.record_failure(transfer, exc)
+                    totals['failed'] += 1
+                    self.stderr.write(f"{shard} {transfer.debit.reference_number}: {exc}")
+                    continue
+                totals[outcome] += 1
+                self.stdout.write(f"{shard} {transfer.debit.reference_number} -> {transfer.to_shard}: {outcome}")
+
+        style = self.style.WARNING if totals['failed'] else self.style.SUCCESS
+        self.stdout.write(style(
+            f"Completed {totals['COMPLETED']}, reversed {totals['REVERSED']}, still in doubt {totals['failed']}"
+        ))
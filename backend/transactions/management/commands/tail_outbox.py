@@ -0,0 +1,47 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from bluebank import sharding
+from transactions import outbox
+from transactions.models import OutboxConsumer
+
+
+class Command(BaseCommand):
+    help = 'Print outbox events as NDJSON, optionally following new ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--after', type=int, help='Start after this seq (defaults to the consumer position)')
+        parser.add_argument('--consumer', help='Read from and acknowledge as this consumer')
+        parser.add_argument('--limit', type=int, default=500, help='Events per read')
+        parser.add_argument('--follow', action='store_true', help='Keep polling for new events')
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--shard', choices=sharding.shard_aliases() or None,
+                            help='Shard whose outbox to read; each shard has its own sequence')
+
+    def handle(self, *args, **options):
+        if sharding.enabled() and not options['shard']:
+            raise CommandError('--shard is required when sharding is enabled')
+        with sharding.use_shard(options['shard']):
+            self._tail(options)
+
+    def _tail(self, options):
+        after = options['after']
+        if after is None:
+            consumer = OutboxConsumer.objects.filter(name=options['consumer']).first() if options['consumer'] else None
+            after = consumer.last_seq if consumer else 0
+
+        while True:
+            feed = outbox.read_feed(after, options['limit'])
+            for event in feed:
+                self.stdout.write(json.dumps(event, cls=DjangoJSONEncoder))
+            if feed:
+                after = feed[-1]['seq']
+                if options['consumer']:
+                    outbox.acknowledge(options['consumer'], after)
+                continue
+            if not options['follow']:
+                break
+            time.sleep(options['poll_interval'])
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_initial'),
+        ('transactions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Statement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField()),
+                ('csv_file', models.CharField(max_length=255)),
+                ('html_file', models.CharField(max_length=255)),
+                ('transaction_count', models.PositiveIntegerField(default=0)),
+                ('total_credits', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('total_debits', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('generated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Statement',
+                'verbose_name_plural': 'Statements',
+                'db_table': 'transactions_statement',
+                'ordering': ['-period'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StatementRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField()),
+                ('status', models.CharField(choices=[('RUNNING', 'Running'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], default='RUNNING', max_length=10)),
+                ('total_accounts', models.PositiveIntegerField(default=0)),
+                ('generated_count', models.PositiveIntegerField(default=0)),
+                ('skipped_count', models.PositiveIntegerField(default=0)),
+                ('failed_count', models.PositiveIntegerField(default=0)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Statement Run',
+                'verbose_name_plural': 'Statement Runs',
+                'db_table': 'transactions_statement_run',
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['from_account', 'created_at'], name='txn_account_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='statement',
+            name='account',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='statements', to='accounts.account'),
+        ),
+        migrations.AddField(
+            model_name='statement',
+            name='run',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='statements', to='transactions.statementrun'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='statement',
+            unique_together={('account', 'period')},
+        ),
+    ]
@@ -0,0 +1,71 @@
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS transactions_transaction_fts USING fts5(
+        description, beneficiary_name, reference_number,
+        content='transactions_transaction', content_rowid='id', tokenize='trigram'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS transactions_transaction_fts_ai
+    AFTER INSERT ON transactions_transaction BEGIN
+        INSERT INTO transactions_transaction_fts(rowid, description, beneficiary_name, reference_number)
+        VALUES (new.id, new.description, new.beneficiary_name, new.reference_number);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS transactions_transaction_fts_ad
+    AFTER DELETE ON transactions_transaction BEGIN
+        INSERT INTO transactions_transaction_fts(transactions_transaction_fts, rowid, description, beneficiary_name, reference_number)
+        VALUES ('delete', old.id, old.description, old.beneficiary_name, old.reference_number);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS transactions_transaction_fts_au
+    AFTER UPDATE OF description, beneficiary_name, reference_number ON transactions_transaction BEGIN
+        INSERT INTO transactions_transaction_fts(transactions_transaction_fts, rowid, description, beneficiary_name, reference_number)
+        VALUES ('delete', old.id, old.description, old.beneficiary_name, old.reference_number);
+        INSERT INTO transactions_transaction_fts(rowid, description, beneficiary_name, reference_number)
+        VALUES (new.id, new.description, new.beneficiary_name, new.reference_number);
+    END""",
+    "INSERT INTO transactions_transaction_fts(transactions_transaction_fts) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS transactions_transaction_fts_au",
+    "DROP TRIGGER IF EXISTS transactions_transaction_fts_ad",
+    "DROP TRIGGER IF EXISTS transactions_transaction_fts_ai",
+    "DROP TABLE IF EXISTS transactions_transaction_fts",
+]
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS txn_description_trgm ON transactions_transaction USING gin (description gin_trgm_ops)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS txn_beneficiary_trgm ON transactions_transaction USING gin (beneficiary_name gin_trgm_ops)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS txn_reference_trgm ON transactions_transaction USING gin (reference_number gin_trgm_ops)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX CONCURRENTLY IF EXISTS txn_reference_trgm",
+    "DROP INDEX CONCURRENTLY IF EXISTS txn_beneficiary_trgm",
+    "DROP INDEX CONCURRENTLY IF EXISTS txn_description_trgm",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        statements = statements_by_vendor.get(schema_editor.connection.vendor, [])
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction, and builds
+    # the trigram indexes without blocking writes to the transactions table
+    atomic = False
+
+    dependencies = [
+        ('transactions', '0002_statement_statementrun_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            _run({'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRES_REVERSE}),
+        ),
+    ]
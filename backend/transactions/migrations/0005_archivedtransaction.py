@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_account_account_status_idx_account_account_type_idx_and_more'),
+        ('transactions', '0004_transaction_txn_created_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTransaction',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('transaction_id', models.UUIDField(editable=False, unique=True)),
+                ('to_account_number', models.CharField(blank=True, max_length=20, null=True)),
+                ('to_ifsc_code', models.CharField(blank=True, max_length=11, null=True)),
+                ('beneficiary_name', models.CharField(blank=True, max_length=100, null=True)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('transaction_type', models.CharField(choices=[('TRANSFER', 'Fund Transfer'), ('DEPOSIT', 'Deposit'), ('WITHDRAWAL', 'Withdrawal'), ('PAYMENT', 'Bill Payment')], max_length=10)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed'), ('CANCELLED', 'Cancelled')], max_length=10)),
+                ('description', models.TextField(blank=True)),
+                ('reference_number', models.CharField(max_length=50, unique=True)),
+                ('transaction_fee', models.DecimalField(decimal_places=2, default=0.0, max_digits=10)),
+                ('created_at', models.DateTimeField()),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('from_account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_outgoing_transactions', to='accounts.account')),
+                ('to_account', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_incoming_transactions', to='accounts.account')),
+            ],
+            options={
+                'verbose_name': 'Archived Transaction',
+                'verbose_name_plural': 'Archived Transactions',
+                'db_table': 'transactions_transaction_archive',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['from_account', 'created_at'], name='txn_archive_account_idx'), models.Index(fields=['created_at'], name='txn_archive_created_idx')],
+            },
+        ),
+    ]
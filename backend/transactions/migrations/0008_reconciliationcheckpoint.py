@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0007_transaction_balance_after'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReconciliationCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('range_start', models.BigIntegerField()),
+                ('range_end', models.BigIntegerField()),
+                ('last_run_at', models.DateTimeField()),
+                ('last_clean_at', models.DateTimeField(blank=True, null=True)),
+                ('accounts_checked', models.PositiveIntegerField(default=0)),
+                ('discrepancy_count', models.PositiveIntegerField(default=0)),
+                ('duration_ms', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Reconciliation Checkpoint',
+                'verbose_name_plural': 'Reconciliation Checkpoints',
+                'db_table': 'transactions_reconciliation_checkpoint',
+                'ordering': ['range_start'],
+                'unique_together': {('range_start', 'range_end')},
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_account_account_status_idx_account_account_type_idx_and_more'),
+        ('transactions', '0008_reconciliationcheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpendingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('transaction_type', models.CharField(choices=[('TRANSFER', 'Fund Transfer'), ('DEPOSIT', 'Deposit'), ('WITHDRAWAL', 'Withdrawal'), ('PAYMENT', 'Bill Payment')], max_length=10)),
+                ('counterparty', models.CharField(blank=True, max_length=20)),
+                ('counterparty_name', models.CharField(blank=True, max_length=100)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('transaction_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='spending_rollups', to='accounts.account')),
+            ],
+            options={
+                'verbose_name': 'Spending Rollup',
+                'verbose_name_plural': 'Spending Rollups',
+                'db_table': 'transactions_spending_rollup',
+                'ordering': ['-month'],
+                'unique_together': {('account', 'month', 'transaction_type', 'counterparty')},
+            },
+        ),
+    ]
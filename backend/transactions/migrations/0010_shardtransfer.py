@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-19 19:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0009_spendingrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShardTransfer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('to_shard', models.CharField(max_length=20)),
+                ('to_account_number', models.CharField(max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('state', models.CharField(choices=[('DEBITED', 'Debited'), ('COMPLETED', 'Completed'), ('REVERSED', 'Reversed')], default='DEBITED', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('debit', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='shard_transfer', to='transactions.transaction')),
+            ],
+            options={
+                'verbose_name': 'Shard Transfer',
+                'verbose_name_plural': 'Shard Transfers',
+                'db_table': 'transactions_shard_transfer',
+                'indexes': [models.Index(fields=['state', 'created_at'], name='shard_transfer_state_idx')],
+            },
+        ),
+    ]
@@ -32,12 +32,19 @@ class Transaction(models.Model):
     description = models.TextField(blank=True)
     reference_number = models.CharField(max_length=50, unique=True)
     transaction_fee = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    balance_after = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     processed_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ['-created_at']
         db_table = 'transactions_transaction'
+        indexes = [
+            models.Index(fields=['from_account', 'created_at'], name='txn_account_created_idx'),
+            models.Index(fields=['created_at'], name='txn_created_idx'),
+            models.Index(fields=['status', 'id'], name='txn_status_idx'),
+            models.Index(fields=['transaction_type', 'id'], name='txn_type_idx'),
+        ]
         verbose_name = 'Transaction'
         verbose_name_plural = 'Transactions'
 
@@ -51,3 +58,208 @@ class Transaction(models.Model):
 
     def generate_reference_number(self):
         return ''.join(random.choices(string.ascii_uppercase + string.digits, k=12))
+
+
+class ArchivedTransaction(models.Model):
+    """Cold copy of a Transaction moved out by ``archive_transactions``"""
+    id = models.BigIntegerField(primary_key=True)
+    transaction_id = models.UUIDField(unique=True, editable=False)
+    from_account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='archived_outgoing_transactions')
+    to_account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='archived_incoming_transactions', null=True, blank=True)
+    to_account_number = models.CharField(max_length=20, null=True, blank=True)
+    to_ifsc_code = models.CharField(max_length=11, null=True, blank=True)
+    beneficiary_name = models.CharField(max_length=100, null=True, blank=True)
+    amount = models.DecimalField(max_digits=15, decimal_places=2)
+    transaction_type = models.CharField(max_length=10, choices=Transaction.TRANSACTION_TYPES)
+    status = models.CharField(max_length=10, choices=Transaction.STATUS_CHOICES)
+    description = models.TextField(blank=True)
+    reference_number = models.CharField(max_length=50, unique=True)
+    transaction_fee = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    balance_after = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True)
+    created_at = models.DateTimeField()
+    processed_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        db_table = 'transactions_transaction_archive'
+        indexes = [
+            models.Index(fields=['from_account', 'created_at'], name='txn_archive_account_idx'),
+            models.Index(fields=['created_at'], name='txn_archive_created_idx'),
+        ]
+        verbose_name = 'Archived Transaction'
+        verbose_name_plural = 'Archived Transactions'
+
+    def __str__(self):
+        return f"{self.transaction_id} - ₹{self.amount}"
+
+
+class ShardTransfer(models.Model):
+    """A transfer to an account on another shard, kept on the source shard.
+
+    The debit is committed with this row (DEBITED); the credit is then
+    applied on the destination shard, idempotently by its reference number,
+    and the row marked COMPLETED. If the destination refuses the credit the
+    debit is refunded (REVERSED). ``recover_transfers`` finishes rows left
+    DEBITED.
+    """
+    STATE_CHOICES = [
+        ('DEBITED', 'Debited'),
+        ('COMPLETED', 'Completed'),
+        ('REVERSED', 'Reversed'),
+    ]
+
+    # Archiving a settled debit drops its transfer; in-doubt ones are never archived
+    debit = models.OneToOneField(Transaction, on_delete=models.CASCADE, related_name='shard_transfer')
+    to_shard = models.CharField(max_length=20)
+    to_account_number = models.CharField(max_length=20)
+    amount = models.DecimalField(max_digits=15, decimal_places=2)
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default='DEBITED')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'transactions_shard_transfer'
+        indexes = [
+            models.Index(fields=['state', 'created_at'], name='shard_transfer_state_idx'),
+        ]
+        verbose_name = 'Shard Transfer'
+        verbose_name_plural = 'Shard Transfers'
+
+    def __str__(self):
+        return f"{self.debit_id} -> {self.to_shard} - {self.state}"
+
+
+class OutboxEvent(models.Model):
+    """Change event written in the same transaction as the change itself.
+
+    ``seq`` is the primary key, so feed reads are range scans on the
+    primary key index.
+    """
+    seq = models.BigAutoField(primary_key=True)
+    event_type = models.CharField(max_length=50)
+    aggregate_type = models.CharField(max_length=20)
+    aggregate_id = models.BigIntegerField()
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['seq']
+        db_table = 'transactions_outbox'
+        verbose_name = 'Outbox Event'
+        verbose_name_plural = 'Outbox Events'
+
+    def __str__(self):
+        return f"{self.seq} - {self.event_type}"
+
+
+class OutboxConsumer(models.Model):
+    """Last sequence number a downstream consumer has fully processed"""
+    name = models.CharField(max_length=50, unique=True)
+    last_seq = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'transactions_outbox_consumer'
+        verbose_name = 'Outbox Consumer'
+        verbose_name_plural = 'Outbox Consumers'
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_seq}"
+
+
+class StatementRun(models.Model):
+    STATUS_CHOICES = [
+        ('RUNNING', 'Running'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed'),
+    ]
+
+    period = models.DateField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='RUNNING')
+    total_accounts = models.PositiveIntegerField(default=0)
+    generated_count = models.PositiveIntegerField(default=0)
+    skipped_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-started_at']
+        db_table = 'transactions_statement_run'
+        verbose_name = 'Statement Run'
+        verbose_name_plural = 'Statement Runs'
+
+    def __str__(self):
+        return f"{self.period:%Y-%m} - {self.status}"
+
+
+class Statement(models.Model):
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='statements')
+    run = models.ForeignKey(StatementRun, on_delete=models.SET_NULL, related_name='statements', null=True, blank=True)
+    period = models.DateField()
+    csv_file = models.CharField(max_length=255)
+    html_file = models.CharField(max_length=255)
+    transaction_count = models.PositiveIntegerField(default=0)
+    total_credits = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    total_debits = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    generated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['account', 'period']
+        ordering = ['-period']
+        db_table = 'transactions_statement'
+        verbose_name = 'Statement'
+        verbose_name_plural = 'Statements'
+
+    def __str__(self):
+        return f"{self.account.account_number} - {self.period:%Y-%m}"
+
+
+class ReconciliationCheckpoint(models.Model):
+    """Outcome of the last ``reconcile_balances`` pass over an account id range"""
+    range_start = models.BigIntegerField()
+    range_end = models.BigIntegerField()
+    last_run_at = models.DateTimeField()
+    last_clean_at = models.DateTimeField(null=True, blank=True)
+    accounts_checked = models.PositiveIntegerField(default=0)
+    discrepancy_count = models.PositiveIntegerField(default=0)
+    duration_ms = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['range_start', 'range_end']
+        ordering = ['range_start']
+        db_table = 'transactions_reconciliation_checkpoint'
+        verbose_name = 'Reconciliation Checkpoint'
+        verbose_name_plural = 'Reconciliation Checkpoints'
+
+    def __str__(self):
+        return f"Accounts {self.range_start}-{self.range_end - 1}"
+
+
+class SpendingRollup(models.Model):
+    """Completed-transaction totals per account, month, type and counterparty.
+
+    Kept current by a post_save handler in the same database transaction
+    as the change; ``rebuild_spending_rollups`` recomputes it from history.
+    """
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='spending_rollups')
+    month = models.DateField()
+    transaction_type = models.CharField(max_length=10, choices=Transaction.TRANSACTION_TYPES)
+    counterparty = models.CharField(max_length=20, blank=True)
+    counterparty_name = models.CharField(max_length=100, blank=True)
+    total_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    transaction_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['account', 'month', 'transaction_type', 'counterparty']
+        ordering = ['-month']
+        db_table = 'transactions_spending_rollup'
+        verbose_name = 'Spending Rollup'
+        verbose_name_plural = 'Spending Rollups'
+
+    def __str__(self):
+        return f"{self.account.account_number} - {self.month:%Y-%m} - {self.transaction_type}"
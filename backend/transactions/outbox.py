@@ -0,0 +1,194 @@
+"""Transactional outbox for downstream consumers (fraud, notifications, DWH).
+
+The post_save handlers in ``tracking`` write an OutboxEvent whenever a
+Transaction is created or changes status and whenever an Account balance
+or status changes. The event is written on the same connection as the
+change, so inside an ``atomic()`` block - as in ``fund_transfer`` and admin
+saves - both commit or roll back together. Bulk operations
+(``bulk_create``/``update``) bypass signals and must call ``record``
+themselves.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Min
+from django.utils import timezone
+
+from .models import OutboxEvent, OutboxConsumer
+
+
+def record(event_type, aggregate_type, aggregate_id, payload):
+    return OutboxEvent.objects.create(
+        event_type=event_type,
+        aggregate_type=aggregate_type,
+        aggregate_id=aggregate_id,
+        payload=payload
+    )
+
+
+def transaction_payload(txn):
+    return {
+        'id': txn.id,
+        'transaction_id': str(txn.transaction_id),
+        'from_account_id': txn.from_account_id,
+        'to_account_id': txn.to_account_id,
+        'to_account_number': txn.to_account_number,
+        'amount': str(txn.amount),
+        'transaction_type': txn.transaction_type,
+        'status': txn.status,
+        'reference_number': txn.reference_number,
+        'created_at': txn.created_at.isoformat() if txn.created_at else None,
+        'processed_at': txn.processed_at.isoformat() if txn.processed_at else None,
+    }
+
+
+def account_payload(account):
+    return {
+        'id': account.id,
+        'account_number': account.account_number,
+        'user_id': account.user_id,
+        'balance': str(account.balance),
+        'status': account.status,
+    }
+
+
+def transaction_saved(instance, created, previous):
+    """Called from tracking.transaction_saved with the values loaded before the save"""
+    if created:
+        record('transaction.created', 'transaction', instance.id, transaction_payload(instance))
+    elif previous.get('status') is not None and previous['status'] != instance.status:
+        payload = transaction_payload(instance)
+        payload['previous_status'] = previous['status']
+        record('transaction.status_changed', 'transaction', instance.id, payload)
+
+
+def account_saved(instance, created, previous):
+    """Called from tracking.account_saved with the values loaded before the save"""
+    if created:
+        record('account.created', 'account', instance.id, account_payload(instance))
+        return
+    if previous.get('balance') is not None and previous['balance'] != instance.balance:
+        payload = account_payload(instance)
+        payload['previous_balance'] = str(previous['balance'])
+        record('account.balance_changed', 'account', instance.id, payload)
+    if previous.get('status') is not None and previous['status'] != instance.status:
+        payload = account_payload(instance)
+        payload['previous_status'] = previous['status']
+        record('account.status_changed', 'account', instance.id, payload)
+
+
+def _closed_before():
+    """Time before which every other transaction on the primary has ended.
+
+    A hole below an event written before then can no longer fill. SQLite has
+    a single writer, so a hole below a committed event never fills. Returns
+    None where open transactions cannot be seen, and holes there are only
+    passed once compacted.
+    """
+    connection = connections[router.db_for_write(OutboxEvent)]
+    if connection.vendor == 'sqlite':
+        return datetime.max.replace(tzinfo=dt_timezone.utc)
+    if connection.vendor == 'postgresql':
+        sql = (
+            "SELECT coalesce(min(xact_start), now()) FROM pg_stat_activity "
+            "WHERE datname = current_database() AND pid <> pg_backend_pid()"
+        )
+    elif connection.vendor == 'mysql':
+        sql = (
+            "SELECT UNIX_TIMESTAMP(coalesce(min(trx_started), now())) FROM information_schema.innodb_trx "
+            "WHERE trx_mysql_thread_id <> connection_id()"
+        )
+    else:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql)
+        oldest = cursor.fetchone()[0]
+    if not isinstance(oldest, datetime):
+        oldest = datetime.fromtimestamp(float(oldest), dt_timezone.utc)
+    # Event times come from the app servers' clocks, the oldest start from the database's
+    return oldest - timedelta(seconds=settings.OUTBOX_SETTLE_SECONDS)
+
+
+def _contiguous(events, after, closed_before):
+    """Yield ``events`` (ordered by seq) up to the first hole that may still fill.
+
+    A missing seq belongs to a transaction that has not committed yet or to
+    one that rolled back. Consumers only move past it once it cannot commit
+    any more - every transaction open when the event after it was written
+    has ended (``closed_before``, read before the events) - or once it is at
+    or below compactable_seq() and so was compacted away.
+    """
+    expected = after + 1
+    floor = None
+    for event in events:
+        if event['seq'] > expected:
+            if floor is None:
+                floor = compactable_seq()
+            abandoned = (
+                event['seq'] - 1 <= floor
+                or (closed_before is not None and event['created_at'] < closed_before)
+            )
+            if not abandoned:
+                return
+        yield event
+        expected = event['seq'] + 1
+
+
+def read_feed(after=0, limit=100):
+    """Return up to ``limit`` events with seq > ``after``, stopping at an open hole.
+
+    Sequence numbers are handed out before commit, so a lower seq can become
+    visible after a higher one; the feed never returns events past such a
+    hole (see ``_contiguous``) and a consumer never skips one.
+    """
+    closed_before = _closed_before()
+    # From the primary, where the hole check looks: a lagging replica would
+    # show committed events as holes
+    events = (
+        OutboxEvent.objects.using(router.db_for_write(OutboxEvent))
+        .filter(seq__gt=after)
+        .order_by('seq')
+        .values('seq', 'event_type', 'aggregate_type', 'aggregate_id', 'payload', 'created_at')[:limit]
+    )
+    return list(_contiguous(events, after, closed_before))
+
+
+def readable_seq(after):
+    """Highest seq a consumer at ``after`` can move to without skipping a hole"""
+    closed_before = _closed_before()
+    events = (
+        OutboxEvent.objects.using(router.db_for_write(OutboxEvent)).filter(seq__gt=after).order_by('seq')
+        .values('seq', 'created_at').iterator(chunk_size=10000)
+    )
+    for event in _contiguous(events, after, closed_before):
+        after = event['seq']
+    return after
+
+
+def acknowledge(consumer, seq):
+    """Advance a consumer's committed position (never moves backwards)"""
+    entry, _ = OutboxConsumer.objects.get_or_create(name=consumer)
+    if seq > entry.last_seq:
+        OutboxConsumer.objects.filter(pk=entry.pk, last_seq__lt=seq).update(
+            last_seq=seq, updated_at=timezone.now()
+        )
+    return max(seq, entry.last_seq)
+
+
+def compactable_seq():
+    """Highest seq every registered consumer has acknowledged"""
+    return OutboxConsumer.objects.aggregate(low=Min('last_seq'))['low'] or 0
+
+
+def compact(batch_size=10000):
+    """Delete fully consumed events in primary-key range batches"""
+    upto = compactable_seq()
+    deleted = 0
+    low = OutboxEvent.objects.filter(seq__lte=upto).aggregate(low=Min('seq'))['low']
+    while low is not None and low <= upto:
+        high = min(low + batch_size - 1, upto)
+        count, _ = OutboxEvent.objects.filter(seq__gte=low, seq__lte=high).delete()
+        deleted += count
+        low = high + 1
+    return deleted
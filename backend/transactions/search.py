@@ -0,0 +1,58 @@
+"""Full-text search over transaction description, beneficiary and reference.
+
+PostgreSQL uses pg_trgm GIN indexes and SQLite an FTS5 trigram table kept
+in sync by triggers (see migration 0003). Both give substring semantics
+equivalent to ``icontains``; other backends, and terms shorter than a
+trigram, fall back to ``icontains``.
+"""
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+SEARCH_FIELDS = ('description', 'beneficiary_name', 'reference_number')
+
+FTS_TABLE = 'transactions_transaction_fts'
+
+MIN_INDEXED_LENGTH = 3
+
+
+def icontains_filter(term):
+    query = Q()
+    for field in SEARCH_FIELDS:
+        query |= Q(**{f'{field}__icontains': term})
+    return query
+
+
+def _like_pattern(term):
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def search_filter(term, using):
+    """Return a Q object matching transactions that contain ``term``.
+
+    ``using`` is the alias the filtered queryset reads from (``queryset.db``),
+    which can be a replica or a shard on another backend than ``default``.
+    """
+    vendor = connections[using].vendor
+    term = term.strip()
+    if len(term) < MIN_INDEXED_LENGTH:
+        return icontains_filter(term)
+
+    if vendor == 'postgresql':
+        where = ' OR '.join(f'"{field}" ILIKE %s' for field in SEARCH_FIELDS)
+        pattern = _like_pattern(term)
+        return Q(id__in=RawSQL(
+            f'SELECT id FROM transactions_transaction WHERE {where}',
+            [pattern] * len(SEARCH_FIELDS)
+        ))
+
+    if vendor == 'sqlite':
+        # Quote the term so FTS5 treats it as one phrase, not query syntax
+        phrase = '"{}"'.format(term.replace('"', '""'))
+        return Q(id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [phrase]
+        ))
+
+    return icontains_filter(term)
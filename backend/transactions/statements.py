@@ -0,0 +1,176 @@
+import csv
+import heapq
+import logging
+import os
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.html import escape
+
+from accounts.models import Account
+from .models import Transaction, ArchivedTransaction, Statement
+from .archive import reaches_archive
+
+STATEMENT_COLUMNS = ['Date', 'Reference', 'Description', 'Type', 'Status', 'Debit', 'Credit']
+
+CREDIT_TYPES = ('DEPOSIT',)
+
+logger = logging.getLogger(__name__)
+
+
+def parse_period(value):
+    """Parse a YYYY-MM string into the first day of that month"""
+    return datetime.strptime(value, '%Y-%m').date()
+
+
+def period_bounds(period):
+    """Return aware [start, end) datetimes covering the statement month"""
+    if period.month == 12:
+        next_period = date(period.year + 1, 1, 1)
+    else:
+        next_period = date(period.year, period.month + 1, 1)
+    start = timezone.make_aware(datetime.combine(period, datetime.min.time()))
+    end = timezone.make_aware(datetime.combine(next_period, datetime.min.time()))
+    return start, end
+
+
+def statement_paths(account_number, period):
+    """Return (csv, html) paths relative to MEDIA_ROOT for an account statement"""
+    base = os.path.join('statements', f"{period:%Y-%m}", account_number)
+    return f"{base}.csv", f"{base}.html"
+
+
+def is_generated(statement):
+    return all(
+        os.path.exists(os.path.join(settings.MEDIA_ROOT, name))
+        for name in (statement.csv_file, statement.html_file)
+    )
+
+
+def _stream_transactions(account_id, start, end):
+    """Yield the month's rows in time order, merging in the archive if needed"""
+    streams = [
+        model.objects
+        .filter(from_account_id=account_id, created_at__gte=start, created_at__lt=end)
+        .order_by('created_at', 'id')
+        .values_list('created_at', 'reference_number', 'description',
+                     'transaction_type', 'status', 'amount')
+        .iterator(chunk_size=settings.STATEMENT_CHUNK_SIZE)
+        for model in ((ArchivedTransaction, Transaction) if reaches_archive(start) else (Transaction,))
+    ]
+    if len(streams) == 1:
+        return streams[0]
+    return heapq.merge(*streams, key=lambda row: row[0])
+
+
+def render_statement(account, period):
+    """Stream one month of transactions into CSV and HTML statement files"""
+    csv_name, html_name = statement_paths(account.account_number, period)
+    csv_path = os.path.join(settings.MEDIA_ROOT, csv_name)
+    html_path = os.path.join(settings.MEDIA_ROOT, html_name)
+    os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+
+    start, end = period_bounds(period)
+    count = 0
+    total_credits = Decimal('0.00')
+    total_debits = Decimal('0.00')
+
+    # Write to temporary files and rename so an interrupted run never leaves
+    # a half-written statement that looks complete.
+    with open(f"{csv_path}.tmp", 'w', newline='') as csv_out, \
+            open(f"{html_path}.tmp", 'w') as html_out:
+        writer = csv.writer(csv_out)
+        writer.writerow(STATEMENT_COLUMNS)
+        html_out.write(
+            '<!DOCTYPE html><html><head><meta charset="utf-8">'
+            f'<title>Statement {escape(account.account_number)} {period:%B %Y}</title>'
+            '<style>body{font-family:sans-serif;font-size:12px}'
+            'table{border-collapse:collapse;width:100%}'
+            'th,td{border:1px solid #ccc;padding:4px}td.num{text-align:right}</style>'
+            '</head><body>'
+            f'<h2>BlueBank Statement - {period:%B %Y}</h2>'
+            f'<p>Account: {escape(account.account_number)} ({escape(account.get_account_type_display())})<br>'
+            f'IFSC: {escape(account.ifsc_code)}</p><table><tr>'
+            + ''.join(f'<th>{column}</th>' for column in STATEMENT_COLUMNS)
+            + '</tr>'
+        )
+
+        for created_at, reference, description, txn_type, txn_status, amount in \
+                _stream_transactions(account.id, start, end):
+            is_credit = txn_type in CREDIT_TYPES
+            if txn_status == 'COMPLETED':
+                if is_credit:
+                    total_credits += amount
+                else:
+                    total_debits += amount
+            debit = '' if is_credit else f"{amount:.2f}"
+            credit = f"{amount:.2f}" if is_credit else ''
+            when = timezone.localtime(created_at).strftime('%Y-%m-%d %H:%M')
+            writer.writerow([when, reference, description, txn_type, txn_status, debit, credit])
+            html_out.write(
+                f'<tr><td>{when}</td><td>{escape(reference)}</td><td>{escape(description)}</td>'
+                f'<td>{txn_type}</td><td>{txn_status}</td>'
+                f'<td class="num">{debit}</td><td class="num">{credit}</td></tr>'
+            )
+            count += 1
+
+        html_out.write(
+            f'</table><p>Transactions: {count}<br>'
+            f'Total credits: &#8377;{total_credits:.2f}<br>'
+            f'Total debits: &#8377;{total_debits:.2f}</p></body></html>'
+        )
+
+    os.replace(f"{csv_path}.tmp", csv_path)
+    os.replace(f"{html_path}.tmp", html_path)
+
+    return {
+        'account_id': account.id,
+        'csv_file': csv_name,
+        'html_file': html_name,
+        'transaction_count': count,
+        'total_credits': total_credits,
+        'total_debits': total_debits,
+    }
+
+
+def generate_statements(account_ids, period, force=False):
+    """Render statements for a batch of accounts, skipping finished ones.
+
+    Runs inside a worker process and only reads from the database; the
+    parent records the returned rows so there is a single writer.
+    """
+    rendered = []
+    skipped = failed = 0
+    existing = {
+        statement.account_id: statement
+        for statement in Statement.objects.filter(account_id__in=account_ids, period=period)
+    }
+    for account in Account.objects.filter(id__in=account_ids).order_by('id'):
+        statement = existing.get(account.id)
+        if statement and not force and is_generated(statement):
+            skipped += 1
+            continue
+        try:
+            rendered.append(render_statement(account, period))
+        except Exception:
+            logger.exception('Statement generation failed for account %s', account.account_number)
+            failed += 1
+    return {'statements': rendered, 'skipped': skipped, 'failed': failed}
+
+
+def record_statements(rendered, period, run):
+    for row in rendered:
+        Statement.objects.update_or_create(
+            account_id=row['account_id'],
+            period=period,
+            defaults={
+                'run': run,
+                'csv_file': row['csv_file'],
+                'html_file': row['html_file'],
+                'transaction_count': row['transaction_count'],
+                'total_credits': row['total_credits'],
+                'total_debits': row['total_debits'],
+            }
+        )
@@ -1,3 +1,594 @@
-from django.test import TestCase
+import csv
+import glob
+import io
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.models.signals import post_init
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import Account
+from bluebank import asgi, sharding
+from users.models import User
+from . import balances, events, export, outbox, reconcile, search, transfers
+from .models import (
+    Transaction, ArchivedTransaction, ShardTransfer, OutboxEvent, SpendingRollup, Statement, StatementRun,
+)
+from .statements import STATEMENT_COLUMNS
+
+SHARDED = override_settings(
+    SHARD_DATABASE_URLS=['shard_0', 'shard_1'],
+    SHARD_MAP={'BLUE001': 'shard_0', 'BLUE002': 'shard_1'},
+)
+
+
+class ShardedTestCase(TestCase):
+    """TestCase with two SQLite shards of its own, created for the class"""
+    # Named in setUpClass: the runner checks every alias in `databases` before the shards exist
+    databases = {'default'}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.databases = {'default', 'shard_0', 'shard_1'}
+        cls.added_shards = [alias for alias in ('shard_0', 'shard_1') if alias not in connections]
+        for alias in cls.added_shards:
+            connections.settings[alias] = connections.configure_settings({
+                DEFAULT_DB_ALIAS: {}, alias: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'},
+            })[alias]
+            connections[alias].creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        for alias in cls.added_shards:
+            connections[alias].creation.destroy_test_db(':memory:', verbosity=0)
+            del connections[alias]
+            del connections.settings[alias]
+
+
+@SHARDED
+class ShardedTransferTests(ShardedTestCase):
+
+    def setUp(self):
+        # Home shards and account locations are cached by user id / number
+        cache.clear()
+        self.alice = self.user('alice', 'BLUE001')
+        self.carol = self.user('carol', 'BLUE001')
+        self.bob = self.user('bob', 'BLUE002')
+        with sharding.use_shard('shard_0'):
+            self.alice_account = Account.objects.create(user=self.alice, balance=Decimal('1000.00'))
+            self.carol_account = Account.objects.create(user=self.carol, balance=Decimal('50.00'))
+        with sharding.use_shard('shard_1'):
+            self.bob_account = Account.objects.create(user=self.bob, balance=Decimal('100.00'))
+
+    def user(self, name, branch_code):
+        return User.objects.create_user(
+            username=name, email=f'{name}@example.com', password='unused', branch_code=branch_code
+        )
+
+    def transfer(self, to_account, amount='100.00'):
+        return self.client.post('/api/transactions/transfer/', {
+            'from_account_id': self.alice_account.id,
+            'to_account_number': to_account.account_number,
+            'beneficiary_name': 'Beneficiary',
+            'amount': amount,
+            'description': 'Rent',
+        }, content_type='application/json', secure=True,
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.alice)}')
+
+    def balance(self, account):
+        return Account.objects.using(account._state.db).get(pk=account.pk).balance
+
+    def test_same_shard_transfer_is_local(self):
+        response = self.transfer(self.carol_account)
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(self.balance(self.alice_account), Decimal('900.00'))
+        self.assertEqual(self.balance(self.carol_account), Decimal('150.00'))
+        self.assertFalse(ShardTransfer.objects.using('shard_0').exists())
+
+    def test_cross_shard_transfer_debits_then_credits(self):
+        response = self.transfer(self.bob_account)
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(self.balance(self.alice_account), Decimal('900.00'))
+        self.assertEqual(self.balance(self.bob_account), Decimal('200.00'))
+
+        transfer = ShardTransfer.objects.using('shard_0').get()
+        self.assertEqual((transfer.state, transfer.to_shard), ('COMPLETED', 'shard_1'))
+        credit = Transaction.objects.using('shard_1').get(reference_number=f'CR{response.data["reference_number"]}')
+        self.assertEqual(credit.from_account_id, self.bob_account.id)
+
+    def test_refused_credit_reverses_the_debit(self):
+        # Frozen after its shard was looked up, so the credit step refuses it
+        sharding.locate_account(self.bob_account.account_number)
+        Account.objects.using('shard_1').filter(pk=self.bob_account.pk).update(status='FROZEN')
+        response = self.transfer(self.bob_account)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.balance(self.alice_account), Decimal('1000.00'))
+        self.assertEqual(self.balance(self.bob_account), Decimal('100.00'))
+        transfer = ShardTransfer.objects.using('shard_0').select_related('debit').get()
+        self.assertEqual(transfer.state, 'REVERSED')
+        self.assertTrue(Transaction.objects.using('shard_0').filter(
+            reference_number=f'RV{transfer.debit.reference_number}').exists())
+
+    def test_unreachable_shard_leaves_transfer_for_recovery(self):
+        with mock.patch.object(transfers, 'credit', side_effect=DatabaseError('shard_1 is down')):
+            response = self.transfer(self.bob_account)
+        self.assertEqual(response.status_code, 202, response.content)
+        transfer = ShardTransfer.objects.using('shard_0').get()
+        self.assertEqual((transfer.state, transfer.attempts), ('DEBITED', 1))
+        self.assertEqual(self.balance(self.alice_account), Decimal('900.00'))
+        self.assertEqual(self.balance(self.bob_account), Decimal('100.00'))
+
+        call_command('recover_transfers', older_than=0, stdout=mock.MagicMock())
+        self.assertEqual(ShardTransfer.objects.using('shard_0').get().state, 'COMPLETED')
+        self.assertEqual(self.balance(self.bob_account), Decimal('200.00'))
+
+    def test_recovery_does_not_credit_twice(self):
+        with mock.patch.object(transfers, 'complete'):
+            # Credited, but the process died before marking the transfer done
+            response = self.transfer(self.bob_account)
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(ShardTransfer.objects.using('shard_0').get().state, 'DEBITED')
+
+        for _ in range(2):
+            call_command('recover_transfers', older_than=0, stdout=mock.MagicMock())
+        self.assertEqual(ShardTransfer.objects.using('shard_0').get().state, 'COMPLETED')
+        self.assertEqual(self.balance(self.bob_account), Decimal('200.00'))
+        self.assertEqual(Transaction.objects.using('shard_1').filter(reference_number__startswith='CR').count(), 1)
+
+    def test_transfer_without_destination_account(self):
+        response = self.client.post('/api/transactions/transfer/', {
+            'from_account_id': self.alice_account.id,
+            'beneficiary_name': 'Cash',
+            'amount': '10.00',
+        }, content_type='application/json', secure=True,
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.alice)}')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(self.balance(self.alice_account), Decimal('990.00'))
+
+    def test_sharded_query_needs_a_shard(self):
+        with self.assertRaises(sharding.ShardNotSelected):
+            Account.objects.count()
+        with sharding.use_shard('shard_1'):
+            self.assertEqual(Account.objects.count(), 1)
+
+    def test_account_numbers_carry_their_shard(self):
+        self.assertTrue(self.alice_account.account_number.startswith('50100'))
+        self.assertTrue(self.bob_account.account_number.startswith('50101'))
+        self.assertEqual(sharding.locate_account(self.bob_account.account_number), 'shard_1')
+
+    def test_bank_analytics_fans_out_across_shards(self):
+        self.assertEqual(self.transfer(self.carol_account).status_code, 201)
+        self.assertEqual(self.transfer(self.bob_account, '30.00').status_code, 201)
+        admin = User.objects.create_user(username='admin', email='admin@example.com', password='unused',
+                                         is_staff=True)
+        response = self.client.get('/api/transactions/analytics/bank/?group_by=type', secure=True,
+                                   HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(admin)}')
+        self.assertEqual(response.status_code, 200, response.content)
+        totals = {row['transaction_type']: row for row in response.data['results']}
+        # Carol's credit is on shard_0, Bob's on shard_1
+        self.assertEqual((totals['DEPOSIT']['received'], totals['DEPOSIT']['transaction_count']), ('130.00', 2))
+        self.assertEqual(totals['TRANSFER']['spent'], '130.00')
+
+        response = self.client.get('/api/transactions/analytics/bank/?group_by=account', secure=True,
+                                   HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(admin)}')
+        self.assertEqual(response.status_code, 400)
+
+
+class OutboxFeedTests(TestCase):
+    def setUp(self):
+        self.events = [outbox.record('test.event', 'test', number, {'n': number}) for number in range(4)]
+        self.seqs = [event.seq for event in self.events]
+        self.start = self.seqs[0] - 1
+
+    def feed(self, after=None):
+        return [event['seq'] for event in outbox.read_feed(self.start if after is None else after, 100)]
+
+    def test_feed_is_ordered_and_acknowledge_never_moves_back(self):
+        self.assertEqual(self.feed(), self.seqs)
+        self.assertEqual(self.feed(self.seqs[1]), self.seqs[2:])
+        self.assertEqual(outbox.acknowledge('dwh', self.seqs[2]), self.seqs[2])
+        self.assertEqual(outbox.acknowledge('dwh', self.seqs[0]), self.seqs[2])
+        self.assertEqual(outbox.compactable_seq(), self.seqs[2])
+
+    def test_feed_stops_at_a_hole_that_may_still_fill(self):
+        # As if the second event's transaction were still open
+        self.events[1].delete()
+        with mock.patch.object(outbox, '_closed_before', return_value=None):
+            self.assertEqual(self.feed(), self.seqs[:1])
+            self.assertEqual(outbox.readable_seq(self.start), self.seqs[0])
+        with mock.patch.object(outbox, '_closed_before', return_value=self.events[2].created_at):
+            self.assertEqual(self.feed(), self.seqs[:1])
+        closed = self.events[3].created_at + timedelta(seconds=1)
+        with mock.patch.object(outbox, '_closed_before', return_value=closed):
+            self.assertEqual(self.feed(), [self.seqs[0]] + self.seqs[2:])
+            self.assertEqual(outbox.readable_seq(self.start), self.seqs[3])
+
+    def test_sqlite_holes_never_fill(self):
+        self.events[1].delete()
+        self.assertEqual(self.feed(), [self.seqs[0]] + self.seqs[2:])
+
+    def test_compacted_holes_are_passed(self):
+        outbox.acknowledge('dwh', self.seqs[1])
+        outbox.acknowledge('fraud', self.seqs[2])
+        consumed = OutboxEvent.objects.filter(seq__lte=self.seqs[1]).count()
+        self.assertEqual(outbox.compact(batch_size=1), consumed)
+        self.assertFalse(OutboxEvent.objects.filter(seq__lte=self.seqs[1]).exists())
+        with mock.patch.object(outbox, '_closed_before', return_value=None):
+            self.assertEqual(self.feed(0), self.seqs[2:])
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='saver', email='saver@example.com', password='unused')
+        self.account = Account.objects.create(user=self.user, balance=Decimal('500.00'))
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def transaction(self, **fields):
+        return Transaction.objects.create(**{
+            'from_account': self.account, 'to_account_number': '501009999999', 'beneficiary_name': 'Shop',
+            'amount': Decimal('12.34'), 'transaction_type': 'TRANSFER', 'status': 'PENDING', **fields
+        })
+
+    def run_export(self, **since):
+        return export.export(self.root, 'columnar', chunk_size=2, file_rows=3, **since)
+
+    def exported(self):
+        """Latest exported copy of each row, keyed by id"""
+        rows = {}
+        for path in sorted(glob.glob(os.path.join(self.root, 'date=*', '*.btxc'))):
+            columns = export.read_columnar(path)
+            for values in zip(*(columns[name] for name in export.FIELDS)):
+                rows[values[0]] = dict(zip(export.FIELDS, values))
+        return rows
+
+    def test_columnar_round_trip(self):
+        self.transaction(description='Groceries – ünïcode', balance_after=Decimal('487.66'),
+                         processed_at=timezone.now())
+        self.transaction(transaction_fee=Decimal('0.50'))
+        self.transaction(amount=Decimal('99999.99'), to_account_number='', beneficiary_name='')
+        summary = self.run_export()
+        self.assertEqual((summary['mode'], summary['rows']), ('scan', 3))
+        expected = {row[0]: dict(zip(export.FIELDS, row)) for row in Transaction.objects.values_list(*export.FIELDS)}
+        for row in expected.values():
+            row['transaction_id'] = str(row['transaction_id'])
+        self.assertEqual(self.exported(), expected)
+
+    def test_date_scan_leaves_the_watermark_alone(self):
+        old = self.transaction()
+        Transaction.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=30))
+        first = self.run_export()
+        self.assertTrue(first['acknowledged'])
+        self.assertEqual(export.last_exported_seq(), first['upto_seq'])
+
+        old.refresh_from_db()
+        old.status = 'COMPLETED'
+        old.save()
+        self.transaction()
+        today = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        scan = self.run_export(since_date=today)
+        self.assertEqual((scan['rows'], scan['acknowledged']), (1, False))
+        self.assertEqual(export.last_exported_seq(), first['upto_seq'])
+
+        changes = self.run_export()
+        self.assertEqual(changes['mode'], 'changes')
+        self.assertEqual(self.exported()[old.pk]['status'], 'COMPLETED')
+
+    def test_replica_needs_a_date_scan(self):
+        with self.assertRaises(CommandError):
+            call_command('export_transactions', '--replica', '--output', self.root, stdout=mock.MagicMock())
+
+
+class EventStreamTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='listener', email='listener@example.com', password='unused')
+
+    def test_stream_is_only_served_by_the_events_process(self):
+        response = self.client.get('/api/events/', HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        self.assertEqual(response.status_code, 503)
+
+    def test_ticket_opens_the_stream(self):
+        response = self.client.post(
+            '/api/events/ticket/', HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(events.ticket_user_id(response.json()['ticket']), self.user.pk)
+        self.assertEqual(self.client.post('/api/events/ticket/').status_code, 401)
+
+    async def test_access_token_in_the_url_is_refused(self):
+        response = await self.async_client.get(f'/api/events/?token={AccessToken.for_user(self.user)}')
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get(f'/api/events/?ticket={AccessToken.for_user(self.user)}')
+        self.assertEqual(response.status_code, 401)
+
+    async def test_stream_accepts_a_ticket_until_it_expires(self):
+        ticket = events.issue_ticket(self.user)
+        response = await self.async_client.get(f'/api/events/?ticket={ticket}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        with override_settings(EVENTS_TICKET_MAX_AGE=-1):
+            response = await self.async_client.get(f'/api/events/?ticket={ticket}')
+        self.assertEqual(response.status_code, 401)
+
+    async def test_events_application_serves_only_the_stream(self):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'http', 'path': '/api/accounts/', 'method': 'GET', 'headers': []}
+        await asgi.events_application(scope, None, send)
+        self.assertEqual(sent[0]['status'], 404)
+
+
+class TrackingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='tracked', email='tracked@example.com', password='unused')
+        self.account = Account.objects.create(user=self.user, balance=Decimal('500.00'))
+        self.txn = Transaction.objects.create(
+            from_account=self.account, to_account_number='501009999999', amount=Decimal('20.00'),
+            transaction_type='TRANSFER', status='PENDING',
+        )
+
+    def events(self, event_type):
+        return OutboxEvent.objects.filter(event_type=event_type).count()
+
+    def test_one_post_init_handler_per_model(self):
+        for model in (Transaction, Account):
+            self.assertEqual(len(post_init._live_receivers(model)[0]), 1)
+
+    def test_status_change_reaches_outbox_and_rollups_once(self):
+        txn = Transaction.objects.get(pk=self.txn.pk)
+        txn.status = 'COMPLETED'
+        txn.save()
+        txn.save()
+        self.assertEqual(self.events('transaction.status_changed'), 1)
+        rollup = SpendingRollup.objects.get(account_id=self.account.id)
+        self.assertEqual((rollup.total_amount, rollup.transaction_count), (Decimal('20.00'), 1))
+
+        txn.status = 'CANCELLED'
+        txn.save()
+        self.assertEqual(self.events('transaction.status_changed'), 2)
+        self.assertEqual(SpendingRollup.objects.get(account_id=self.account.id).transaction_count, 0)
+
+    def test_deferred_status_is_not_treated_as_a_change(self):
+        txn = Transaction.objects.defer('status').get(pk=self.txn.pk)
+        txn.status = 'COMPLETED'
+        txn.save()
+        self.assertEqual(self.events('transaction.status_changed'), 0)
+        self.assertFalse(SpendingRollup.objects.exists())
+
+    def test_account_balance_change_is_recorded(self):
+        account = Account.objects.get(pk=self.account.pk)
+        account.balance -= Decimal('5.00')
+        account.save()
+        self.assertEqual(self.events('account.balance_changed'), 1)
+        self.assertEqual(self.events('account.status_changed'), 0)
+
+
+class HistoryTestCase(TestCase):
+    """A debit that stays hot can be older than rows already archived"""
+
+    def setUp(self):
+        user = User.objects.create_user(username='history', email='history@example.com', password='unused')
+        self.account = Account.objects.create(user=user, balance=Decimal('100.00'))
+        self.start = timezone.now() - timedelta(days=10)
+        self.hot = Transaction.objects.create(
+            from_account=self.account, amount=Decimal('30.00'), transaction_type='TRANSFER', status='COMPLETED',
+        )
+        Transaction.objects.filter(pk=self.hot.pk).update(created_at=self.at(1))
+        self.deposit = self.archived(2, 'DEPOSIT', '50.00')
+        self.payment = self.archived(3, 'TRANSFER', '20.00')
+
+    def at(self, day):
+        return self.start + timedelta(days=day)
+
+    def archived(self, day, transaction_type, amount):
+        return ArchivedTransaction.objects.create(
+            id=1000 + day, transaction_id=uuid.uuid4(), from_account=self.account, amount=Decimal(amount),
+            transaction_type=transaction_type, status='COMPLETED', reference_number=f'ARCHIVED{day}',
+            created_at=self.at(day),
+        )
+
+
+
+class BalanceHistoryTests(HistoryTestCase):
+    def balance_after(self):
+        rows = [*Transaction.objects.all(), *ArchivedTransaction.objects.all()]
+        return {txn.pk: txn.balance_after for txn in rows}
+
+    def test_backfill_walks_hot_and_archived_rows_in_time_order(self):
+        self.assertEqual(balances.backfill_account(self.account.id, batch_size=1), 3)
+        self.assertEqual(self.balance_after(), {
+            self.payment.pk: Decimal('100.00'), self.deposit.pk: Decimal('120.00'), self.hot.pk: Decimal('70.00'),
+        })
+        self.assertEqual(balances.backfill_account(self.account.id), 0)
+
+    def test_balance_at_takes_the_latest_row_from_either_table(self):
+        balances.backfill_account(self.account.id)
+        half_day = timedelta(hours=12)
+        self.assertEqual(balances.balance_at(self.account, self.at(3) + half_day)[0], Decimal('100.00'))
+        balance, txn = balances.balance_at(self.account, self.at(2) + half_day)
+        self.assertEqual((balance, txn.pk), (Decimal('120.00'), self.deposit.pk))
+        balance, txn = balances.balance_at(self.account, self.at(1) + half_day)
+        self.assertEqual((balance, txn.pk), (Decimal('70.00'), self.hot.pk))
+        self.assertEqual(balances.balance_at(self.account, self.start), (Decimal('100.00'), None))
+
+    def test_balance_at_needs_the_backfill(self):
+        with self.assertRaises(LookupError):
+            balances.balance_at(self.account, self.at(2))
+
+
+class ReconcileTests(HistoryTestCase):
+    def discrepancies(self):
+        return reconcile.reconcile_range(0, self.account.id + 1)['discrepancies']
+
+    def test_interleaved_history_reconciles(self):
+        balances.backfill_account(self.account.id)
+        self.assertEqual(self.discrepancies(), [])
+
+    def test_hot_opening_is_used_when_the_hot_row_is_earliest(self):
+        Transaction.objects.filter(pk=self.hot.pk).update(balance_after=Decimal('70.00'))
+        self.assertEqual(self.discrepancies(), [])
+
+    def test_archive_opening_that_is_not_backfilled_is_flagged(self):
+        Transaction.objects.filter(pk=self.hot.pk).update(created_at=self.at(4), balance_after=Decimal('100.00'))
+        [discrepancy] = self.discrepancies()
+        self.assertEqual(discrepancy['kind'], 'history_not_backfilled')
+
+    def test_balance_moved_without_a_transaction_is_a_mismatch(self):
+        balances.backfill_account(self.account.id)
+        Account.objects.filter(pk=self.account.pk).update(balance=Decimal('90.00'))
+        [discrepancy] = self.discrepancies()
+        self.assertEqual(
+            (discrepancy['kind'], discrepancy['expected'], discrepancy['difference']),
+            ('balance_mismatch', '100.00', '-10.00'),
+        )
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='searcher', email='searcher@example.com', password='unused')
+        account = Account.objects.create(user=user, balance=Decimal('10.00'))
+        for description in ('Electricity bill', 'Groceries'):
+            Transaction.objects.create(
+                from_account=account, amount=Decimal('1.00'), transaction_type='TRANSFER', description=description,
+            )
+
+    def test_search_uses_the_querysets_database(self):
+        queryset = Transaction.objects.using('default')
+        matches = queryset.filter(search.search_filter('TRICIT', queryset.db))
+        self.assertEqual([txn.description for txn in matches], ['Electricity bill'])
+        with mock.patch.object(search, 'connections', {'default': mock.Mock(vendor='mysql')}):
+            self.assertEqual(search.search_filter('tricit', 'default'), search.icontains_filter('tricit'))
+
+
+class StatementTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        media = override_settings(MEDIA_ROOT=self.root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.owner = User.objects.create_user(username='holder', email='holder@example.com', password='unused')
+        self.other = User.objects.create_user(username='snoop', email='snoop@example.com', password='unused')
+        self.account = Account.objects.create(user=self.owner, balance=Decimal('100.00'))
+        in_march = timezone.make_aware(datetime(2026, 3, 10, 12, 0))
+        for transaction_type, amount, description in (('DEPOSIT', '250.00', 'Salary'), ('TRANSFER', '40.50', 'Rent')):
+            txn = Transaction.objects.create(
+                from_account=self.account, amount=Decimal(amount), transaction_type=transaction_type,
+                status='COMPLETED', description=description,
+            )
+            Transaction.objects.filter(pk=txn.pk).update(created_at=in_march)
+        # Outside the month
+        Transaction.objects.create(
+            from_account=self.account, amount=Decimal('1.00'), transaction_type='TRANSFER', status='COMPLETED',
+        )
+
+    def generate(self, *args):
+        call_command('generate_statements', '--month', '2026-03', '--workers', '1', *args, stdout=io.StringIO())
+
+    def download(self, user, file_type='csv', period='2026-03'):
+        return self.client.get(
+            f'/api/transactions/statements/{self.account.id}/{period}/?file={file_type}',
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}',
+        )
+
+    def test_generates_the_months_statement(self):
+        self.generate()
+        statement = Statement.objects.get(account=self.account)
+        self.assertEqual(
+            (statement.transaction_count, statement.total_credits, statement.total_debits),
+            (2, Decimal('250.00'), Decimal('40.50')),
+        )
+        self.assertEqual(statement.run.status, 'COMPLETED')
+        with open(os.path.join(self.root, statement.csv_file), newline='') as csv_file:
+            rows = list(csv.reader(csv_file))
+        self.assertEqual(rows[0], STATEMENT_COLUMNS)
+        self.assertEqual([(row[2], row[5], row[6]) for row in rows[1:]], [('Salary', '', '250.00'), ('Rent', '40.50', '')])
+
+    def test_rerun_skips_statements_that_exist(self):
+        self.generate()
+        self.generate()
+        run = StatementRun.objects.latest('id')
+        self.assertEqual((run.generated_count, run.skipped_count), (0, 1))
+        self.generate('--force')
+        self.assertEqual(StatementRun.objects.latest('id').generated_count, 1)
+
+    def test_only_the_account_holder_can_download(self):
+        self.generate()
+        response = self.download(self.owner, 'html')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Salary', b''.join(response.streaming_content))
+        self.assertIn(f'statement_{self.account.account_number}_2026-03.html', response['Content-Disposition'])
+        self.assertEqual(self.download(self.other).status_code, 404)
+        self.assertEqual(self.client.get(f'/api/transactions/statements/{self.account.id}/2026-03/').status_code, 401)
+
+    def test_download_rejects_bad_requests(self):
+        self.assertEqual(self.download(self.owner, 'pdf').status_code, 400)
+        self.assertEqual(self.download(self.owner, period='March').status_code, 400)
+        self.assertEqual(self.download(self.owner).status_code, 404)
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        media = override_settings(MEDIA_ROOT=self.root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.user = User.objects.create_user(username='archivist', email='archivist@example.com', password='unused')
+        self.account = Account.objects.create(user=self.user, balance=Decimal('100.00'))
+        self.old_at = timezone.localtime(timezone.now() - timedelta(days=60)).replace(day=10, hour=12)
+        self.add('Old rent', 'COMPLETED', self.old_at)
+        self.add('Old pending', 'PENDING', self.old_at + timedelta(days=1))
+        self.add('Coffee', 'COMPLETED', timezone.now())
+        call_command('archive_transactions', '--older-than', '30', stdout=io.StringIO())
+
+    def add(self, description, status, created_at):
+        txn = Transaction.objects.create(
+            from_account=self.account, amount=Decimal('5.00'), transaction_type='TRANSFER', status=status,
+            description=description,
+        )
+        Transaction.objects.filter(pk=txn.pk).update(created_at=created_at)
+
+    def history(self, days):
+        response = self.client.get(
+            f'/api/transactions/history/?days={days}', HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}'
+        )
+        self.assertEqual(response.status_code, 200)
+        return [txn['description'] for txn in response.data['transactions']]
+
+    def test_only_finished_old_rows_are_archived(self):
+        self.assertEqual(list(ArchivedTransaction.objects.values_list('description', flat=True)), ['Old rent'])
+        self.assertEqual(
+            sorted(Transaction.objects.values_list('description', flat=True)), ['Coffee', 'Old pending']
+        )
+
+    def test_history_includes_archived_rows_in_range(self):
+        self.assertEqual(self.history(90), ['Coffee', 'Old pending', 'Old rent'])
+        self.assertEqual(self.history(7), ['Coffee'])
+
+    def test_statement_merges_archived_and_hot_rows(self):
+        call_command(
+            'generate_statements', '--month', f'{self.old_at:%Y-%m}', '--workers', '1', stdout=io.StringIO()
+        )
+        statement = Statement.objects.get(account=self.account)
+        with open(os.path.join(self.root, statement.csv_file), newline='') as csv_file:
+            descriptions = [row[2] for row in list(csv.reader(csv_file))[1:]]
+        self.assertEqual(descriptions, ['Old rent', 'Old pending'])
+        self.assertEqual(statement.total_debits, Decimal('5.00'))
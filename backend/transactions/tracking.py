@@ -0,0 +1,40 @@
+"""Change tracking shared by the outbox and the spending rollups.
+
+A single post_init handler keeps the loaded values of the fields either of
+them watches, so loading a row runs one handler rather than one per
+consumer. The post_save handlers hand those values to ``outbox`` and
+``analytics`` and then remember the saved ones.
+"""
+from accounts.models import Account
+from .models import Transaction
+from . import analytics, outbox
+
+TRACKED_FIELDS = {
+    Transaction: ('status',),
+    Account: ('balance', 'status'),
+}
+
+
+def remember_state(sender, instance, **kwargs):
+    """post_init: keep the loaded values so post_save can tell what changed"""
+    # Read __dict__ directly so deferred fields are not fetched
+    instance._tracked_state = {
+        field: instance.__dict__.get(field) for field in TRACKED_FIELDS[sender]
+    }
+
+
+def transaction_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = {} if created else getattr(instance, '_tracked_state', {})
+    outbox.transaction_saved(instance, created, previous)
+    analytics.transaction_saved(instance, created, previous)
+    remember_state(sender, instance)
+
+
+def account_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = {} if created else getattr(instance, '_tracked_state', {})
+    outbox.account_saved(instance, created, previous)
+    remember_state(sender, instance)
@@ -0,0 +1,155 @@
+"""Fund transfers between accounts on different shards.
+
+One database transaction cannot span two shards, so a cross-shard
+transfer is three local transactions, each safe to repeat:
+
+1. ``debit`` - on the source shard: lock the account, check the balance
+   and commit the completed debit row with a DEBITED ``ShardTransfer``.
+2. ``credit`` - on the destination shard: lock the beneficiary account
+   and credit it unless the credit row (reference ``CR<ref>``) already
+   exists. A beneficiary that is missing or not active refuses the credit.
+3. ``complete`` - on the source shard: mark the transfer COMPLETED, or
+   after a refused credit ``reverse`` it, refunding the debit with an
+   ``RV<ref>`` deposit.
+
+A transfer left DEBITED - the process died, or the destination shard was
+unreachable - is finished by ``recover_transfers``, which repeats 2 and 3.
+"""
+from django.db import router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from accounts.models import Account
+from bluebank import sharding
+from .models import Transaction, ShardTransfer
+
+
+class CreditRefused(Exception):
+    pass
+
+
+def debit(serializer, to_shard):
+    """Step 1, on the selected (source) shard.
+
+    Returns (transfer, from_account), or None if the balance is too low.
+    """
+    data = serializer.validated_data
+    with transaction.atomic(using=router.db_for_write(Transaction)):
+        locked = Account.objects.select_for_update().get(pk=data['from_account_id'])
+        if locked.balance < data['amount']:
+            return None
+        debit_row = serializer.save()
+        from_account = debit_row.from_account
+        from_account.balance -= debit_row.amount
+        from_account.save()
+
+        debit_row.status = 'COMPLETED'
+        debit_row.balance_after = from_account.balance
+        debit_row.processed_at = timezone.now()
+        debit_row.save()
+        transfer = ShardTransfer.objects.create(
+            debit=debit_row,
+            to_shard=to_shard,
+            to_account_number=debit_row.to_account_number,
+            amount=debit_row.amount,
+        )
+    return transfer, from_account
+
+
+def credit(transfer):
+    """Step 2: credit the beneficiary at most once; returns (credit row, account)"""
+    debit_row = transfer.debit
+    sender = debit_row.from_account
+    reference = f"CR{debit_row.reference_number}"
+    with sharding.use_shard(transfer.to_shard), transaction.atomic(using=transfer.to_shard):
+        to_account = (
+            Account.objects.select_for_update()
+            .filter(account_number=transfer.to_account_number)
+            .first()
+        )
+        if to_account is None:
+            raise CreditRefused('Beneficiary account not found')
+        # The lock above serialises retries, so this check cannot race
+        existing = Transaction.objects.filter(reference_number=reference).first()
+        if existing is not None:
+            return existing, to_account
+        if to_account.status != 'ACTIVE':
+            raise CreditRefused('Beneficiary account is not active')
+
+        to_account.balance += transfer.amount
+        to_account.save()
+        credit_row = Transaction.objects.create(
+            from_account=to_account,  # For accounting purposes
+            to_account_number=sender.account_number,
+            beneficiary_name=f"{sender.user.first_name} {sender.user.last_name}",
+            amount=transfer.amount,
+            transaction_type='DEPOSIT',
+            status='COMPLETED',
+            description=f"Credit from {sender.account_number} - {debit_row.description}",
+            reference_number=reference,
+            balance_after=to_account.balance,
+            processed_at=timezone.now()
+        )
+    return credit_row, to_account
+
+
+def complete(transfer):
+    """Step 3: mark a credited transfer COMPLETED"""
+    ShardTransfer.objects.using(transfer._state.db).filter(pk=transfer.pk, state='DEBITED').update(
+        state='COMPLETED', attempts=F('attempts') + 1, updated_at=timezone.now()
+    )
+
+
+def reverse(transfer, reason):
+    """Step 3 after a refused credit: refund the debit; returns (refund row, account) or None"""
+    shard = transfer._state.db
+    debit_row = transfer.debit
+    with sharding.use_shard(shard), transaction.atomic(using=shard):
+        account = Account.objects.select_for_update().get(pk=debit_row.from_account_id)
+        locked = ShardTransfer.objects.select_for_update().get(pk=transfer.pk)
+        if locked.state != 'DEBITED':
+            return None
+        account.balance += locked.amount
+        account.save()
+        refund = Transaction.objects.create(
+            from_account=account,
+            to_account_number=locked.to_account_number,
+            beneficiary_name=debit_row.beneficiary_name,
+            amount=locked.amount,
+            transaction_type='DEPOSIT',
+            status='COMPLETED',
+            description=f"Reversal of {debit_row.reference_number} - {reason}",
+            reference_number=f"RV{debit_row.reference_number}",
+            balance_after=account.balance,
+            processed_at=timezone.now()
+        )
+        locked.state = 'REVERSED'
+        locked.attempts += 1
+        locked.last_error = reason
+        locked.save()
+    return refund, account
+
+
+def settle(transfer):
+    """Steps 2 and 3 for a DEBITED transfer.
+
+    Returns ('COMPLETED', credit row, beneficiary account) or ('REVERSED',
+    refund row, source account). Database errors propagate and leave the
+    transfer DEBITED for ``recover_transfers``.
+    """
+    try:
+        credit_row, to_account = credit(transfer)
+    except CreditRefused as exc:
+        reversed_ = reverse(transfer, str(exc))
+        if reversed_ is None:
+            return ('REVERSED', None, None)
+        return ('REVERSED', *reversed_)
+    complete(transfer)
+    return ('COMPLETED', credit_row, to_account)
+
+
+def record_failure(transfer, error):
+    """Note a failed settle attempt on a transfer that stays DEBITED"""
+    ShardTransfer.objects.using(transfer._state.db).filter(pk=transfer.pk).update(
+        attempts=F('attempts') + 1, last_error=str(error)[:1000], updated_at=timezone.now()
+    )
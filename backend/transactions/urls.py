@@ -7,4 +7,9 @@ urlpatterns = [
     path('transfer/', views.fund_transfer, name='fund_transfer'),
     path('history/', views.transaction_history, name='transaction_history'),
     path('summary/', views.transaction_summary, name='transaction_summary'),
+    path('analytics/', views.spending_analytics, name='spending_analytics'),
+    path('analytics/bank/', views.bank_analytics, name='bank_analytics'),
+    path('search/', views.TransactionSearchView.as_view(), name='transaction_search'),
+    path('statements/', views.StatementListView.as_view(), name='statement_list'),
+    path('statements/<int:account_id>/<str:period>/', views.statement_download, name='statement_download'),
 ]
\ No newline at end of file
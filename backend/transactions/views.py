@@ -1,15 +1,41 @@
 from django.shortcuts import render
 from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
-from django.db import transaction
+from rest_framework.pagination import CursorPagination
+from rest_framework.exceptions import ValidationError
+import os
+from datetime import timedelta
+from django.conf import settings
+from django.db import DatabaseError, router, transaction
+from django.db.models import Q
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+import asyncio
 from django.utils import timezone
-from .models import Transaction
-from .Serializers import TransactionSerializer, FundTransferSerializer, TransactionHistorySerializer
+from .models import Transaction, ArchivedTransaction, Statement
+from .Serializers import (
+    TransactionSerializer,
+    FundTransferSerializer,
+    TransactionHistorySerializer,
+    StatementSerializer
+)
+from .statements import parse_period
+from .search import search_filter
+from .archive import reaches_archive
+from . import analytics, events, outbox, transfers
+from .models import OutboxConsumer
 from accounts.models import Account
+from users.models import User
+from bluebank.fast_serializers import ValuesListMixin, values_serializer
+from bluebank import sharding
+from bluebank.throttling import throttle_scope
 
-class TransactionListView(generics.ListAPIView):
+class TransactionListView(ValuesListMixin, generics.ListAPIView):
     serializer_class = TransactionHistorySerializer
     permission_classes = [IsAuthenticated]
 
@@ -25,6 +51,46 @@ class TransactionDetailView(generics.RetrieveAPIView):
         user_accounts = Account.objects.filter(user=self.request.user)
         return Transaction.objects.filter(from_account__in=user_accounts)
 
+class TransactionSearchPagination(CursorPagination):
+    page_size = 20
+    ordering = ('-created_at', '-id')
+
+class TransactionSearchView(ValuesListMixin, generics.ListAPIView):
+    """Full-text search over the user's transactions (?q=, account_id, days, type)"""
+    serializer_class = TransactionHistorySerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = TransactionSearchPagination
+
+    def get_queryset(self):
+        params = self.request.query_params
+        query = params.get('q', '').strip()
+        if not query:
+            raise ValidationError({'q': 'A search term is required'})
+
+        user_accounts = Account.objects.filter(user=self.request.user)
+        if params.get('account_id'):
+            user_accounts = user_accounts.filter(id=params['account_id'])
+
+        queryset = Transaction.objects.filter(from_account__in=user_accounts)
+        if params.get('days'):
+            try:
+                days = int(params['days'])
+            except ValueError:
+                raise ValidationError({'days': 'Must be an integer'})
+            queryset = queryset.filter(created_at__gte=timezone.now() - timedelta(days=days))
+        if params.get('type'):
+            queryset = queryset.filter(transaction_type=params['type'].upper())
+
+        return queryset.filter(search_filter(query, queryset.db))
+
+class StatementListView(generics.ListAPIView):
+    serializer_class = StatementSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Statement.objects.filter(account__user=self.request.user).select_related('account')
+
+@throttle_scope('transfer')
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def fund_transfer(request):
@@ -32,7 +98,27 @@ def fund_transfer(request):
     serializer = FundTransferSerializer(data=request.data, context={'request': request})
     
     if serializer.is_valid():
-        with transaction.atomic():
+        to_account_number = serializer.validated_data.get('to_account_number')
+        if sharding.enabled() and to_account_number:
+            to_shard = sharding.locate_account(to_account_number)
+            if to_shard is not None and to_shard != sharding.current_shard():
+                return _cross_shard_transfer(serializer, to_shard)
+
+        with transaction.atomic(using=router.db_for_write(Transaction)):
+            # Lock both accounts (in id order, so opposing transfers cannot
+            # deadlock) before reading balances, so balance_after follows
+            # the order in which the balances actually changed
+            data = serializer.validated_data
+            accounts = Q(id=data['from_account_id'])
+            if data.get('to_account_number'):
+                accounts |= Q(account_number=data['to_account_number'], status='ACTIVE')
+            locked = {
+                account.id: account
+                for account in Account.objects.select_for_update().filter(accounts).order_by('id')
+            }
+            if locked[data['from_account_id']].balance < data['amount']:
+                return Response({'non_field_errors': ['Insufficient balance']}, status=status.HTTP_400_BAD_REQUEST)
+            
             # Create transaction record
             transfer_transaction = serializer.save()
             
@@ -55,6 +141,7 @@ def fund_transfer(request):
             from_account.save()
             
             # If internal transfer, credit to destination account
+            credit_transaction = None
             if is_internal_transfer and to_account:
                 to_account.balance += transfer_transaction.amount
                 to_account.save()
@@ -63,7 +150,7 @@ def fund_transfer(request):
                 transfer_transaction.to_account = to_account
                 
                 # Create a credit transaction record for the recipient
-                Transaction.objects.create(
+                credit_transaction = Transaction.objects.create(
                     from_account=to_account,  # For accounting purposes
                     to_account=from_account,
                     to_account_number=from_account.account_number,
@@ -73,14 +160,21 @@ def fund_transfer(request):
                     status='COMPLETED',
                     description=f"Credit from {from_account.account_number} - {transfer_transaction.description}",
                     reference_number=f"CR{transfer_transaction.reference_number}",
+                    balance_after=to_account.balance,
                     processed_at=timezone.now()
                 )
             
             # Mark transaction as completed
             transfer_transaction.status = 'COMPLETED'
+            transfer_transaction.balance_after = from_account.balance
             transfer_transaction.processed_at = timezone.now()
             transfer_transaction.save()
             
+            # Push live updates to both parties' event streams once committed
+            transaction.on_commit(lambda: events.publish_transfer(
+                transfer_transaction, from_account, credit_transaction, to_account
+            ))
+            
             response_data = {
                 'message': 'Transfer completed successfully',
                 'transaction_id': str(transfer_transaction.transaction_id),
@@ -98,6 +192,49 @@ def fund_transfer(request):
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+def _cross_shard_transfer(serializer, to_shard):
+    """fund_transfer to an account on another shard, see transactions.transfers"""
+    debited = transfers.debit(serializer, to_shard)
+    if debited is None:
+        return Response({'non_field_errors': ['Insufficient balance']}, status=status.HTTP_400_BAD_REQUEST)
+    transfer, from_account = debited
+    debit = transfer.debit
+
+    try:
+        outcome, row, account = transfers.settle(transfer)
+    except DatabaseError as exc:
+        # Debited but not yet credited; recover_transfers finishes it
+        transfers.record_failure(transfer, exc)
+        events.publish_transfer(debit, from_account)
+        return Response({
+            'message': 'Transfer accepted and is being processed',
+            'transaction_id': str(debit.transaction_id),
+            'reference_number': debit.reference_number,
+            'amount': debit.amount,
+            'remaining_balance': from_account.balance,
+            'transfer_type': 'Internal',
+            'status': 'PROCESSING',
+        }, status=status.HTTP_202_ACCEPTED)
+
+    if outcome == 'REVERSED':
+        if row is not None:
+            events.publish_transfer(debit, from_account)
+            events.publish_transfer(row, account)
+        return Response({'non_field_errors': ['Beneficiary account is not active; the amount was refunded']},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    events.publish_transfer(debit, from_account, row, account)
+    return Response({
+        'message': 'Transfer completed successfully',
+        'transaction_id': str(debit.transaction_id),
+        'reference_number': debit.reference_number,
+        'amount': debit.amount,
+        'remaining_balance': from_account.balance,
+        'transfer_type': 'Internal',
+        'beneficiary_new_balance': account.balance,
+        'beneficiary_account': account.account_number,
+    }, status=status.HTTP_201_CREATED)
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def transaction_history(request):
@@ -113,25 +250,33 @@ def transaction_history(request):
     from datetime import timedelta
     start_date = timezone.now() - timedelta(days=days)
     
+    reader = values_serializer(TransactionHistorySerializer)
+    
     # Get both outgoing and incoming transactions
-    outgoing_transactions = Transaction.objects.filter(
+    outgoing_transactions = reader.values(Transaction.objects.filter(
         from_account__in=user_accounts,
         created_at__gte=start_date
-    ).exclude(transaction_type='DEPOSIT')
+    ).exclude(transaction_type='DEPOSIT'))
     
-    incoming_transactions = Transaction.objects.filter(
+    incoming_transactions = reader.values(Transaction.objects.filter(
         from_account__in=user_accounts,
         created_at__gte=start_date,
         transaction_type='DEPOSIT'
-    )
+    ))
     
     # Combine and sort transactions
     all_transactions = list(outgoing_transactions) + list(incoming_transactions)
-    all_transactions.sort(key=lambda x: x.created_at, reverse=True)
     
-    serializer = TransactionHistorySerializer(all_transactions, many=True)
+    # Older rows live in the archive table; only read it when the range reaches it
+    if reaches_archive(start_date):
+        all_transactions += list(reader.values(ArchivedTransaction.objects.filter(
+            from_account__in=user_accounts,
+            created_at__gte=start_date
+        )))
+    all_transactions.sort(key=lambda x: x['created_at'], reverse=True)
+    
     return Response({
-        'transactions': serializer.data,
+        'transactions': reader.serialize(all_transactions),
         'count': len(all_transactions)
     })
 
@@ -150,13 +295,223 @@ def transaction_summary(request):
         created_at__gte=recent_date
     )
     
+    reader = values_serializer(TransactionHistorySerializer)
+    
     # Calculate totals
     total_sent = sum(t.amount for t in recent_transactions if t.status == 'COMPLETED')
     pending_transactions = recent_transactions.filter(status='PENDING').count()
     
     return Response({
-        'recent_transactions': TransactionHistorySerializer(recent_transactions[:5], many=True).data,
+        'recent_transactions': reader.serialize(reader.values(recent_transactions)[:5]),
         'total_sent_this_week': total_sent,
         'pending_transactions': pending_transactions,
         'total_transactions': recent_transactions.count()
     })
+
+
+def _analytics_query(params, groups):
+    """(group_by, start, end, types) from the query string, or an error Response"""
+    group_by = [key.strip() for key in params.get('group_by', 'month').split(',') if key.strip()]
+    unknown = [key for key in group_by if key not in groups]
+    if not group_by or unknown:
+        return Response(
+            {'error': f"group_by must be a comma-separated list of {', '.join(groups)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        start = parse_period(params['from']) if params.get('from') else None
+        end = parse_period(params['to']) if params.get('to') else None
+    except ValueError:
+        return Response({'error': 'from and to must be in YYYY-MM format'}, status=status.HTTP_400_BAD_REQUEST)
+    types = [value.strip().upper() for value in params['type'].split(',')] if params.get('type') else None
+    return group_by, start, end, types
+
+
+def _analytics_response(group_by, results):
+    for row in results:
+        if 'month' in row:
+            row['month'] = f"{row['month']:%Y-%m}"
+        for field in ('spent', 'received'):
+            row[field] = str(row[field].quantize(analytics.CENT))
+    return Response({'group_by': group_by, 'results': results})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def spending_analytics(request):
+    """Get spending totals grouped by ?group_by=month,type,counterparty,account"""
+    query = _analytics_query(request.query_params, analytics.GROUP_FIELDS)
+    if isinstance(query, Response):
+        return query
+    group_by, start, end, types = query
+
+    user_accounts = Account.objects.filter(user=request.user)
+    if request.query_params.get('account_id'):
+        user_accounts = user_accounts.filter(id=request.query_params['account_id'])
+
+    return _analytics_response(group_by, analytics.spending(user_accounts, group_by, start, end, types))
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def bank_analytics(request):
+    """Bank-wide spending totals across every shard, grouped by ?group_by=month,type,counterparty"""
+    groups = [key for key in analytics.GROUP_FIELDS if key != 'account']
+    query = _analytics_query(request.query_params, groups)
+    if isinstance(query, Response):
+        return query
+    group_by, start, end, types = query
+    return _analytics_response(group_by, analytics.bank_spending(group_by, start, end, types))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def statement_download(request, account_id, period):
+    """Download a pre-generated monthly statement (?file=csv or ?file=html)"""
+    file_type = request.query_params.get('file', 'csv')
+    if file_type not in ('csv', 'html'):
+        return Response({'error': 'file must be csv or html'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        period = parse_period(period)
+    except ValueError:
+        return Response({'error': 'Period must be in YYYY-MM format'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        statement = Statement.objects.select_related('account').get(
+            account_id=account_id,
+            account__user=request.user,
+            period=period
+        )
+    except Statement.DoesNotExist:
+        raise Http404('Statement has not been generated')
+
+    name = statement.csv_file if file_type == 'csv' else statement.html_file
+    path = os.path.join(settings.MEDIA_ROOT, name)
+    if not os.path.exists(path):
+        raise Http404('Statement has not been generated')
+
+    return FileResponse(
+        open(path, 'rb'),
+        as_attachment=True,
+        filename=f"statement_{statement.account.account_number}_{period:%Y-%m}.{file_type}"
+    )
+
+@sync_to_async
+def _authenticate_stream(request):
+    """JWT from the Authorization header, or a ?ticket= from event_ticket for EventSource clients"""
+    auth = JWTAuthentication()
+    header = auth.get_header(request)
+    if header is None:
+        user_id = events.ticket_user_id(request.GET.get('ticket', ''))
+        return User.objects.filter(pk=user_id, is_active=True).first() if user_id else None
+    raw_token = auth.get_raw_token(header)
+    if not raw_token:
+        return None
+    try:
+        user = auth.get_user(auth.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    return user if user.is_active else None
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def event_ticket(request):
+    """Short-lived ticket that opens the live updates stream as ?ticket="""
+    return Response({
+        'ticket': events.issue_ticket(request.user),
+        'expires_in': settings.EVENTS_TICKET_MAX_AGE,
+    })
+
+async def event_stream(request):
+    """Server-Sent Events stream of balance and transaction updates"""
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would buffer the endless stream and never send a byte
+        return JsonResponse({'detail': 'Live updates are served by the events process.'}, status=503)
+
+    user = await _authenticate_stream(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    broker = events.get_broker()
+    subscription = broker.subscribe(user.id, last_event_id)
+
+    async def stream():
+        try:
+            yield f"retry: {settings.EVENTS_RETRY_MS}\n\n"
+            for event in subscription.backlog:
+                yield event.encode()
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.queue.get(), timeout=settings.EVENTS_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield event.encode()
+        finally:
+            broker.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def change_feed(request):
+    """Ordered outbox events after ?after=<seq> (or a ?consumer='s position)"""
+    params = request.query_params
+    shard = params.get('shard')
+    if sharding.enabled() and shard not in sharding.shard_aliases():
+        # Each shard has its own outbox sequence and consumer positions
+        return Response({'error': f"shard must be one of {', '.join(sharding.shard_aliases())}"},
+                        status=status.HTTP_400_BAD_REQUEST)
+    with sharding.use_shard(shard):
+        return _change_feed(params)
+
+def _change_feed(params):
+    try:
+        limit = min(int(params.get('limit', 100)), 1000)
+        if 'after' in params:
+            after = int(params['after'])
+        elif params.get('consumer'):
+            consumer = OutboxConsumer.objects.filter(name=params['consumer']).first()
+            after = consumer.last_seq if consumer else 0
+        else:
+            after = 0
+    except ValueError:
+        return Response({'error': 'after and limit must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+
+    feed = outbox.read_feed(after, limit)
+    return Response({
+        'events': feed,
+        'next_after': feed[-1]['seq'] if feed else after,
+    })
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def change_feed_ack(request):
+    """Record that a consumer has processed every event up to seq"""
+    consumer = request.data.get('consumer')
+    try:
+        seq = int(request.data.get('seq'))
+    except (TypeError, ValueError):
+        return Response({'error': 'seq must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    if not consumer:
+        return Response({'error': 'consumer is required'}, status=status.HTTP_400_BAD_REQUEST)
+    shard = request.data.get('shard')
+    if sharding.enabled() and shard not in sharding.shard_aliases():
+        return Response({'error': f"shard must be one of {', '.join(sharding.shard_aliases())}"},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    with sharding.use_shard(shard):
+        return Response({'consumer': consumer, 'last_seq': outbox.acknowledge(consumer, seq)})
\ No newline at end of file
@@ -1,21 +1,33 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
+from django.conf import settings
 from django.contrib.auth.password_validation import validate_password
+from bluebank import sharding
 from .models import User
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, validators=[validate_password])
     password_confirm = serializers.CharField(write_only=True)
+    # Home branch; assigned when left out (see bluebank/sharding.py)
+    branch_code = serializers.CharField(required=False)
 
     class Meta:
         model = User
         fields = ('username', 'email', 'password', 'password_confirm', 
                  'first_name', 'last_name', 'phone_number', 'date_of_birth', 
-                 'address', 'aadhar_number', 'pan_number')
+                 'address', 'aadhar_number', 'pan_number', 'branch_code')
+
+    def validate_branch_code(self, value):
+        value = value.strip().upper()
+        if value not in settings.BRANCH_CODES:
+            raise serializers.ValidationError(f"Unknown branch; choose one of {', '.join(settings.BRANCH_CODES)}")
+        return value
 
     def validate(self, attrs):
         if attrs['password'] != attrs['password_confirm']:
             raise serializers.ValidationError("Passwords don't match")
+        if not attrs.get('branch_code'):
+            attrs['branch_code'] = sharding.assign_branch(attrs['email'])
         return attrs
 
     def create(self, validated_data):
@@ -45,8 +57,8 @@ class UserProfileSerializer(serializers.ModelSerializer):
         model = User
         fields = ('id', 'username', 'email', 'first_name', 'last_name', 
                  'phone_number', 'date_of_birth', 'address', 'is_verified',
-                 'date_joined')
-        read_only_fields = ('id', 'username', 'email', 'is_verified', 'date_joined')
+                 'branch_code', 'date_joined')
+        read_only_fields = ('id', 'username', 'email', 'is_verified', 'branch_code', 'date_joined')
 
 class ChangePasswordSerializer(serializers.Serializer):
     old_password = serializers.CharField(required=True)
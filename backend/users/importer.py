@@ -0,0 +1,252 @@
+"""Bulk customer and account onboarding used by ``import_customers``.
+
+Rows are validated a chunk at a time, duplicates are checked against the
+unique indexes with one ``IN`` query per field, passwords are hashed in a
+process pool, and users, accounts and their outbox events are written with
+``bulk_create`` inside one transaction per chunk.
+"""
+import csv
+import json
+import random
+import re
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import EmailValidator
+from django.db import IntegrityError, transaction
+
+from accounts.models import Account
+from transactions import outbox
+from transactions.models import OutboxEvent
+from .models import User
+
+UNIQUE_FIELDS = ('email', 'username', 'aadhar_number', 'pan_number')
+REQUIRED_FIELDS = ('username', 'email', 'first_name', 'last_name')
+USER_FIELDS = ('username', 'email', 'first_name', 'last_name', 'phone_number',
+               'date_of_birth', 'address', 'aadhar_number', 'pan_number')
+
+AADHAR_REGEX = re.compile(r'^\d{12}$')
+PAN_REGEX = re.compile(r'^[A-Z]{5}\d{4}[A-Z]$')
+ACCOUNT_TYPES = {choice for choice, _ in Account.ACCOUNT_TYPES}
+
+validate_email = EmailValidator()
+
+
+class RowError(Exception):
+    def __init__(self, field, message):
+        super().__init__(message)
+        self.field = field
+        self.message = message
+
+
+def read_rows(path, fmt=None):
+    """Yield (row_number, dict) from a CSV or NDJSON file, one row at a time"""
+    fmt = fmt or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+    with open(path, newline='', encoding='utf-8') as handle:
+        if fmt == 'csv':
+            for number, row in enumerate(csv.DictReader(handle), start=1):
+                yield number, row
+        else:
+            number = 0
+            for line in handle:
+                if not line.strip():
+                    continue
+                number += 1
+                try:
+                    yield number, json.loads(line)
+                except ValueError:
+                    yield number, {'_error': 'Malformed JSON line'}
+
+
+def _clean(value):
+    if value is None:
+        return ''
+    return str(value).strip()
+
+
+def validate_row(raw):
+    """Return a cleaned row dict or raise RowError"""
+    if '_error' in raw:
+        raise RowError('row', raw['_error'])
+
+    row = {field: _clean(raw.get(field)) for field in USER_FIELDS}
+    for field in REQUIRED_FIELDS:
+        if not row[field]:
+            raise RowError(field, 'This field is required')
+    for field in USER_FIELDS:
+        max_length = User._meta.get_field(field).max_length
+        if max_length and len(row[field]) > max_length:
+            raise RowError(field, f'Longer than {max_length} characters')
+
+    row['email'] = User.objects.normalize_email(row['email'])
+    try:
+        validate_email(row['email'])
+    except ValidationError:
+        raise RowError('email', 'Invalid email address')
+
+    if row['phone_number'] and not User.phone_regex.regex.match(row['phone_number']):
+        raise RowError('phone_number', 'Invalid phone number')
+
+    row['pan_number'] = row['pan_number'].upper() or None
+    if row['pan_number'] and not PAN_REGEX.match(row['pan_number']):
+        raise RowError('pan_number', 'Invalid PAN')
+    row['aadhar_number'] = row['aadhar_number'] or None
+    if row['aadhar_number'] and not AADHAR_REGEX.match(row['aadhar_number']):
+        raise RowError('aadhar_number', 'Aadhar must be 12 digits')
+
+    if row['date_of_birth']:
+        try:
+            row['date_of_birth'] = date.fromisoformat(row['date_of_birth'])
+        except ValueError:
+            raise RowError('date_of_birth', 'Use YYYY-MM-DD')
+    else:
+        row['date_of_birth'] = None
+
+    row['password'] = _clean(raw.get('password'))
+    row['password_hash'] = _clean(raw.get('password_hash'))
+
+    account_type = _clean(raw.get('account_type')).upper()
+    row['account'] = None
+    if account_type:
+        if account_type not in ACCOUNT_TYPES:
+            raise RowError('account_type', f'Must be one of {", ".join(sorted(ACCOUNT_TYPES))}')
+        try:
+            balance = Decimal(_clean(raw.get('opening_balance')) or '0').quantize(Decimal('0.01'))
+        except InvalidOperation:
+            raise RowError('opening_balance', 'Invalid amount')
+        if balance < 0:
+            raise RowError('opening_balance', 'Must not be negative')
+        row['account'] = {
+            'account_type': account_type,
+            'balance': balance,
+            'branch_code': _clean(raw.get('branch_code')) or 'BLUE001',
+            'ifsc_code': _clean(raw.get('ifsc_code')).upper() or 'BLUE0000001',
+        }
+    return row
+
+
+def reject_duplicates(rows):
+    """Split (number, row) pairs into accepted rows and duplicate errors.
+
+    Checks duplicates inside the chunk and, with one query per unique
+    field, against rows already in the database.
+    """
+    errors = []
+    existing = {}
+    for field in UNIQUE_FIELDS:
+        values = [row[field] for _, row in rows if row[field]]
+        existing[field] = set(User.objects.filter(**{f'{field}__in': values}).values_list(field, flat=True))
+
+    seen = {field: set() for field in UNIQUE_FIELDS}
+    accepted = []
+    for number, row in rows:
+        duplicate = next(
+            (field for field in UNIQUE_FIELDS
+             if row[field] and (row[field] in existing[field] or row[field] in seen[field])),
+            None
+        )
+        if duplicate:
+            errors.append((number, duplicate, 'Duplicate value'))
+            continue
+        for field in UNIQUE_FIELDS:
+            if row[field]:
+                seen[field].add(row[field])
+        accepted.append((number, row))
+    return accepted, errors
+
+
+def hash_password(raw_password):
+    """Process-pool entry point"""
+    return make_password(raw_password)
+
+
+def resolve_passwords(rows, pool=None):
+    """Return the stored password for each row, in order.
+
+    Pre-hashed ``password_hash`` values are kept as they are and rows with
+    no password get an unusable one; only plain passwords are hashed, in
+    ``pool`` when given since PBKDF2 dominates the cost of an import.
+    """
+    hashes = [row['password_hash'] or (None if row['password'] else make_password(None))
+              for _, row in rows]
+    pending = [i for i, value in enumerate(hashes) if value is None]
+    if pending:
+        plain = [rows[i][1]['password'] for i in pending]
+        hashed = pool.map(hash_password, plain, chunksize=8) if pool else map(hash_password, plain)
+        for i, value in zip(pending, hashed):
+            hashes[i] = value
+    return hashes
+
+
+def allocate_account_numbers(count):
+    """Pre-allocate ``count`` unused account numbers in Account's format"""
+    allocated = set()
+    while len(allocated) < count:
+        candidates = {
+            f"50100{random.randint(1000000, 9999999)}" for _ in range(count - len(allocated))
+        } - allocated
+        taken = set(Account.objects.filter(account_number__in=candidates).values_list('account_number', flat=True))
+        allocated |= candidates - taken
+    return list(allocated)
+
+
+def _build(rows, hashes):
+    users = []
+    for (_, row), password in zip(rows, hashes):
+        users.append(User(password=password, **{field: row[field] for field in USER_FIELDS}))
+    return users
+
+
+def _insert(rows, hashes):
+    """Insert users, accounts and account.created outbox events"""
+    users = User.objects.bulk_create(_build(rows, hashes), batch_size=1000)
+    ids = dict(User.objects.filter(email__in=[user.email for user in users]).values_list('email', 'id'))
+
+    with_accounts = [row for _, row in rows if row['account']]
+    numbers = allocate_account_numbers(len(with_accounts))
+    accounts = [
+        Account(user_id=ids[row['email']], account_number=number, **row['account'])
+        for row, number in zip(with_accounts, numbers)
+    ]
+    Account.objects.bulk_create(accounts, batch_size=1000)
+
+    created = Account.objects.filter(account_number__in=numbers)
+    OutboxEvent.objects.bulk_create([
+        OutboxEvent(
+            event_type='account.created',
+            aggregate_type='account',
+            aggregate_id=account.id,
+            payload=outbox.account_payload(account)
+        )
+        for account in created
+    ], batch_size=1000)
+    return len(users), len(accounts)
+
+
+def write_chunk(rows, hashes):
+    """Write a validated chunk; returns (users, accounts, errors).
+
+    If a concurrent registration makes the bulk insert violate a unique
+    index, the chunk is retried row by row so only the clashing rows fail.
+    """
+    try:
+        with transaction.atomic():
+            users, accounts = _insert(rows, hashes)
+        return users, accounts, []
+    except IntegrityError:
+        pass
+
+    users = accounts = 0
+    errors = []
+    for pair, password in zip(rows, hashes):
+        try:
+            with transaction.atomic():
+                created_users, created_accounts = _insert([pair], [password])
+        except IntegrityError as exc:
+            errors.append((pair[0], 'row', f'Conflicts with an existing record: {exc}'))
+            continue
+        users += created_users
+        accounts += created_accounts
+    return users, accounts, errors
@@ -0,0 +1,115 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from bluebank import sharding
+from users.importer import RowError, read_rows, reject_duplicates, resolve_passwords, validate_row, write_chunk
+
+
+class Command(BaseCommand):
+    help = 'Bulk import customers and their accounts from a CSV or NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or NDJSON file, one customer (and optional account) per row')
+        parser.add_argument('--format', choices=['csv', 'ndjson'],
+                            help='Input format (defaults to the file extension)')
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Rows validated and committed together')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Processes used to hash passwords')
+        parser.add_argument('--errors', help='Rejected-row report (defaults to <path>.errors.csv)')
+        parser.add_argument('--resume', action='store_true',
+                            help='Skip rows committed by a previous run (read from <path>.progress)')
+        parser.add_argument('--target-rps', type=float, default=500,
+                            help='Throughput target in rows per second to report against')
+
+    def handle(self, *args, **options):
+        if sharding.enabled():
+            # Users and their accounts are written in one transaction, which
+            # cannot span the directory and the shards
+            raise CommandError('import_customers does not support sharded databases yet')
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'{path} does not exist')
+        progress_path = f'{path}.progress'
+        errors_path = options['errors'] or f'{path}.errors.csv'
+
+        done = 0
+        if options['resume'] and os.path.exists(progress_path):
+            with open(progress_path) as handle:
+                done = json.load(handle)['row']
+            self.stdout.write(f"Resuming after row {done}")
+
+        rows = read_rows(path, options['format'])
+        rows = islice(rows, done, None)
+
+        pool = None
+        if options['workers'] > 1:
+            # Forked workers only hash passwords, but must not share our connection.
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=options['workers'])
+
+        totals = {'rows': 0, 'users': 0, 'accounts': 0, 'rejected': 0}
+        append = options['resume'] and done > 0 and os.path.exists(errors_path)
+        started = time.perf_counter()
+        try:
+            with open(errors_path, 'a' if append else 'w', newline='') as report:
+                writer = csv.writer(report)
+                if not append:
+                    writer.writerow(['row', 'field', 'error'])
+                while True:
+                    chunk = list(islice(rows, options['chunk_size']))
+                    if not chunk:
+                        break
+                    self._import_chunk(chunk, pool, writer, totals)
+                    report.flush()
+                    done = chunk[-1][0]
+                    with open(progress_path, 'w') as handle:
+                        json.dump({'row': done, **totals}, handle)
+
+                    elapsed = time.perf_counter() - started
+                    self.stdout.write(
+                        f"Row {done}: {totals['users']} users, {totals['accounts']} accounts, "
+                        f"{totals['rejected']} rejected ({totals['rows'] / elapsed:.0f} rows/s)"
+                    )
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        elapsed = time.perf_counter() - started
+        rate = totals['rows'] / elapsed if elapsed else 0
+        style = self.style.SUCCESS if rate >= options['target_rps'] else self.style.WARNING
+        self.stdout.write(style(
+            f"Imported {totals['users']} users and {totals['accounts']} accounts, "
+            f"rejected {totals['rejected']} rows in {elapsed:.1f}s: "
+            f"{rate:.0f} rows/s (target {options['target_rps']:.0f})"
+        ))
+        if totals['rejected']:
+            self.stdout.write(f"Rejected rows written to {errors_path}")
+
+    def _import_chunk(self, chunk, pool, writer, totals):
+        valid = []
+        errors = []
+        for number, raw in chunk:
+            try:
+                valid.append((number, validate_row(raw)))
+            except RowError as exc:
+                errors.append((number, exc.field, exc.message))
+
+        accepted, duplicates = reject_duplicates(valid)
+        errors.extend(duplicates)
+        if accepted:
+            users, accounts, conflicts = write_chunk(accepted, resolve_passwords(accepted, pool))
+            errors.extend(conflicts)
+            totals['users'] += users
+            totals['accounts'] += accounts
+
+        writer.writerows(sorted(errors))
+        totals['rows'] += len(chunk)
+        totals['rejected'] += len(errors)
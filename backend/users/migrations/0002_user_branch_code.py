@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 19:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='branch_code',
+            field=models.CharField(default='BLUE001', max_length=10),
+        ),
+    ]
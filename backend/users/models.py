@@ -15,6 +15,8 @@ class User(AbstractUser):
     aadhar_number = models.CharField(max_length=12, unique=True, null=True, blank=True)
     pan_number = models.CharField(max_length=10, unique=True, null=True, blank=True)
     is_verified = models.BooleanField(default=False)
+    # Home branch: where the user's accounts are opened, and so their shard
+    branch_code = models.CharField(max_length=10, default='BLUE001')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
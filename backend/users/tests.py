@@ -1,3 +1,102 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from accounts.models import Account
+from bluebank import sharding
+from transactions.models import OutboxEvent
+from .models import User
+
+
+@override_settings(BRANCH_CODES=['BLUE001', 'BLUE002', 'BLUE003'])
+class RegistrationBranchTests(TestCase):
+    def setUp(self):
+        # Registration is throttled per client IP
+        cache.clear()
+
+    def register(self, email, **extra):
+        return self.client.post('/api/auth/register/', {
+            'username': email.split('@')[0], 'email': email, 'first_name': 'Test', 'last_name': 'User',
+            'password': 'Correct-horse-9', 'password_confirm': 'Correct-horse-9', **extra,
+        }, content_type='application/json', secure=True)
+
+    def test_chosen_branch_is_kept(self):
+        response = self.register('chooser@example.com', branch_code='blue002')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(User.objects.get(email='chooser@example.com').branch_code, 'BLUE002')
+
+    def test_unknown_branch_is_rejected(self):
+        response = self.register('lost@example.com', branch_code='NOPE001')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('branch_code', response.data)
+
+    def test_branch_is_assigned_when_left_out(self):
+        emails = [f'user{n}@example.com' for n in range(5)]
+        for email in emails:
+            self.assertEqual(self.register(email).status_code, 201)
+        branches = dict(User.objects.filter(email__in=emails).values_list('email', 'branch_code'))
+        self.assertEqual(branches, {email: sharding.assign_branch(email) for email in emails})
+        self.assertGreater(len(set(branches.values())), 1)
+
+
+class ImportCustomersTests(TestCase):
+    HEADER = 'username,email,first_name,last_name,pan_number,account_type,opening_balance\n'
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        User.objects.create_user(username='existing', email='existing@example.com', password='unused')
+
+    def write(self, lines):
+        path = os.path.join(self.root, 'customers.csv')
+        with open(path, 'w') as handle:
+            handle.write(self.HEADER + ''.join(f'{line}\n' for line in lines))
+        return path
+
+    def run_import(self, path, *args):
+        call_command('import_customers', path, '--workers', '1', '--chunk-size', '2', *args, stdout=io.StringIO())
+        with open(f'{path}.errors.csv', newline='') as report:
+            return [tuple(row) for row in csv.reader(report)][1:]
+
+    def test_rejects_duplicates_and_invalid_rows(self):
+        path = self.write([
+            'asha,asha@example.com,Asha,Rao,ABCDE1234F,SAVINGS,100.50',
+            'asha2,asha@EXAMPLE.com,Asha,Rao,,,',
+            'other,existing@example.com,Ex,Isting,,,',
+            'badpan,badpan@example.com,Bad,Pan,1234,,',
+            'ravi,ravi@example.com,Ravi,Kumar,abcde1234g,,',
+        ])
+        errors = self.run_import(path)
+        self.assertEqual(errors, [('2', 'email', 'Duplicate value'), ('3', 'email', 'Duplicate value'),
+                                  ('4', 'pan_number', 'Invalid PAN')])
+        self.assertEqual(
+            set(User.objects.values_list('username', flat=True)), {'existing', 'asha', 'ravi'}
+        )
+        account = Account.objects.get(user__username='asha')
+        self.assertEqual((account.account_type, account.balance), ('SAVINGS', Decimal('100.50')))
+        self.assertEqual(OutboxEvent.objects.filter(event_type='account.created', aggregate_id=account.id).count(), 1)
+        self.assertEqual(User.objects.get(username='ravi').pan_number, 'ABCDE1234G')
+
+        with open(f'{path}.progress') as handle:
+            self.assertEqual(json.load(handle)['row'], 5)
+        # Importing the same file again rejects every row as already present
+        self.assertEqual(len(self.run_import(path)), 5)
+
+    def test_resume_skips_committed_rows(self):
+        path = self.write([f'user{n},user{n}@example.com,User,{n},,,' for n in range(1, 5)])
+        with open(f'{path}.progress', 'w') as handle:
+            json.dump({'row': 2}, handle)
+        self.assertEqual(self.run_import(path, '--resume'), [])
+        self.assertEqual(
+            sorted(User.objects.exclude(username='existing').values_list('username', flat=True)), ['user3', 'user4']
+        )
+        with open(f'{path}.progress') as handle:
+            self.assertEqual(json.load(handle)['row'], 4)
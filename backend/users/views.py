@@ -5,6 +5,7 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate, update_session_auth_hash
+from bluebank.throttling import throttle_scope
 from .models import User
 from .Serializers import (
     UserRegistrationSerializer, 
@@ -13,6 +14,7 @@ from .Serializers import (
     ChangePasswordSerializer
 )
 
+@throttle_scope('register')
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def register(request):
@@ -32,6 +34,7 @@ def register(request):
     print("Registration errors:", serializer.errors)  # Debug log
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@throttle_scope('login')
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def login(request):
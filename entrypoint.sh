@@ -7,11 +7,20 @@ set -e
 #   sleep 1
 # done
 
-echo "Applying database migrations..."
-python manage.py migrate --noinput
+# The events process leaves migrations and static files to the main one
+if [ "${SERVER:-wsgi}" != "events" ]; then
+  echo "Applying database migrations..."
+  python manage.py migrate --noinput
 
-echo "Collecting static files..."
-python manage.py collectstatic --noinput
+  echo "Collecting static files..."
+  python manage.py collectstatic --noinput
+fi
 
 echo "Starting Gunicorn..."
-exec gunicorn bluebank.wsgi:application --bind 0.0.0.0:$PORT --workers 3 --log-level info
\ No newline at end of file
+# SERVER=events runs the live updates stream (/api/events/) on ASGI workers;
+# route that path to it and leave the rest of the API on the WSGI workers
+if [ "${SERVER:-wsgi}" = "events" ]; then
+  exec gunicorn bluebank.asgi:events_application --bind 0.0.0.0:$PORT --workers 1 \
+    --worker-class uvicorn.workers.UvicornWorker --log-level info
+fi
+exec gunicorn bluebank.wsgi:application --bind 0.0.0.0:$PORT --workers 3 --log-level info